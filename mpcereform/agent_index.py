@@ -0,0 +1,142 @@
+"""In-memory index of agent names, for proposing matches to new authors and clients."""
+
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Splits `other_names` into separate names
+OTHER_NAMES_RGX = re.compile(r'\s*[;|]\s*')
+# Anything that is not a letter or a digit
+PUNCTUATION_RGX = re.compile(r'[^\w]+')
+
+def normalise_name(name):
+    """Returns a matching key for a name.
+
+    Accents, case, punctuation and word order are ignored, so
+    'Voltaire, François-Marie Arouet de' and 'francois marie arouet de voltaire'
+    have the same key."""
+
+    if not isinstance(name, str):
+        return ''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join([char for char in name if not unicodedata.combining(char)])
+    words = PUNCTUATION_RGX.sub(' ', name.lower().replace('_', ' ')).split()
+    return ' '.join(sorted(words))
+
+def trigrams(key):
+    """Returns the set of character trigrams of a key, padded at each end."""
+
+    padded = f'  {key} '
+    return {padded[idx:idx + 3] for idx in range(len(padded) - 2)}
+
+def similarity(key_a, key_b):
+    """Scores the similarity of two matching keys, from 0 to 1."""
+
+    if key_a == key_b:
+        return 1.0
+    return SequenceMatcher(None, key_a, key_b, autojunk=False).ratio()
+
+class AgentIndex():
+    """Finds the agents whose names are most like a given name.
+
+    Every name and other name of every agent is indexed under its matching
+    key (see `normalise_name`), and under each trigram of the key. A lookup
+    only reads the postings of the query's rarest trigrams, so it touches the
+    few names that share them rather than every name in the index. The
+    candidates with the most trigrams in common are then scored with
+    `similarity`.
+
+    Arguments:
+    ==========
+        max_postings (int): trigrams shared by more names than this are too
+            common to narrow a search, and are only used if the name has no
+            rarer trigrams
+        candidates (int): number of candidates scored per lookup
+    """
+
+    def __init__(self, max_postings=500, candidates=50):
+        self.max_postings = max_postings
+        self.candidates = candidates
+        # Parallel lists of (agent_code, name) and the key of each name
+        self._names = []
+        self._keys = []
+        # key: ids of the names with that key
+        self._exact = {}
+        # trigram: ids of the names containing it
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    @classmethod
+    def from_database(cls, cur, **kwargs):
+        """Builds an index of the names and other names in `mpce.agent`."""
+
+        index = cls(**kwargs)
+        cur.execute('SELECT agent_code, name, other_names FROM mpce.agent')
+        for agent_code, name, other_names in cur.fetchall():
+            index.add(agent_code, name)
+            if isinstance(other_names, str):
+                for other_name in OTHER_NAMES_RGX.split(other_names):
+                    index.add(agent_code, other_name)
+        return index
+
+    def add(self, agent_code, name):
+        """Indexes one name of an agent."""
+
+        key = normalise_name(name)
+        if not key:
+            return
+        idx = len(self._names)
+        self._names.append((agent_code, name))
+        self._keys.append(key)
+        self._exact.setdefault(key, []).append(idx)
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, []).append(idx)
+
+    def match(self, name, threshold=0.85, limit=5):
+        """Proposes the agents a name most likely refers to.
+
+        Arguments:
+        ==========
+            name (str): the name to look up
+            threshold (float): lowest similarity score to propose
+            limit (int): greatest number of agents to propose
+
+        Returns:
+        ==========
+            A list of (agent_code, agent_name, score) tuples, best first, with
+            at most one entry per agent
+        """
+
+        key = normalise_name(name)
+        if not key:
+            return []
+
+        ids = self._exact.get(key, []) + self._candidates(key)
+
+        best = {}
+        for idx in ids:
+            agent_code, agent_name = self._names[idx]
+            score = similarity(key, self._keys[idx])
+            if score >= threshold and score > best.get(agent_code, (None, -1))[1]:
+                best[agent_code] = (agent_name, score)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][1], item[0]))
+        return [(agent_code, agent_name, score)
+                for agent_code, (agent_name, score) in ranked[:limit]]
+
+    def _candidates(self, key):
+        """Returns the ids of the names sharing the most of the key's trigrams."""
+
+        postings = sorted([self._postings[gram] for gram in trigrams(key) if gram in self._postings],
+                          key=len)
+        if not postings:
+            return []
+        selective = [ids for ids in postings if len(ids) <= self.max_postings] or postings[:1]
+
+        shared = Counter()
+        for ids in selective:
+            shared.update(ids)
+        return [idx for idx, _ in shared.most_common(self.candidates)]
@@ -0,0 +1,141 @@
+"""Benchmarks each phase of the build against synthetic data at several scales."""
+
+import json
+import os
+import resource
+import tempfile
+from time import perf_counter
+
+import mysql.connector as mysql
+
+from mpcereform.connections import cursor
+from mpcereform.core import LocalDB
+from mpcereform.synthetic import SyntheticManuscripts, create_manuscripts, database_exists, \
+    is_synthetic, scale_spreadsheets
+
+def reset_peak_rss():
+    """Resets the peak resident set size of this process, if the OS allows it.
+
+    Returns:
+    ==========
+        True if the peak was reset, False if `peak_rss` will report the peak
+        since the process started
+    """
+
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='utf-8') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss():
+    """Returns the peak resident set size of this process, in MB."""
+
+    try:
+        with open('/proc/self/status', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_benchmark(scale=1, seed=0, user='root', host='127.0.0.1', password=None,
+                  work_dir=None, batch_size=1000, local_infile=True):
+    """Builds `mpce` from a synthetic `manuscripts` database, timing each phase.
+
+    The `manuscripts` and `mpce` databases on the server are replaced, so
+    this refuses to run unless `manuscripts` is absent or synthetic.
+
+    Arguments:
+    ==========
+        scale (int): multiple of the FBTEE-1 volumes to generate
+        seed (int): seed for the synthetic data
+        work_dir (str): directory for the scaled spreadsheets. A temporary
+            directory is used if none is given
+
+    Returns:
+    ==========
+        A list of dicts, one per phase, with its wall time, rows affected,
+        throughput and peak RSS, and the entities whose codes capped their
+        number of rows below the scale (see `SyntheticManuscripts.capped`)
+    """
+
+    capped = SyntheticManuscripts(scale, seed).capped
+
+    conn = mysql.connect(user=user, host=host, password=password,
+                         allow_local_infile=local_infile)
+    try:
+        if database_exists(conn, 'mpce') and not (database_exists(conn, 'manuscripts') and
+                                                  is_synthetic(conn)):
+            raise mysql.DatabaseError(
+                'The `mpce` database on this server was not built from synthetic data. '
+                'Refusing to replace it.')
+
+        print(f'Generating synthetic data at scale {scale}...')
+        start = perf_counter()
+        create_manuscripts(conn, scale, seed, batch_size, local_infile)
+        with cursor(conn) as cur:
+            cur.execute('DROP DATABASE IF EXISTS mpce')
+        conn.commit()
+    finally:
+        conn.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spreadsheet_dir = os.path.join(work_dir or tmp, f'scale-{scale}')
+        scale_spreadsheets(spreadsheet_dir, scale)
+        print(f'Synthetic data generated in {perf_counter() - start:.1f}s.')
+
+        db = LocalDB(user=user, host=host, password=password, snapshot_dir=None,
+                     batch_size=batch_size, local_infile=local_infile,
+                     commit_policy='phase', spreadsheet_dir=spreadsheet_dir)
+        results = []
+        try:
+            with db.load_tuning():
+                for name in db.PHASES:
+                    per_phase = reset_peak_rss()
+                    db.run_phase(name)
+                    phase = db.instrument.phases[-1]
+                    results.append({
+                        'scale': scale,
+                        'phase': name,
+                        'wall': phase['wall'],
+                        'rows': phase['rows'],
+                        'rows_per_second': phase['rows_per_second'],
+                        'statements': phase['statements'],
+                        'peak_rss_mb': peak_rss(),
+                        'peak_rss_per_phase': per_phase,
+                        'capped': capped
+                    })
+        finally:
+            db.close()
+
+    return results
+
+def format_results(results):
+    """Returns the benchmark results as a text table."""
+
+    lines = [
+        f"{'SCALE':>5} {'PHASE':<26} {'WALL(s)':>9} {'ROWS':>10} {'ROWS/s':>9} {'PEAK RSS(MB)':>13}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result['scale']:5d} {result['phase']:<26} {result['wall']:9.2f} "
+            f"{result['rows']:10d} {result['rows_per_second']:9.0f} "
+            f"{result['peak_rss_mb']:13.1f}{'' if result['peak_rss_per_phase'] else '*'}"
+        )
+    if not all([result['peak_rss_per_phase'] for result in results]):
+        lines.append('* peak RSS since the benchmark started, not for the phase alone')
+    capped = {result['scale']: result['capped'] for result in results if result['capped']}
+    for scale, entities in capped.items():
+        counts = ', '.join([f'{entity} {count}' for entity, count in entities.items()])
+        lines.append(f'Scale {scale} is capped by the width of the codes: {counts}')
+    return '\n'.join(lines)
+
+def write_results(results, pth):
+    """Writes the benchmark results to a JSON file."""
+
+    with open(pth, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
@@ -0,0 +1,215 @@
+"""Bulk loading of large row sets into the database."""
+
+import os
+import tempfile
+from datetime import date, datetime, time
+
+from mpcereform.connections import MAX_PLACEHOLDERS
+from mpcereform.pipeline import chunked
+
+# Escapes for MySQL's default LOAD DATA format
+TSV_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0'
+})
+
+class BulkWriter():
+    """Writes large sets of rows to a single table in as few round trips as possible.
+
+    If the server accepts `LOAD DATA LOCAL INFILE`, each chunk of `batch_size`
+    rows is written to a temporary TSV file and loaded in one statement.
+    Otherwise the chunks are sent as multi-row INSERT statements. Either way,
+    each chunk is written as soon as it has been read, so the writes overlap
+    with reading the rest of the rows, e.g. on a `pipeline.prefetch` thread.
+
+    NB: With LOCAL, the server turns data-conversion and duplicate-key errors
+    into warnings, rather than aborting. The warnings are printed after each
+    load, so that truncated or skipped rows do not go unnoticed.
+
+    Arguments:
+    ==========
+        conn (MySQLConnection): connection to write on
+        table (str): name of the table to write to
+        columns (sequence): names of the columns, in the order they appear in each row
+        batch_size (int): number of rows per LOAD DATA or INSERT statement
+        local_infile (bool): whether to try LOAD DATA LOCAL INFILE
+        ignore (bool): whether to skip rows with duplicate keys
+        on_duplicate (str): an ON DUPLICATE KEY UPDATE clause. Since LOAD DATA
+            cannot update existing rows, this forces multi-row INSERTs
+        statements (StatementCache): if given, full batches are sent as
+            prepared statements, which the server parses only once
+        code_column (str): a column of string codes, to fill in where missing
+        codes (callable): reserves new codes: given a number n, returns a list
+            of n codes. Called once per batch of rows
+    """
+
+    def __init__(self, conn, table, columns, batch_size=1000, local_infile=True,
+                 ignore=False, on_duplicate=None, statements=None, code_column=None,
+                 codes=None):
+        self.conn = conn
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.local_infile = local_infile and on_duplicate is None
+        self.ignore = ignore
+        self.on_duplicate = on_duplicate
+        self.statements = statements
+        self.code_column = code_column
+        self.codes = codes
+
+    def write(self, rows):
+        """Writes an iterable of row tuples to the table.
+
+        Returns:
+        ==========
+            The number of rows affected
+        """
+
+        if self.codes is not None:
+            rows = self._assign_codes(rows)
+
+        cur = self.conn.cursor()
+        try:
+            if self.local_infile and self._server_accepts_infile(cur):
+                return self._load_infile(rows, cur)
+            return self._insert_batches(rows, cur)
+        finally:
+            cur.close()
+
+    def _assign_codes(self, rows):
+        """Fills in missing codes, reserving them one batch of rows at a time."""
+
+        idx = self.columns.index(self.code_column)
+
+        def fill(batch):
+            missing = {pos for pos, row in enumerate(batch) if row[idx] in (None, '', 'new')}
+            codes = iter(self.codes(len(missing)))
+            for pos, row in enumerate(batch):
+                if pos in missing:
+                    row = tuple(row[:idx]) + (next(codes),) + tuple(row[idx + 1:])
+                yield row
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield from fill(batch)
+                batch = []
+        yield from fill(batch)
+
+    def _server_accepts_infile(self, cur):
+        """Checks whether the server allows LOAD DATA LOCAL INFILE."""
+        cur.execute("SHOW VARIABLES LIKE 'local_infile'")
+        result = cur.fetchone()
+        return result is not None and result[1] in {'ON', '1'}
+
+    def _load_infile(self, rows, cur):
+        """Loads the rows a chunk at a time, each through its own temporary TSV file."""
+
+        # BIT columns will not accept text, so their values need casting
+        cur.execute(f'DESCRIBE {self.table}')
+        bit_columns = set()
+        for name, col_type, *_ in cur.fetchall():
+            if isinstance(col_type, (bytes, bytearray)):
+                col_type = col_type.decode('utf-8')
+            if col_type.lower().startswith('bit'):
+                bit_columns.add(name)
+
+        variables = [f'@v{idx}' for idx in range(len(self.columns))]
+        assignments = [
+            f'`{col}` = CAST({var} AS UNSIGNED)' if col in bit_columns else f'`{col}` = {var}'
+            for col, var in zip(self.columns, variables)
+        ]
+
+        affected = 0
+        for chunk in chunked(rows, self.batch_size):
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n',
+                                             suffix='.tsv', delete=False) as tsv:
+                for row in chunk:
+                    tsv.write('\t'.join([_tsv_field(value) for value in row]))
+                    tsv.write('\n')
+            try:
+                file_name = tsv.name.replace('\\', '\\\\').replace("'", "\\'")
+                cur.execute(f"""
+                    LOAD DATA LOCAL INFILE '{file_name}'
+                    {'IGNORE' if self.ignore else ''} INTO TABLE {self.table}
+                    CHARACTER SET utf8mb4
+                    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                    LINES TERMINATED BY '\\n'
+                    ({', '.join(variables)})
+                    SET {', '.join(assignments)}
+                """)
+                affected += cur.rowcount
+            finally:
+                os.remove(tsv.name)
+
+            self._report_warnings(cur)
+
+        return affected
+
+    def _report_warnings(self, cur, limit=10):
+        """Prints the warnings raised by the last statement, up to `limit` of them."""
+
+        cur.execute('SHOW COUNT(*) WARNINGS')
+        (warnings,) = cur.fetchone()
+        if not warnings:
+            return
+        print(f'{warnings} warnings raised while loading `{self.table}`:')
+        cur.execute(f'SHOW WARNINGS LIMIT {limit}')
+        for level, code, message in cur.fetchall():
+            print(f'  {level} {code}: {message}')
+        if warnings > limit:
+            print(f'  ... and {warnings - limit} more.')
+
+    def _insert_batches(self, rows, cur):
+        """Sends the rows as multi-row INSERT statements."""
+
+        row_placeholder = '(' + ', '.join(['%s'] * len(self.columns)) + ')'
+        head = (
+            f"INSERT {'IGNORE ' if self.ignore else ''}INTO {self.table} "
+            f"({', '.join([f'`{col}`' for col in self.columns])}) VALUES "
+        )
+        tail = f' ON DUPLICATE KEY UPDATE {self.on_duplicate}' if self.on_duplicate else ''
+
+        # Every full batch shares one statement, so it is worth preparing
+        full_batch = head + ', '.join([row_placeholder] * self.batch_size) + tail
+        prepare = (self.statements is not None and
+                   self.batch_size * len(self.columns) <= MAX_PLACEHOLDERS)
+
+        affected = 0
+        batch = []
+
+        def flush():
+            params = [value for row in batch for value in row]
+            if prepare and len(batch) == self.batch_size:
+                return self.statements.execute(full_batch, params).rowcount
+            cur.execute(head + ', '.join([row_placeholder] * len(batch)) + tail, params)
+            return cur.rowcount
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                affected += flush()
+                batch = []
+        if batch:
+            affected += flush()
+
+        return affected
+
+def _tsv_field(value):
+    """Formats a single value for MySQL's default LOAD DATA format."""
+
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    return str(value).translate(TSV_ESCAPES)
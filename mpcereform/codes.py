@@ -0,0 +1,153 @@
+"""Allocation of new string codes, such as agent codes, from server-side sequences."""
+
+import re
+import threading
+
+from mpcereform.connections import cursor
+
+class CodeAllocator():
+    """Hands out new codes (e.g. 'id000123') from the sequences in `mpce.code_sequence`.
+
+    There is one sequence per code prefix. It is seeded once, from the highest
+    code in the table that uses it, and after that each reservation is a single
+    UPDATE of one row, however large the table. The UPDATE is atomic, so any
+    number of connections, or processes, can reserve codes at once without
+    being handed the same code twice.
+
+    Sequences are updated on their own autocommitted connection, so a
+    reservation never waits for, or is undone with, the transaction of the
+    phase that made it. Codes that are reserved but not used are skipped.
+    A sequence is seeded from the table as the phase's own connection sees
+    it, since the phase may have inserted rows it has not yet committed.
+
+    Arguments:
+    ==========
+        connect (callable): returns a new connection, with autocommit on
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._conn = None
+        # (table, column): (prefix, padding) for each sequence already seeded
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, table, column, num, conn=None):
+        """Reserves the next `num` codes for a column.
+
+        Arguments:
+        ==========
+            table (str): name of the table the codes are for, e.g. 'mpce.agent'
+            column (str): name of the column the codes are for
+            num (int): number of codes to reserve
+            conn (MySQLConnection): connection to read the table on, if the
+                sequence must be seeded. Defaults to the allocator's own
+                connection, which only sees committed rows
+
+        Returns:
+        ==========
+            A list of `num` new codes
+        """
+
+        if num <= 0:
+            return []
+
+        with self._lock:
+            end = None
+            for _ in range(2):
+                prefix, padding = self._frame(table, column, conn)
+                with cursor(self._connection()) as cur:
+                    cur.execute("""
+                        UPDATE mpce.code_sequence
+                        SET next_value = LAST_INSERT_ID(next_value + %s)
+                        WHERE prefix = %s
+                    """, (num, prefix))
+                    if cur.rowcount:
+                        cur.execute('SELECT LAST_INSERT_ID()')
+                        (end,) = cur.fetchone()
+                        break
+                # The sequence has been reset since it was seeded
+                self._frames.pop((table, column), None)
+
+        if end is None:
+            raise RuntimeError(f'Could not reserve codes for {table}.{column}')
+        return [f'{prefix}{value:0{padding}d}' for value in range(end - num, end)]
+
+    def peek(self, table, column, conn=None):
+        """Returns the next value, prefix and number of digits of a column's codes, without reserving any.
+
+        `conn` is as for `reserve`."""
+
+        with self._lock:
+            prefix, padding = self._frame(table, column, conn)
+            with cursor(self._connection()) as cur:
+                cur.execute('SELECT next_value FROM mpce.code_sequence WHERE prefix = %s', (prefix,))
+                (next_value,) = cur.fetchone()
+        return next_value, prefix, padding
+
+    def forget(self):
+        """Forgets which sequences have been seeded, e.g. after `mpce.code_sequence` is emptied."""
+
+        with self._lock:
+            self._frames.clear()
+
+    def close(self):
+        """Closes the allocator's connection."""
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _frame(self, table, column, conn=None):
+        """Returns the prefix and number of digits of a column's codes, seeding its sequence if needed."""
+
+        key = (table, column)
+        if key not in self._frames:
+            with cursor(self._connection()) as cur:
+                cur.execute("""
+                    SELECT prefix, padding FROM mpce.code_sequence
+                    WHERE table_name = %s AND column_name = %s
+                """, key)
+                frame = cur.fetchone()
+                if frame is None:
+                    with cursor(conn if conn is not None else self._connection()) as read_cur:
+                        frame = self._seed(read_cur, cur, table, column)
+            self._frames[key] = tuple(frame)
+        return self._frames[key]
+
+    @staticmethod
+    def _seed(read_cur, cur, table, column):
+        """Starts a sequence after the highest code in a column. This scans the table, once.
+
+        The table is read on `read_cur`, and the sequence written on `cur`."""
+
+        read_cur.execute(f'SELECT {column} FROM {table} LIMIT 1')
+        first = read_cur.fetchone()
+        if first is None:
+            raise ValueError(f'Cannot work out the codes for {table}.{column}: the table is empty.')
+        prefix = re.match(r'[a-z]+', first[0]).group(0)
+
+        read_cur.execute(f"""
+            SELECT
+                MAX(CAST(REGEXP_SUBSTR({column}, '[0-9]+') AS UNSIGNED)),
+                MAX(CHAR_LENGTH({column}))
+            FROM {table}
+            WHERE {column} LIKE %s
+        """, (prefix + '%',))
+        highest, width = read_cur.fetchone()
+
+        # If another connection seeded the sequence first, keep its values
+        cur.execute("""
+            INSERT IGNORE INTO mpce.code_sequence (
+                prefix, table_name, column_name, next_value, padding
+            )
+            VALUES (%s, %s, %s, %s, %s)
+        """, (prefix, table, column, int(highest or 0) + 1, width - len(prefix)))
+        cur.execute('SELECT prefix, padding FROM mpce.code_sequence WHERE prefix = %s', (prefix,))
+        return cur.fetchone()
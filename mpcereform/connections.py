@@ -0,0 +1,127 @@
+"""Pooled connections, prepared statements and context-managed cursors."""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from uuid import uuid1
+
+from mysql.connector.pooling import MySQLConnectionPool
+
+# The server will not prepare a statement with more placeholders than this
+MAX_PLACEHOLDERS = 65535
+
+@contextmanager
+def cursor(conn, **kwargs):
+    """Yields a cursor on a connection, closing it afterwards.
+
+    Takes the same keyword arguments as `conn.cursor()`."""
+
+    cur = conn.cursor(**kwargs)
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+class StatementCache():
+    """Keeps the most recently used prepared statements on one connection.
+
+    The server parses each statement once, when it is first prepared. Each
+    later execution only sends the parameters.
+
+    Arguments:
+    ==========
+        conn (MySQLConnection): connection to prepare the statements on
+        size (int): the maximum number of statements to keep prepared
+    """
+
+    def __init__(self, conn, size=32):
+        self.conn = conn
+        self.size = size
+        self._cursors = OrderedDict()
+
+    def execute(self, operation, params=()):
+        """Executes a statement, preparing it first if it is not already prepared.
+
+        Returns:
+        ==========
+            The prepared cursor, for reading the rowcount or results
+        """
+
+        if operation in self._cursors:
+            self._cursors.move_to_end(operation)
+            # The connector re-prepares unless it is given the same string object
+            operation, cur = self._cursors[operation]
+        else:
+            cur = self.conn.cursor(prepared=True)
+            self._cursors[operation] = (operation, cur)
+            if len(self._cursors) > self.size:
+                _, (_, oldest) = self._cursors.popitem(last=False)
+                oldest.close()
+
+        cur.execute(operation, params)
+        return cur
+
+    def close(self):
+        """Deallocates every prepared statement."""
+
+        for _, cur in self._cursors.values():
+            cur.close()
+        self._cursors.clear()
+
+class ConnectionPool():
+    """A fixed-size pool of connections, which waits for a free connection if none are left.
+
+    The connections are opened when the first one is checked out.
+
+    Arguments:
+    ==========
+        size (int): the number of connections in the pool (at most 32)
+        **connect_args: arguments for each connection, as for `mysql.connect`
+    """
+
+    def __init__(self, size=5, **connect_args):
+        self.size = size
+        self._connect_args = connect_args
+        self._pool = None
+        self._lock = threading.Lock()
+        self._free = threading.BoundedSemaphore(size)
+
+    def get_connection(self):
+        """Checks out a connection. Call its `close()` method to return it to the pool."""
+
+        self._free.acquire()
+        try:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = MySQLConnectionPool(
+                        pool_name=f'mpce_{uuid1().hex}', pool_size=self.size,
+                        **self._connect_args)
+            conn = self._pool.get_connection()
+        except Exception:
+            self._free.release()
+            raise
+
+        # Free the slot when the connection is returned
+        release = conn.close
+        released = threading.Event()
+        def close():
+            if released.is_set():
+                return
+            released.set()
+            try:
+                release()
+            finally:
+                self._free.release()
+        conn.close = close
+
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Yields a connection from the pool, returning it afterwards."""
+
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
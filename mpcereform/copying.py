@@ -0,0 +1,249 @@
+"""Copying of large tables in key-range chunks, over several connections at once.
+
+A single `INSERT ... SELECT` over a large table holds its locks and undo
+log until the whole table is copied, and reports nothing until it is done.
+A `CopyJob` instead splits the source table into ranges of an indexed
+column, and `copy_chunks` copies each range in its own statement, so each
+transaction holds at most one chunk of rows:
+
+    job = CopyJob('mpce.stn_order', ['order_code', ...], 'manuscripts.orders')
+    job.plan(cur, chunk_size=50000)
+    copy_chunks([job], pool.connection, workers=4)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mpcereform.connections import cursor
+
+class CopyJob():
+    """Copies one source table into one target table.
+
+    Arguments:
+    ==========
+        target (str): the table to insert into
+        columns (sequence): the target columns
+        source (str): the table to copy from, which is given the alias `src`
+        select (str): expressions over `src` and any joined tables, one per
+            target column
+        joins (str): joins to add to the source, e.g. to recode a column
+        prepare (callable): called with a cursor on every connection that
+            copies chunks of this job, before its first chunk, e.g. to create
+            the temporary tables in `joins`. It must be safe to call twice on
+            the same connection
+    """
+
+    def __init__(self, target, columns, source, select='src.*', joins='', prepare=None):
+        self.target = target
+        self.columns = list(columns)
+        self.source = source
+        self.select = select
+        self.joins = joins
+        self.prepare = prepare
+        self.key = None
+        self.target_key = None
+        self.ranges = [(None, None)]
+
+    def plan(self, cur, chunk_size):
+        """Splits the source into ranges of about `chunk_size` rows.
+
+        The ranges are of the leading column of the source's primary key, or
+        of another index. If the source has no index, it is copied in one chunk.
+        The target column the key is copied into is found too, so that the
+        rows of a chunk can be deleted again (see `delete_statement`).
+
+        Returns:
+        ==========
+            The number of chunks
+        """
+
+        self.key = source_key(cur, self.source)
+        if self.key is None:
+            self.ranges = [(None, None)]
+            return len(self.ranges)
+        self.target_key = self._target_key(cur)
+
+        bounds = []
+        lower = None
+        while True:
+            if lower is None:
+                cur.execute(f'SELECT `{self.key}` FROM {self.source} WHERE `{self.key}` IS NOT NULL '
+                            f'ORDER BY `{self.key}` LIMIT 1 OFFSET %s', (chunk_size,))
+            else:
+                # Each bound is greater than the last, even if many rows share a value
+                cur.execute(f'SELECT `{self.key}` FROM {self.source} WHERE `{self.key}` > %s '
+                            f'ORDER BY `{self.key}` LIMIT 1 OFFSET %s', (lower, chunk_size - 1))
+            row = cur.fetchone()
+            if row is None:
+                break
+            lower = row[0]
+            bounds.append(lower)
+
+        lowers = [None] + bounds
+        uppers = bounds + [None]
+        self.ranges = list(zip(lowers, uppers))
+        return len(self.ranges)
+
+    def _target_key(self, cur):
+        """Returns the target column that the source key is copied into, if it can be told."""
+
+        if self.select != 'src.*':
+            return self.key if self.key in self.columns else None
+        # The source's columns are copied in order
+        schema, name = self.source.split('.')
+        cur.execute("""
+            SELECT ORDINAL_POSITION FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (schema, name, self.key))
+        row = cur.fetchone()
+        if row is None or row[0] > len(self.columns):
+            return None
+        return self.columns[row[0] - 1]
+
+    def statement(self, lower, upper):
+        """Returns the INSERT statement and parameters that copy one range."""
+
+        where, params = _range_condition(f'src.`{self.key}`', lower, upper)
+        return (f"""
+            INSERT INTO {self.target} ({', '.join(self.columns)})
+            SELECT {self.select}
+            FROM {self.source} AS src
+            {self.joins}
+            {where}
+        """, params)
+
+    def delete_statement(self, lower, upper):
+        """Returns the DELETE statement and parameters that remove the rows one range copied.
+
+        Returns None if the target column of the key is not known."""
+
+        if self.key is None:
+            return f'DELETE FROM {self.target}', []
+        if self.target_key is None:
+            return None
+        where, params = _range_condition(f'`{self.target_key}`', lower, upper)
+        return f'DELETE FROM {self.target} {where}', params
+
+def _range_condition(key, lower, upper):
+    """Returns the WHERE clause and parameters selecting one range of a key."""
+
+    conditions = []
+    params = []
+    if lower is not None:
+        conditions.append(f'{key} >= %s')
+        params.append(lower)
+    if upper is not None:
+        # The first range also takes the rows with no key
+        conditions.append(f'({key} < %s OR {key} IS NULL)' if lower is None else f'{key} < %s')
+        params.append(upper)
+    where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+    return where, params
+
+def source_key(cur, table):
+    """Returns the column to split a table on, or None if it has no index.
+
+    This is the leading column of the primary key, or else of a unique
+    index, or else of any index."""
+
+    schema, name = table.split('.')
+    cur.execute("""
+        SELECT COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND SEQ_IN_INDEX = 1
+        ORDER BY INDEX_NAME = 'PRIMARY' DESC, NON_UNIQUE, INDEX_NAME
+        LIMIT 1
+    """, (schema, name))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def copy_chunks(jobs, connect, workers=1, commit=True, undo=False):
+    """Copies every chunk of the jobs, on up to `workers` connections at once.
+
+    Each chunk is copied by one statement and, if `commit` is set,
+    committed straight away. The progress of each job is printed as its
+    chunks finish. If a chunk fails, no more chunks are started, and the
+    error is raised once the running chunks have finished.
+
+    Arguments:
+    ==========
+        jobs (list): CopyJobs, which have been planned
+        connect (callable): returns a context manager yielding a connection
+        workers (int): the number of connections to copy on at once
+        commit (bool): whether to commit after each chunk
+        undo (bool): if a chunk fails, whether to delete the rows of the
+            chunks already committed, range by range, before raising
+
+    Returns:
+    ==========
+        A dict mapping each target table to the number of rows copied into it
+    """
+
+    chunks = [(job, lower, upper) for job in jobs for lower, upper in job.ranges]
+    totals = {job.target: len(job.ranges) for job in jobs}
+    done = {job.target: 0 for job in jobs}
+    copied = {job.target: 0 for job in jobs}
+    committed = []
+    lock = threading.Lock()
+    failed = threading.Event()
+    pending = iter(chunks)
+
+    def next_chunk():
+        with lock:
+            if failed.is_set():
+                return None
+            return next(pending, None)
+
+    def copy():
+        prepared = set()
+        with connect() as conn, cursor(conn) as cur:
+            while True:
+                chunk = next_chunk()
+                if chunk is None:
+                    return
+                job, lower, upper = chunk
+                try:
+                    if job.prepare is not None and id(job) not in prepared:
+                        job.prepare(cur)
+                        prepared.add(id(job))
+                    cur.execute(*job.statement(lower, upper))
+                    rows = cur.rowcount
+                    if commit:
+                        conn.commit()
+                except Exception:
+                    failed.set()
+                    raise
+                with lock:
+                    committed.append(chunk)
+                    done[job.target] += 1
+                    copied[job.target] += rows
+                    print(f'  {job.target}: chunk {done[job.target]}/{totals[job.target]} '
+                          f'copied ({copied[job.target]} rows so far)')
+
+    workers = max(1, min(workers, len(chunks)))
+    try:
+        if workers == 1:
+            copy()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for future in [pool.submit(copy) for _ in range(workers)]:
+                    future.result()
+    except Exception:
+        if undo and commit and committed:
+            _delete_chunks(committed, connect)
+        raise
+
+    return copied
+
+def _delete_chunks(chunks, connect):
+    """Deletes the rows copied by some chunks, e.g. after another chunk has failed."""
+
+    with connect() as conn, cursor(conn) as cur:
+        for job, lower, upper in chunks:
+            delete = job.delete_statement(lower, upper)
+            if delete is not None:
+                cur.execute(*delete)
+        conn.commit()
+    for target in sorted({job.target for job, _, _ in chunks if job.delete_statement(None, None) is None}):
+        print(f'  WARNING: the rows copied into {target} cannot be told apart '
+              f'from its other rows, so they were not deleted.')
+    print(f'  The rows of {len(chunks)} copied chunks were deleted.')
@@ -3,14 +3,38 @@
 #pylint:disable=line-too-long;
 #pylint:disable=too-many-lines;
 
+import copy
+import csv
+import hashlib
+import os
 import re
-from importlib.resources import read_text, path
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from importlib.resources import read_text
+from time import perf_counter
 from uuid import uuid1
 
 import mysql.connector as mysql
-from openpyxl import load_workbook
 
-from mpcereform.utils import parse_date, convert_colname
+from mpcereform import connections
+from mpcereform.agent_index import AgentIndex
+from mpcereform.bulk import BulkWriter
+from mpcereform.codes import CodeAllocator
+from mpcereform.copying import CopyJob, copy_chunks
+from mpcereform.dialects import EMBEDDED, MYSQL
+from mpcereform.export import export_table, parquet_available, table_columns
+from mpcereform.instrument import Instrument
+from mpcereform.lookups import LookupRegistry
+from mpcereform.mapping import SheetMapping
+from mpcereform.pipeline import chunked, map_chunks, prefetch
+from mpcereform.records import Condemnation, Consignment, ConsignmentClient, DarntonOrder, \
+    NewPlace, PermissionClient, PermissionEdition, PermissionGrant, ProvincialInspection
+from mpcereform.scheduler import Scheduler
+from mpcereform.snapshots import DEFAULT_DIRECTORY, file_hash
+from mpcereform.splitting import split_list, split_list_cte
+from mpcereform.utils import parse_dates, convert_colname
+from mpcereform.workbooks import WorkbookCache
 
 class LocalDB():
     """Class for managing connection to database server"""
@@ -64,6 +88,32 @@ class LocalDB():
         'bilan (adjustment)':3
     }
 
+    UNIT_ALIASES = {
+        # English names of units in the Paris stock sales
+        'packet': 'paquet',
+        'copies': 'copie',
+        'plates': 'planches',
+        'basket': 'panier',
+        'vols': 'vols separés',
+        'crate': 'ballot'
+    }
+
+    STOCK_SALE_UNITS = (
+        # Units by which the Paris stock sales are coded. Any other value,
+        # including the French names of units and 'mixed', is left NULL
+        'packet', 'copies', 'privilege', 'plates', 'basket', 'vols', 'crate'
+    )
+
+    LOOKUP_TABLES = {
+        # Tables that code values by name: (id column, name column, aliases)
+        'transaction_direction': ('ID', 'name', TRANSACTION_CODING),
+        'author_type': ('id', 'type', None),
+        'sale_type': ('ID', 'type', None),
+        'unit': ('ID', 'name', UNIT_ALIASES),
+        'auction_role': ('ID', 'role', None),
+        'judgment': ('ID', 'name', None)
+    }
+
     DARNTON_CLIENTS = {
         # Key for client information in Robert Darnton's STN sample
         'Bergeret': 'cl0335',
@@ -84,6 +134,62 @@ class LocalDB():
         'Sens': 'cl2067'
     }
 
+    AGENT_REFERENCES = {
+        # Columns that hold STN client codes until `resolve_agents` replaces them
+        # with agent codes. Each table's columns are resolved in a single UPDATE.
+        'mpce.consignment': ('other_stakeholder', 'returned_to_agent'),
+        'mpce.consignment_addressee': ('agent_code',),
+        'mpce.consignment_signatory': ('agent_code',),
+        'mpce.consignment_handling_agent': ('agent_code',),
+        'mpce.stamping': ('permitted_dealer', 'attending_inspector', 'attending_adjoint'),
+        'mpce.parisian_stock_auction': ('previous_owner',),
+        'mpce.auction_administrator': ('administrator_id',),
+        'mpce.parisian_stock_sale': ('purchaser',),
+        'mpce.permission_simple_grant': ('licensee',)
+    }
+
+    EVENT_TABLES = {
+        # Tables of events in the history of the book, and what happened to the books
+        'mpce.banned_list_record': 'banned by the authorities',
+        'mpce.bastille_register_record': 'sequestered in the Bastille',
+        'mpce.condemnation': 'condemned by the authorities',
+        'mpce.consignment': 'intercepted in a suspect consignment by Paris customs',
+        'mpce.parisian_stock_sale': 'sold, or the right to print them transferred, at the Paris stock sales',
+        'mpce.permission_simple_grant': 'licensed under the permission simple',
+        'mpce.provincial_inspection': 'inspected by provincial authorities',
+        'mpce.stamping': 'stamped to legalise their sale, though they were pirated',
+        'mpce.stn_transaction': (
+            'bought, sold, sent, returned, printed, warehoused or otherwise\n'
+            '         dealt with by the Société Typographique de Neuchâtel'
+        ),
+        'mpce.stn_darnton_sample_order': 'ordered by one of Robert Darnton\'s selected buyers'
+    }
+
+    COUNTED_TABLES = (
+        # Tables whose row counts are kept in `mpce.statistic`
+        'mpce.work', 'mpce.work_keyword', 'mpce.keyword', 'mpce.edition', 'mpce.agent',
+        'mpce.stn_client_agent', 'mpce.place', *EVENT_TABLES
+    )
+
+    STATISTICS = {
+        # Other statistics kept in `mpce.statistic`: the tables each one reads,
+        # and a query returning its (subject, value) rows
+        'authors': ({'mpce.edition_author', 'mpce.author_type'}, """
+            SELECT at.type AS subject, COUNT(*) AS value
+            FROM mpce.edition_author AS ea
+                JOIN mpce.author_type AS at
+                    ON ea.author_type = at.ID
+            GROUP BY at.type
+        """),
+        'agents': ({'mpce.agent'}, """
+            SELECT
+                IF(corporate_entity IS TRUE, 'corporate entities', 'persons') AS subject,
+                COUNT(*) AS value
+            FROM mpce.agent
+            GROUP BY subject
+        """)
+    }
+
     STRING_IDS = {
         'work': 'work_code',
         'edition': 'edition_code',
@@ -94,8 +200,204 @@ class LocalDB():
         'profession': 'profession_code'
     }
 
-    def __init__(self, user='root', host='127.0.0.1', password=None):
-        self.conn = mysql.connect(user=user, host=host, password=password)
+    SPREADSHEET_READS = {
+        # Number of times each spreadsheet is read during a full build
+        ('consignments.xlsx', 'List of new places'): 1,
+        ('consignments.xlsx', 'Confiscations master'): 6,
+        ('consignments.xlsx', 'New professions'): 1,
+        ('consignments.xlsx', 'People Final'): 1,
+        ('permission_simple.xlsx', 'Licences'): 1,
+        ('permission_simple.xlsx', 'Editions'): 1,
+        ('permission_simple.xlsx', 'New Professions'): 1,
+        ('permission_simple.xlsx', 'Clients'): 1,
+        ('condemnations.xlsx', 'Sheet1'): 1,
+        ('CommandesLibrairesfrancais.xlsx', 'FicheSauvegarde'): 1,
+        ('provincial_inspections.xlsx', 'Amalgamated sheet'): 1,
+        ('author_person.xlsx', 'author_person'): 1,
+        ('clients_without_person_codes.xlsx', 'clients_without_person_codes'): 1
+    }
+
+    PHASES = {
+        # The phases of a full build, in sequential order, with the tables each one
+        # reads and writes. Phases that touch none of the same tables (or only
+        # read them) may run concurrently. 'spreadsheets' lists the workbooks a
+        # phase reads, 'ddl' marks phases that change the schema, which commits
+        # implicitly, and 'unique_checks' marks phases that rely on unique indexes
+        # to skip duplicate rows.
+        'import_works': {
+            'unique_checks': True,
+            'reads': {
+                'manuscripts.manuscript_books', 'manuscripts.manuscript_cat_fuzzy',
+                'manuscripts.keywords', 'manuscripts.parisian_keywords', 'manuscripts.tags',
+                'manuscripts.keyword_free_associations', 'manuscripts.keyword_tree_associations'
+            },
+            'writes': {
+                'mpce.work', 'mpce.keyword', 'mpce.work_keyword', 'mpce.parisian_category',
+                'mpce.tag', 'mpce.keyword_free_association', 'mpce.keyword_tree_association'
+            }
+        },
+        'import_editions': {
+            'reads': {'manuscripts.manuscript_books_editions'},
+            'writes': {'mpce.edition'}
+        },
+        'import_places': {
+            'spreadsheets': {'consignments.xlsx'},
+            'reads': {'manuscripts.places'},
+            'writes': {'mpce.place'}
+        },
+        'import_stn': {
+            'reads': {
+                'manuscripts.transactions', 'manuscripts.clients', 'mpce.transaction_direction'
+            } | set(UNCHANGED_TABLES.values()),
+            'writes': {'mpce.stn_transaction', 'mpce.stn_client'} | set(UNCHANGED_TABLES)
+        },
+        'import_new_tables': {
+            'reads': {
+                'manuscripts.manuscript_events', 'manuscripts.manuscript_sales_events',
+                'manuscripts.manuscript_events_sales', 'mpce.auction_role', 'mpce.sale_type',
+                'mpce.unit'
+            },
+            'writes': {
+                'manuscripts.manuscript_titles_illegal', 'mpce.stamping', 'mpce.banned_list_record',
+                'mpce.bastille_register_record', 'mpce.parisian_stock_auction',
+                'mpce.auction_administrator', 'mpce.parisian_stock_sale'
+            }
+        },
+        'import_data_spreadsheets': {
+            'spreadsheets': {
+                'consignments.xlsx', 'permission_simple.xlsx', 'condemnations.xlsx',
+                'CommandesLibrairesfrancais.xlsx', 'provincial_inspections.xlsx'
+            },
+            'reads': {'mpce.place'},
+            'writes': {
+                'mpce.consignment', 'mpce.consignment_addressee', 'mpce.consignment_signatory',
+                'mpce.consignment_handling_agent', 'mpce.permission_simple_grant', 'mpce.edition',
+                'mpce.condemnation', 'mpce.stn_darnton_sample_order', 'mpce.provincial_inspection'
+            }
+        },
+        'build_indexes': {
+            'ddl': True,
+            # Every table with an index in `sql/indexes.sql`
+            'writes': {
+                'mpce.work_keyword', 'mpce.stn_transaction', 'mpce.consignment',
+                'mpce.consignment_addressee', 'mpce.consignment_signatory',
+                'mpce.consignment_handling_agent', 'mpce.stamping', 'mpce.parisian_stock_auction',
+                'mpce.auction_administrator', 'mpce.parisian_stock_sale',
+                'mpce.permission_simple_grant', 'mpce.stn_client_agent', 'mpce.agent_address',
+                'mpce.agent_profession', 'mpce.edition_author', 'mpce.is_member_of'
+            } | set(UNCHANGED_TABLES) - {'mpce.stn_order'}
+        },
+        'resolve_agents': {
+            'unique_checks': True,
+            'spreadsheets': {
+                'consignments.xlsx', 'permission_simple.xlsx', 'author_person.xlsx',
+                'clients_without_person_codes.xlsx'
+            },
+            'reads': {
+                'manuscripts.people', 'manuscripts.clients', 'manuscripts.clients_people',
+                'manuscripts.clients_addresses', 'manuscripts.professions',
+                'manuscripts.people_professions', 'manuscripts.manuscript_authors',
+                'manuscripts.manuscript_books_authors', 'manuscripts.manuscript_dealers',
+                'manuscripts.manuscript_agents_inspectors', 'mpce.stn_client', 'mpce.author_type'
+            },
+            'writes': {
+                'mpce.agent', 'mpce.stn_client_agent', 'mpce.profession', 'mpce.agent_profession',
+                'mpce.code_sequence', 'mpce.edition_author', 'mpce.agent_address', 'mpce.is_member_of',
+                'mpce.consignment', 'mpce.consignment_addressee', 'mpce.consignment_signatory',
+                'mpce.consignment_handling_agent', 'mpce.stamping', 'mpce.parisian_stock_auction',
+                'mpce.auction_administrator', 'mpce.parisian_stock_sale',
+                'mpce.permission_simple_grant'
+            }
+        },
+        'create_triggers': {
+            'ddl': True,
+            # The triggers number new rows from the codes already in each table
+            'reads': {f'mpce.{table}' for table in STRING_IDS} | {'mpce.code_sequence'},
+            'writes': {f'mpce.{table}' for table in STRING_IDS} | {'mpce.code_sequence'}
+        }
+    }
+
+    DATE_PARITY_CASES = (
+        # Date strings that exercise each branch of `parse_date`
+        '12 Mar 1775', '3rd Jan 1780', 'Sept 1 1779', '31 Feb 1780', '29 Feb 1780',
+        '29 Feb 1781', 'Mar 1775', '1775', '12 1775', 'Paris, 3 Mar 1780', 'xx', ' ',
+        '01 Dec 0999', '12 Mar 0075', '12 mar 1775', '12 MAR 1775', '1775-03-12', '12th March 1775 or 1776'
+    )
+
+    COMMIT_POLICIES = {
+        # When the import phases commit their work
+        'statement': 'after every statement',
+        'phase': 'at the end of each phase',
+        'build': 'once, at the end of the build, rolling the whole build back if a phase fails'
+    }
+
+    LOAD_TUNING = {
+        # Session variables relaxed while a build is running, if tune_session is set
+        'unique_checks': 0,
+        'foreign_key_checks': 0,
+        'sql_log_bin': 0
+    }
+
+    GLOBAL_LOAD_TUNING = {
+        # Server variables relaxed while a build is running, if tune_session is set.
+        # These affect every connection to the server.
+        'innodb_flush_log_at_trx_commit': 2
+    }
+
+    # Dialect of the statements that differ between databases. The import
+    # phases read `manuscripts`, so they always run on MySQL/MariaDB
+    dialect = MYSQL
+
+    def __init__(self, user='root', host='127.0.0.1', password=None,
+                 snapshot_dir=DEFAULT_DIRECTORY, batch_size=1000, local_infile=True,
+                 pool_size=5, commit_policy='statement', tune_session=False,
+                 incremental=False, spreadsheet_dir=None, propose_matches=False,
+                 copy_chunk_size=50000, keep_phases=False):
+        if commit_policy not in self.COMMIT_POLICIES:
+            raise ValueError(f'Unknown commit policy: {commit_policy}')
+
+        self._connect_args = {
+            'user': user, 'host': host, 'password': password,
+            'allow_local_infile': local_infile
+        }
+        # Every statement on every connection is timed
+        self.instrument = Instrument()
+        self.conn = self.instrument.wrap(mysql.connect(**self._connect_args))
+        self.statements = connections.StatementCache(self.conn)
+        # New codes are reserved on a separate, autocommitted connection
+        self.codes = CodeAllocator(lambda: self.instrument.wrap(
+            mysql.connect(autocommit=True, **self._connect_args)))
+        self._is_worker = False
+        # Pool of connections to `mpce` for workers, opened when first needed
+        self.pool = connections.ConnectionPool(pool_size, database='mpce', **self._connect_args)
+        # Copying has its own pool, so that chunks never wait for the
+        # connections held by the phases that are running (see `copy_tables`)
+        self.copy_pool = connections.ConnectionPool(
+            pool_size, database='mpce', **self._connect_args)
+        self.pool_size = pool_size
+        self._pool_lock = threading.Lock()
+        self._warned_build_policy = False
+        self.workbooks = WorkbookCache(self.SPREADSHEET_READS, snapshot_dir=snapshot_dir,
+                                       directory=spreadsheet_dir)
+        self.batch_size = batch_size
+        # Rows per statement when copying large tables (see `copy_tables`)
+        self.copy_chunk_size = copy_chunk_size
+        self.local_infile = local_infile
+        self.commit_policy = commit_policy
+        # Under the 'build' policy, whether a failed phase only rolls back to
+        # a savepoint taken before it, and the earlier phases are committed
+        self.keep_phases = keep_phases
+        self.tune_session = tune_session
+        self.incremental = incremental
+        # Possible matches between new authors or clients and existing agents
+        self.propose_matches = propose_matches
+        self.match_proposals = []
+        # Whether the server supports WITH RECURSIVE, once known
+        self._recursive_cte = None
+        # Lookup tables, read once when first needed
+        self.lookups = LookupRegistry(self.LOOKUP_TABLES)
+        # Whether dates are parsed on the server by `mpce.parse_date` (see `create_routines`)
+        self.sql_dates = True
 
         # Check databases exist
         cur = self.conn.cursor()
@@ -104,7 +406,10 @@ class LocalDB():
 
         def check_for_dbs(msg=None):
             # Check for mpce
-            if 'mpce' in db_list:
+            if 'mpce' in db_list and self.incremental:
+                print("Existing MPCE database found. Updating it incrementally...")
+                cur.execute("USE mpce")
+            elif 'mpce' in db_list:
                 if msg is None:
                     msg = "Existing MPCE database found. Overwrite? [y/n] "
                 resp = input(msg)
@@ -129,23 +434,629 @@ class LocalDB():
     def create_new_db(self):
         """Rebuilds the new MPCE database from schema"""
 
-        # Read in schema
-        schema_raw = read_text('mpcereform.sql', 'mpce_database.sql')
+        # Execute
+        with self.cursor() as cur:
+            for stmt in self._read_sql('mpce_database.sql'):
+                cur.execute(stmt)
+        self.conn.commit()
+        self.create_routines()
 
-        # Strip multiline comments
-        # Use a non-greedy match, so it will find each seperate comment
-        sql_com_rgx = re.compile(r'/\*.+?\*/', re.DOTALL)
-        schema_stripped = sql_com_rgx.sub('', schema_raw)
+        self.defer_indexes()
 
-        # Split on semicolons
-        schema_split = schema_stripped.split(';')
+    def create_routines(self):
+        """(Re)creates the stored function in `sql/parse_date.sql`.
 
-        # Execute
-        cur = self.conn.cursor()
-        for stmt in schema_split:
-            cur.execute(stmt)
+        NB: Creating a function needs the CREATE ROUTINE privilege and, if the
+        server has binary logging on, the SUPER privilege, unless the server
+        sets `log_bin_trust_function_creators`. The function calls
+        REGEXP_SUBSTR, which needs MySQL 8.0 or MariaDB 10.0.5 or later.
+
+        If the function cannot be created, or fails when it is called, the
+        client and person dates are parsed in Python instead, as
+        `self.sql_dates` records.
+
+        Returns:
+        ==========
+            Whether the function was created
+        """
+
+        routine = re.sub(r'/\*.+?\*/', '', read_text('mpcereform.sql', 'parse_date.sql'),
+                         flags=re.DOTALL)
+        with self.cursor() as cur:
+            try:
+                cur.execute('DROP FUNCTION IF EXISTS mpce.parse_date')
+                cur.execute(routine)
+                # A missing REGEXP_SUBSTR is only reported when the function runs
+                cur.execute("SELECT mpce.parse_date('12 Mar 1775')")
+                cur.fetchall()
+            except mysql.Error as err:
+                print(f'Function `mpce.parse_date` could not be created: {err}')
+                print('Dates will be parsed in Python instead.')
+                self.sql_dates = False
+                return False
+        self.sql_dates = True
+        print('Function `mpce.parse_date` created.')
+        return True
+
+    def supports_recursive_cte(self):
+        """Checks whether the server can split lists with `split_list_cte`.
+
+        That needs recursive common table expressions and REGEXP_REPLACE, which
+        MySQL 8.0 and MariaDB 10.2.2 onwards have. The answer is cached."""
+
+        if self._recursive_cte is None:
+            with self.cursor() as cur:
+                try:
+                    cur.execute(f"""
+                        WITH RECURSIVE {split_list_cte('probe', "(SELECT ' a, b' AS lst) AS src", 'lst', 'lst')}
+                        SELECT item FROM probe
+                    """)
+                    cur.fetchall()
+                    self._recursive_cte = True
+                except mysql.ProgrammingError:
+                    self._recursive_cte = False
+        return self._recursive_cte
+
+    def check_date_parity(self):
+        """Checks that `mpce.parse_date` parses every source date as `utils.parse_date` does.
+
+        Compares the two on every distinct client and person date in the
+        `manuscripts` database, and on DATE_PARITY_CASES.
+
+        Returns:
+        ==========
+            A list of (date_string, python_result, sql_result) for each date
+            they disagree on
+        """
+
+        columns = self._source_columns('manuscripts.clients')
+        with self.cursor() as cur:
+            cur.execute(f"""
+                SELECT `{columns[9]}` FROM manuscripts.clients
+                UNION SELECT `{columns[10]}` FROM manuscripts.clients
+                UNION SELECT birth_date FROM manuscripts.people
+                UNION SELECT death_date FROM manuscripts.people
+            """)
+            samples = sorted({value for (value,) in cur.fetchall() if isinstance(value, str)}
+                             | set(self.DATE_PARITY_CASES))
+            mismatches = []
+            for start in range(0, len(samples), self.batch_size):
+                batch = samples[start:start + self.batch_size]
+                cur.execute(
+                    'SELECT ' + ', '.join(['CAST(mpce.parse_date(%s) AS CHAR)'] * len(batch)),
+                    batch)
+                for value, python, sql in zip(batch, parse_dates(batch), cur.fetchone()):
+                    if python != sql:
+                        mismatches.append((value, python, sql))
+
+        print(f'{len(samples)} distinct dates checked: {len(mismatches)} parsed differently in SQL.')
+        return mismatches
+
+    def _parse_date_columns(self, rows, columns):
+        """Yields rows with the date strings in some columns parsed by `utils.parse_dates`.
+
+        This is the fallback for when `mpce.parse_date` cannot be created.
+
+        Arguments:
+        ==========
+            rows (iterable): row tuples
+            columns (sequence): indexes of the columns of date strings
+        """
+
+        def parse(chunk):
+            parsed = [parse_dates([row[col] for row in chunk]) for col in columns]
+            for row, dates in zip(chunk, zip(*parsed)):
+                row = list(row)
+                for col, value in zip(columns, dates):
+                    row[col] = value
+                yield tuple(row)
+
+        return map_chunks(parse, rows, self.batch_size)
+
+    def _source_columns(self, table):
+        """Returns the names of a table's columns, in order."""
+
+        schema, name = table.split('.')
+        with self.cursor() as cur:
+            cur.execute("""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+                ORDER BY ORDINAL_POSITION
+            """, (schema, name))
+            return [col for (col,) in cur.fetchall()]
+
+    def defer_indexes(self):
+        """Drops the unique indexes that `build_indexes` rebuilds after the data is loaded."""
+
+        with self.cursor() as cur:
+            for table, index, _, unique in self._indexes():
+                if unique:
+                    cur.execute(f'ALTER TABLE {table} DROP INDEX {index}')
         self.conn.commit()
-        cur.close()
+        print('Unique indexes dropped until the data is loaded.')
+
+    def drop_indexes(self):
+        """Drops every index in `sql/indexes.sql` that exists, so `build_indexes` can run again."""
+
+        with self.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT CONCAT(TABLE_SCHEMA, '.', TABLE_NAME), INDEX_NAME
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = 'mpce'
+            """)
+            existing = set(cur.fetchall())
+            for table, index, _, _ in self._indexes():
+                if (table, index) in existing:
+                    cur.execute(f'ALTER TABLE {table} DROP INDEX {index}')
+        self.conn.commit()
+
+    def build_indexes(self):
+        """Builds the indexes in `sql/indexes.sql`, reporting the time spent on each.
+
+        The unique indexes are deferred until the data is loaded, so the tables
+        are first checked for rows that would break them. If there are any,
+        they are reported with the phases that load each table, and no index
+        is built."""
+
+        print('Building indexes...')
+        with self.cursor() as cur:
+            problems = [self._describe_duplicates(table, stmt, duplicates)
+                        for table, stmt, duplicates in self.find_duplicates(cur)]
+        if problems:
+            raise ValueError('Cannot build the unique indexes, because of duplicate rows:\n'
+                             + '\n'.join(problems))
+
+        total = 0
+        with self.cursor() as cur:
+            for table, index, stmt, _ in self._indexes():
+                start = perf_counter()
+                cur.execute(stmt)
+                elapsed = perf_counter() - start
+                total += elapsed
+                print(f'{elapsed:8.3f}s  index `{index}` on `{table}`')
+        self._commit()
+        print(f'All indexes built in {total:.3f}s.')
+
+    def find_duplicates(self, cur, limit=10):
+        """Finds rows that would break the deferred unique indexes.
+
+        Rows with a NULL in any key column are ignored, as the indexes allow them.
+
+        Arguments:
+        ==========
+            cur (MySQLCursor): cursor to query the tables on
+            limit (int): most duplicate keys to return per index
+
+        Returns:
+        ==========
+            A list of (table, index statement, duplicates) for each index that
+            would fail, where duplicates is a list of (key values..., count)
+        """
+
+        found = []
+        for table, _, stmt, unique in self._indexes():
+            if not unique:
+                continue
+            columns = re.search(r'\(([^)]*)\)', stmt).group(1)
+            not_null = ' AND '.join([f'{col.strip()} IS NOT NULL' for col in columns.split(',')])
+            cur.execute(f"""
+                SELECT {columns}, COUNT(*)
+                FROM {table}
+                WHERE {not_null}
+                GROUP BY {columns}
+                HAVING COUNT(*) > 1
+                LIMIT {int(limit)}
+            """)
+            duplicates = cur.fetchall()
+            if duplicates:
+                found.append((table, stmt, duplicates))
+        return found
+
+    def _describe_duplicates(self, table, stmt, duplicates):
+        """Describes the duplicates found by `find_duplicates` in one table."""
+
+        phases = sorted([name for name, spec in self.PHASES.items()
+                         if table in spec.get('writes', set()) and not spec.get('ddl')])
+        columns = re.search(r'\(([^)]*)\)', stmt).group(1)
+        lines = [f'  `{table}` ({columns}), loaded by {", ".join(phases) or "no phase"}:']
+        for *key, count in duplicates:
+            lines.append(f'      {count} rows with {tuple(key)}')
+        return '\n'.join(lines)
+
+    def _indexes(self):
+        """Yields the table, name and statement of each index in `sql/indexes.sql`, and whether it is unique."""
+
+        for stmt in self._read_sql('indexes.sql'):
+            mtch = re.search(
+                r'ALTER TABLE\s+(\S+)\s+ADD UNIQUE INDEX\s+(\w+)|CREATE INDEX\s+(\w+)\s+ON\s+(\S+)',
+                stmt
+            )
+            if mtch.group(1):
+                yield mtch.group(1), mtch.group(2), stmt, True
+            else:
+                yield mtch.group(4), mtch.group(3), stmt, False
+
+    def worker(self):
+        """Returns a copy of this LocalDB with its own pooled connection to `mpce`.
+
+        Workers share the spreadsheet cache, and are used to run phases concurrently.
+        If every pooled connection is in use, waits until one is returned. Call the
+        worker's `close()` method to return its connection."""
+
+        worker = copy.copy(self)
+        worker._is_worker = True #pylint:disable=protected-access;
+        worker.conn = self.instrument.wrap(self.pool.get_connection())
+        worker.statements = connections.StatementCache(worker.conn)
+        # A transaction cannot span connections, nor can other workers see
+        # uncommitted rows, so workers commit at least once per phase
+        if worker.commit_policy == 'build':
+            worker.commit_policy = 'phase'
+            with self._pool_lock:
+                if not self._warned_build_policy:
+                    self._warned_build_policy = True
+                    print("WARNING: the 'build' commit policy cannot span several connections, "
+                          "so phases run on workers will commit at the end of each phase, "
+                          "as under the 'phase' policy.")
+        # The pool resets session variables when the connection is returned
+        if self.tune_session:
+            self._set_variables(worker.conn, 'SESSION', self.LOAD_TUNING)
+        return worker
+
+    def close(self):
+        """Deallocates prepared statements and closes the connection.
+
+        Workers share the code allocator of the LocalDB that made them, so only
+        that LocalDB closes it."""
+
+        self.statements.close()
+        self.conn.close()
+        if not self._is_worker:
+            self.codes.close()
+
+    def cursor(self, **kwargs):
+        """Returns a context manager yielding a cursor, which is closed afterwards.
+
+        Takes the same keyword arguments as `MySQLConnection.cursor()`."""
+        return connections.cursor(self.conn, **kwargs)
+
+    def run_phase(self, name):
+        """Runs a single phase of the build, reporting how long it took.
+
+        If the phase fails, its uncommitted work is rolled back: the whole
+        phase under the 'phase' policy, and the whole build under the 'build'
+        policy. If `keep_phases` is set, the 'build' policy takes a savepoint
+        before each phase, and a failed phase is rolled back to it and the
+        earlier phases committed."""
+
+        spec = self.PHASES.get(name, {})
+        savepoint = self.commit_policy == 'build' and self.keep_phases and not spec.get('ddl')
+
+        print(f'\n[{name}] started')
+        start = perf_counter()
+        with self.instrument.phase(name, self.conn):
+            with self.cursor() as cur:
+                if savepoint:
+                    cur.execute(f'SAVEPOINT {name}')
+                if self.tune_session and spec.get('unique_checks'):
+                    cur.execute('SET SESSION unique_checks = 1')
+                try:
+                    getattr(self, name)()
+                    self.refresh_statistics(spec.get('writes', set()))
+                except Exception:
+                    if savepoint:
+                        cur.execute(f'ROLLBACK TO SAVEPOINT {name}')
+                        self.conn.commit()
+                    elif self.commit_policy in {'phase', 'build'}:
+                        self.conn.rollback()
+                    raise
+                finally:
+                    if self.tune_session and spec.get('unique_checks'):
+                        cur.execute(f"SET SESSION unique_checks = {self.LOAD_TUNING['unique_checks']}")
+                if savepoint:
+                    cur.execute(f'RELEASE SAVEPOINT {name}')
+            if self.commit_policy == 'phase':
+                self.conn.commit()
+        print(f'[{name}] finished in {perf_counter() - start:.1f}s')
+
+    def run_build(self, jobs=1):
+        """Runs every phase in `LocalDB.PHASES`, and records the fingerprints of the sources.
+
+        If `incremental` is set, only the phases whose sources have changed since
+        the last build are run, along with the phases that depend on them.
+
+        Arguments:
+        ==========
+            jobs (int): the number of phases that may run at once. If greater
+                than one, each phase runs on its own connection as soon as the
+                phases it depends on have finished, and the spreadsheets are
+                parsed in the background.
+        """
+
+        scheduler = Scheduler(self.PHASES)
+
+        phases = set(scheduler.order)
+        if self.incremental:
+            phases = self._plan_incremental(scheduler)
+            if not phases:
+                print('No sources have changed since the last build.')
+                return
+            self._reset_phases(scheduler, phases)
+            # The routines may have changed since the database was built
+            self.create_routines()
+            with self.cursor() as cur:
+                self._create_metadata_table(cur, 'statistic')
+
+        with self.load_tuning():
+            if jobs <= 1:
+                for name in scheduler.order:
+                    if name in phases:
+                        self.run_phase(name)
+            else:
+                self._run_concurrently(scheduler, jobs, phases)
+            self.conn.commit()
+
+        self.record_fingerprints(self.fingerprint_sources())
+
+    def _run_concurrently(self, scheduler, jobs, phases):
+        """Runs the phases on up to `jobs` workers, while the spreadsheets are parsed."""
+
+        def run_on_worker(name):
+            worker = self.worker()
+            try:
+                worker.run_phase(name)
+            finally:
+                worker.close()
+
+        with ThreadPoolExecutor(max_workers=jobs) as parsers:
+            self.workbooks.prefetch(parsers)
+            scheduler.run(run_on_worker, jobs=jobs, phases=phases)
+
+    def phase_sources(self, name):
+        """Returns the `manuscripts` tables and spreadsheets a phase reads from."""
+
+        spec = self.PHASES[name]
+        tables = spec.get('reads', set()) | spec.get('writes', set())
+        return ({table for table in tables if table.startswith('manuscripts.')}
+                | set(spec.get('spreadsheets', ())))
+
+    def fingerprint_sources(self):
+        """Returns a fingerprint of the schema and of every source of the build.
+
+        Tables are fingerprinted by the server's table checksum, and files by
+        their SHA-256 hash."""
+
+        sources = set().union(*[self.phase_sources(name) for name in self.PHASES])
+        tables = sorted([src for src in sources if src.startswith('manuscripts.')])
+        workbooks = sorted(sources - set(tables))
+
+        with self.cursor() as cur:
+            cur.execute(f"CHECKSUM TABLE {', '.join(tables)}")
+            fingerprints = {table: str(checksum) for table, checksum in cur.fetchall()}
+        for workbook in workbooks:
+            with self.workbooks.workbook_path(workbook) as pth:
+                fingerprints[workbook] = file_hash(pth)
+        fingerprints['mpce_database.sql'] = hashlib.sha256(
+            read_text('mpcereform.sql', 'mpce_database.sql').encode('utf-8')).hexdigest()
+
+        return fingerprints
+
+    def stored_fingerprints(self):
+        """Returns the fingerprints recorded by the last build, if any."""
+
+        with self.cursor() as cur:
+            try:
+                cur.execute('SELECT source, fingerprint FROM mpce.build_source')
+            except mysql.ProgrammingError:
+                # Built before fingerprints were recorded
+                return {}
+            return dict(cur.fetchall())
+
+    def record_fingerprints(self, fingerprints):
+        """Replaces the fingerprints in `mpce.build_source`."""
+
+        with self.cursor() as cur:
+            self._create_metadata_table(cur, 'build_source')
+            cur.execute('DELETE FROM mpce.build_source')
+            cur.executemany(
+                'INSERT INTO mpce.build_source (source, fingerprint, recorded) VALUES (%s, %s, NOW())',
+                list(fingerprints.items())
+            )
+        self.conn.commit()
+        print(f'Fingerprints of {len(fingerprints)} sources recorded in `mpce.build_source`.')
+
+    def _create_metadata_table(self, cur, table):
+        """Creates a build metadata table, if the database was built before it existed."""
+
+        cur.execute('USE mpce')
+        for stmt in self._read_sql('mpce_database.sql'):
+            if f'CREATE TABLE IF NOT EXISTS `{table}`' in stmt:
+                cur.execute(stmt)
+
+    def refresh_statistics(self, tables=None):
+        """Recomputes the statistics in `mpce.statistic` that depend on some tables.
+
+        Arguments:
+        ==========
+            tables (set): names of the tables that have changed. If None, every
+                statistic is recomputed
+        """
+
+        with self.cursor() as cur:
+            for table in self.COUNTED_TABLES:
+                if tables is None or table in tables:
+                    cur.execute(f"""
+                        INSERT INTO mpce.statistic (statistic, subject, value, updated)
+                        SELECT 'rows', %s, COUNT(*), NOW() FROM {table}
+                        ON DUPLICATE KEY UPDATE value = VALUES(value), updated = VALUES(updated)
+                    """, (table,))
+            for statistic, (reads, query) in self.STATISTICS.items():
+                if tables is None or reads & set(tables):
+                    cur.execute('DELETE FROM mpce.statistic WHERE statistic = %s', (statistic,))
+                    cur.execute(f"""
+                        INSERT INTO mpce.statistic (statistic, subject, value, updated)
+                        SELECT %s, stat.subject, stat.value, NOW()
+                        FROM ({query}) AS stat
+                    """, (statistic,))
+        self._commit()
+
+    def statistics(self):
+        """Returns the statistics stored in `mpce.statistic`.
+
+        Returns:
+        ==========
+            A dict mapping each statistic to a dict of its values by subject,
+            e.g. {'rows': {'mpce.work': 3000, ...}, 'agents': {'persons': ...}}
+        """
+
+        with self.cursor() as cur:
+            cur.execute('SELECT statistic, subject, value FROM mpce.statistic')
+            rows = cur.fetchall()
+
+        stats = {}
+        for statistic, subject, value in rows:
+            stats.setdefault(statistic, {})[subject] = value
+        return stats
+
+    def _plan_incremental(self, scheduler):
+        """Works out which phases must be re-run, given the changes to their sources."""
+
+        stored = self.stored_fingerprints()
+        current = self.fingerprint_sources()
+
+        if stored and stored.get('mpce_database.sql') != current['mpce_database.sql']:
+            raise mysql.DatabaseError(
+                "The schema has changed since 'mpce' was built. Rebuild it without --incremental.")
+
+        changed = {src for src, fingerprint in current.items() if stored.get(src) != fingerprint}
+        changed.discard('mpce_database.sql')
+        for src in sorted(changed):
+            print(f'Source changed: {src}')
+
+        changed_phases = {name for name in scheduler.order if self.phase_sources(name) & changed}
+        phases = scheduler.rerun_set(changed_phases)
+        if phases:
+            print(f"Re-running: {', '.join([name for name in scheduler.order if name in phases])}")
+        return phases
+
+    def _reset_phases(self, scheduler, phases):
+        """Empties the tables owned by the given phases, so they can be re-run.
+
+        Also drops the code-generating triggers and the indexes, if the phases
+        that create them are to be re-run."""
+
+        with self.cursor() as cur:
+            if 'create_triggers' in phases:
+                for table in self.STRING_IDS:
+                    cur.execute(f'DROP TRIGGER IF EXISTS mpce.increment_{table}')
+            for name in scheduler.order:
+                if name not in phases:
+                    continue
+                for table in sorted(scheduler.owned(name)):
+                    if table.startswith('mpce.'):
+                        cur.execute(f'TRUNCATE TABLE {table}')
+                        # Its codes will be numbered afresh
+                        cur.execute('DELETE FROM mpce.code_sequence WHERE table_name = %s', (table,))
+        self.conn.commit()
+        self.codes.forget()
+
+        if 'build_indexes' in phases:
+            self.drop_indexes()
+
+    @contextmanager
+    def load_tuning(self):
+        """Relaxes the variables in LOAD_TUNING and GLOBAL_LOAD_TUNING, restoring them afterwards.
+
+        Does nothing unless tune_session is set. Variables the server will not
+        let this user change are left as they are."""
+
+        if not self.tune_session:
+            yield
+            return
+
+        saved_session = self._set_variables(self.conn, 'SESSION', self.LOAD_TUNING)
+        saved_global = self._set_variables(self.conn, 'GLOBAL', self.GLOBAL_LOAD_TUNING)
+        try:
+            yield
+        finally:
+            self._set_variables(self.conn, 'GLOBAL', saved_global)
+            self._set_variables(self.conn, 'SESSION', saved_session)
+
+    @staticmethod
+    def _set_variables(conn, scope, values):
+        """Sets server variables, returning the previous values of those that were changed."""
+
+        previous = {}
+        with connections.cursor(conn) as cur:
+            for name, value in values.items():
+                try:
+                    cur.execute(f'SELECT @@{scope}.{name}')
+                    (previous_value,) = cur.fetchone()
+                    cur.execute(f'SET {scope} {name} = %s', (value,))
+                except mysql.Error as err:
+                    print(f'Could not set {scope.lower()} variable `{name}`: {err.msg}')
+                    continue
+                previous[name] = previous_value
+        return previous
+
+    def copy_tables(self, jobs):
+        """Copies tables in chunks of about `copy_chunk_size` rows, reporting each chunk.
+
+        Each chunk is copied by its own statement. Unless the commit policy is
+        'build', the chunks are copied on up to `pool_size` connections at
+        once, from a pool kept for copying, and each is committed as soon as
+        it is copied, so no transaction holds more than one chunk. If a chunk
+        fails, the rows of the chunks already committed are deleted, range by
+        range, as the phase's rollback cannot undo them. Under the 'build'
+        policy, the chunks are copied in turn on this connection, within the
+        build's transaction.
+
+        Arguments:
+        ==========
+            jobs (list): the CopyJobs to run
+
+        Returns:
+        ==========
+            A dict mapping each target table to the number of rows copied into it
+        """
+
+        if self.commit_policy == 'build':
+            connect = lambda: nullcontext(self.conn) #pylint:disable=unnecessary-lambda-assignment;
+        else:
+            # Statements on the copying threads count towards this phase
+            phase = self.instrument.current_phase()
+            connect = lambda: self._copy_connection(phase) #pylint:disable=unnecessary-lambda-assignment;
+
+        # Plan on the copying connections, so this connection's snapshot
+        # is not taken before the chunks are committed
+        with connect() as conn, connections.cursor(conn) as cur:
+            for job in jobs:
+                job.plan(cur, self.copy_chunk_size)
+
+        if self.commit_policy == 'build':
+            return copy_chunks(jobs, connect, commit=False)
+        return copy_chunks(jobs, connect, workers=self.pool_size, undo=True)
+
+    @contextmanager
+    def _copy_connection(self, phase=None):
+        """Yields a connection from the copying pool, returning it afterwards.
+
+        Running phases hold connections from `self.pool`, so copying on
+        that pool could wait for connections that are never returned.
+        Statements on the connection are attributed to `phase`."""
+
+        conn = self.instrument.wrap(self.copy_pool.get_connection(), phase)
+        try:
+            if self.tune_session:
+                self._set_variables(conn, 'SESSION', self.LOAD_TUNING)
+            yield conn
+        finally:
+            conn.close()
+
+    def _commit(self):
+        """Commits the current transaction, if the commit policy is 'statement'."""
+
+        if self.commit_policy == 'statement':
+            self.conn.commit()
 
     def import_works(self):
         """Copies works from old db to new"""
@@ -162,7 +1073,7 @@ class LocalDB():
             SELECT super_book_code, super_book_title, parisian_keyword, illegality
             FROM manuscripts.manuscript_books
         """)
-        self.conn.commit()
+        self._commit()
         print(f'{cur.rowcount} works copied.')
 
         # Copy categorisation data
@@ -207,33 +1118,47 @@ class LocalDB():
 
         # Break keywords out into join table
         # Keyword assignments are comma-seperated values in 'manuscripts'
-        cur.execute("""
-            SELECT super_book_code, keywords
-            FROM manuscripts.manuscript_books
-            WHERE CHAR_LENGTH(keywords) > 1
-        """)
-        keywords = cur.fetchall()
-        keywords_split = []
-        for sbk, kwds in keywords:
-            for kwd in kwds.split(','):
-                keywords_split.append((sbk, kwd.strip()))
-        cur.execute("""CREATE TEMPORARY TABLE mpce.work_keyword_temp (
-            work_code VARCHAR(255),
-            keyword_code VARCHAR(255)
-        )
-        """)
-        cur.executemany("""
-            INSERT INTO mpce.work_keyword_temp (work_code, keyword_code)
-            VALUES (%s, %s)
-        """, seq_params=keywords_split)
-        cur.execute("""
-            INSERT INTO mpce.work_keyword (work_code, keyword_code)
-            SELECT temp.work_code, map.new_code
-            FROM mpce.work_keyword_temp AS temp
-                LEFT JOIN mpce.keyword_map AS map
-                    ON temp.keyword_code = map.old_code
-        """)
-        self.conn.commit()
+        split_on_server = self.supports_recursive_cte()
+        if split_on_server:
+            # Split them on the server, in one statement
+            try:
+                cur.execute(f"""
+                    INSERT INTO mpce.work_keyword (work_code, keyword_code)
+                    WITH RECURSIVE {split_list_cte(
+                        'work_keyword_split', 'manuscripts.manuscript_books',
+                        'super_book_code', 'keywords', where='CHAR_LENGTH(keywords) > 1')}
+                    SELECT split.item_key, map.new_code
+                    FROM work_keyword_split AS split
+                        LEFT JOIN mpce.keyword_map AS map
+                            ON split.item = map.old_code
+                """)
+            except mysql.ProgrammingError as err:
+                # e.g. a server that cannot put WITH inside an INSERT
+                print(f'Could not split keywords on the server ({err.msg}). Splitting them in Python.')
+                split_on_server = False
+        if not split_on_server:
+            cur.execute("""
+                SELECT super_book_code, keywords
+                FROM manuscripts.manuscript_books
+                WHERE CHAR_LENGTH(keywords) > 1
+            """)
+            keywords_split = list(split_list(cur.fetchall()))
+            cur.execute("""CREATE TEMPORARY TABLE mpce.work_keyword_temp (
+                work_code VARCHAR(255),
+                keyword_code VARCHAR(255)
+            )
+            """)
+            self.bulk_writer(
+                'mpce.work_keyword_temp', ['work_code', 'keyword_code']
+            ).write(keywords_split)
+            cur.execute("""
+                INSERT INTO mpce.work_keyword (work_code, keyword_code)
+                SELECT temp.work_code, map.new_code
+                FROM mpce.work_keyword_temp AS temp
+                    LEFT JOIN mpce.keyword_map AS map
+                        ON temp.keyword_code = map.old_code
+            """)
+        self._commit()
         print(f'{cur.rowcount} keyword assignments copied.')
 
         # Import rest of keyword data
@@ -245,7 +1170,7 @@ class LocalDB():
             INSERT INTO mpce.tag
             SELECT * FROM manuscripts.tags
         """)
-        self.conn.commit()
+        self._commit()
         print('Parisian categories, keywords and tags imported.')
 
         # Import keyword associations (need some massaging)
@@ -267,7 +1192,7 @@ class LocalDB():
                 LEFT JOIN manuscripts.keywords AS k2
                     ON k2.keyword = ka.association
         """)
-        self.conn.commit()
+        self._commit()
         print(f'{cur.rowcount} keyword associations imported.')
 
         # Close cursor
@@ -302,7 +1227,7 @@ class LocalDB():
             FROM manuscripts.manuscript_books_editions
         """)
         print(f'{cur.rowcount} editions imported into `mpce.edition`.')
-        self.conn.commit()
+        self._commit()
         cur.close()
 
     def import_places(self):
@@ -329,33 +1254,17 @@ class LocalDB():
             FROM manuscripts.places
         """)
         print(f'{cur.rowcount} places imported into `mpce.place`.')
-        self.conn.commit()
+        self._commit()
 
-        with path('mpcereform.spreadsheets', 'consignments.xlsx') as pth:
-            print(f'Importing new places from {pth} ...')
-            consignments = load_workbook(pth, read_only=True, keep_vba=False)
+        print('Importing new places from consignments.xlsx ...')
         cur.execute('SELECT place_code FROM mpce.place')
         all_places = set([code for (code,) in cur.fetchall()])
-        new_places = []
-        for row in consignments['List of new places'].iter_rows(min_row=2, max_row=60,
-                                                                max_col=23, values_only=True):
-            if row[0] not in all_places:
-                new_places.append(row)
-        cur.executemany("""
-            INSERT INTO mpce.place (
-                place_code, name, alternative_names, C18_lower_territory,
-                C18_sovereign_territory, C21_admin, C21_country, geographic_zone,
-                BSR, EL, HRE, IFC, P, HE, HT, WT, PT, PrT, distance_from_neuchatel,
-                latitude, longitude, geoname, notes
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s)
-        """, seq_params=new_places)
-        print(f'{cur.rowcount} new places imported.')
-        self.conn.commit()
-
-        self.conn.commit()
+        inserted = SheetMapping(
+            'consignments.xlsx', 'List of new places', NewPlace, key='A',
+            transform=lambda place: place if place.place_code not in all_places else None
+        ).load(self)
+        print(f'{inserted} new places imported.')
+        self._commit()
 
     def import_stn(self):
         """Imports STN data from FBTEE-1"""
@@ -364,63 +1273,71 @@ class LocalDB():
 
         # Port tables with new IDs across
         print('Transferring unchanged STN data...')
+        jobs = []
         for mpce, man in self.UNCHANGED_TABLES.items():
             # Get name of columns
             cur.execute(f'DESCRIBE {mpce}')
             table_info = cur.fetchall()
             cols = [row[0] for row in table_info if row[0] != 'ID']
-            cols = ', '.join(cols)
-            cur.execute(f'INSERT INTO {mpce} ({cols}) SELECT * FROM {man}')
-            print(f'Data from `{man}` transferred to `{mpce}`.')
-        self.conn.commit()
+            jobs.append(CopyJob(mpce, cols, man))
+        copied = self.copy_tables(jobs)
+        for mpce, man in self.UNCHANGED_TABLES.items():
+            print(f'{copied[mpce]} rows of data from `{man}` transferred to `{mpce}`.')
 
         print('Unchanged STN data imported. Importing transactions...')
 
-        # Port transaction data across
-        cur.execute("""
-            CREATE TEMPORARY TABLE mpce.trans_type_key (
-                name VARCHAR(255) PRIMARY KEY,
-                id INT
-            )
-        """)
-        cur.executemany("""
-            INSERT INTO trans_type_key
-            VALUES (%s, %s)
-        """, seq_params=[(name, id) for name, id in self.TRANSACTION_CODING.items()])
-        # Copy data across with new coding
-        cur.execute("""
-            INSERT INTO mpce.stn_transaction (
-                transaction_code, order_code, page_or_folio_numbers,
-                account_heading, direction, transaction_description, work_code,
-                edition_code, stn_abbreviated_title, total_number_of_volumes,
-                notes
-            )
-            SELECT
-                t.transaction_code, t.order_code, t.page_or_folio_numbers,
-                t.account_heading, tc.id, t.direction_of_transaction, t.super_book_code,
-                t.book_code, t.stn_abbreviated_title, t.total_number_of_volumes,
-                t.notes
-            FROM manuscripts.transactions AS t
-            LEFT JOIN mpce.trans_type_key AS tc
-                ON t.direction_of_transaction LIKE tc.name
-        """)
-        self.conn.commit()
-        print(f'{cur.rowcount} transactions ported into `mpce.stn_transaction` with new direction coding.') #pylint:disable=line-too-long;
+        # Port transaction data across, with new direction coding
+        directions = self.lookups.table('transaction_direction', cur)
+        transactions = CopyJob(
+            'mpce.stn_transaction',
+            [
+                'transaction_code', 'order_code', 'page_or_folio_numbers',
+                'account_heading', 'direction', 'transaction_description', 'work_code',
+                'edition_code', 'stn_abbreviated_title', 'total_number_of_volumes',
+                'notes'
+            ],
+            'manuscripts.transactions',
+            select="""
+                src.transaction_code, src.order_code, src.page_or_folio_numbers,
+                src.account_heading, tc.id, src.direction_of_transaction, src.super_book_code,
+                src.book_code, src.stn_abbreviated_title, src.total_number_of_volumes,
+                src.notes
+            """,
+            joins=f"""
+                LEFT JOIN {directions.key_table} AS tc
+                    ON src.direction_of_transaction = tc.name
+            """,
+            prepare=directions.create_key_table
+        )
+        copied = self.copy_tables([transactions])
+        cur.execute(f'DROP TEMPORARY TABLE IF EXISTS {directions.key_table}')
+        print(f"{copied['mpce.stn_transaction']} transactions ported into `mpce.stn_transaction` with new direction coding.") #pylint:disable=line-too-long;
 
         # Clients (need to parse dates)
+        # The 10th and 11th columns hold the first and last dates
         print(f'Importing client data, parsing dates ...')
-        cur.execute('SELECT * FROM manuscripts.clients')
-        clients = []
-        for client in cur.fetchall():
-            first = parse_date(client[9])
-            last = parse_date(client[10])
-            clients.append(client[:9] + (first,) + (last,) + client[-1:])
-        cur.executemany("""
-            INSERT INTO mpce.stn_client
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, clients)
-        print(f'{cur.rowcount} clients inserted with parsed first and last dates.')
-        self.conn.commit()
+        columns = [f'`{col}`' for col in self._source_columns('manuscripts.clients')]
+        if self.sql_dates:
+            columns[9:11] = [f'mpce.parse_date({col})' for col in columns[9:11]]
+            cur.execute(f"""
+                INSERT INTO mpce.stn_client (
+                    client_code, client_name, has_correspondence, partnership,
+                    gender, data_source, option_menu_type, number_of_letters,
+                    number_of_documents, first_date, last_date, notes
+                )
+                SELECT {', '.join(columns[:11] + columns[-1:])}
+                FROM manuscripts.clients
+            """)
+            inserted = cur.rowcount
+        else:
+            cur.execute(f"SELECT {', '.join(columns[:11] + columns[-1:])} FROM manuscripts.clients")
+            inserted = self.bulk_writer('mpce.stn_client', [
+                'client_code', 'client_name', 'has_correspondence', 'partnership',
+                'gender', 'data_source', 'option_menu_type', 'number_of_letters',
+                'number_of_documents', 'first_date', 'last_date', 'notes'
+            ]).write(self._parse_date_columns(cur.fetchall(), (9, 10)))
+        print(f'{inserted} clients inserted with parsed first and last dates.')
+        self._commit()
 
         # Finish
         cur.close()
@@ -455,7 +1372,7 @@ class LocalDB():
                 DateEntered, EventUser
             FROM manuscripts.manuscript_events
         """)
-        self.conn.commit()
+        self._commit()
         print(f'{cur.rowcount} stampings copied into `mpce.stamping`.')
 
         # Illegal books
@@ -465,7 +1382,7 @@ class LocalDB():
             SET illegal_date = NULL
             WHERE illegal_date LIKE 'No Date Available'
         """)
-        self.conn.commit()
+        self._commit()
         # Import banned books
         cur.execute("""
             INSERT INTO mpce.banned_list_record (
@@ -480,7 +1397,7 @@ class LocalDB():
                 bastille_book_category = ''
         """)
         print(f'{cur.rowcount} banned books added to `mpce.banned_list_record`.')
-        self.conn.commit()
+        self._commit()
 
         # Import bastille register records
         # Index to speed up import:
@@ -500,7 +1417,7 @@ class LocalDB():
             WHERE CHAR_LENGTH(bastille_book_category) > 1
         """)
         print(f'{cur.rowcount} bastille register records added to `mpce.bastille_register_record`.')
-        self.conn.commit()
+        self._commit()
 
         # Parisian stock auctions
         cur.execute("""
@@ -511,7 +1428,7 @@ class LocalDB():
             FROM manuscripts.manuscript_sales_events
         """)
         print(f'{cur.rowcount} stock auctions addded to `mpce.parisian_stock_auction`.')
-        self.conn.commit()
+        self._commit()
 
         # Auction administrators
         auction_rgx = re.compile(r'(c[a-z][0-9]{3,4}) \((\w+)\)')
@@ -520,10 +1437,7 @@ class LocalDB():
         cur.execute('SELECT salesNumber, ID_Agent FROM manuscripts.manuscript_sales_events')
         administrators = cur.fetchall()
 
-        # Make dict of auction_roles
-        cur.execute('SELECT * FROM auction_role')
-        auction_roles = cur.fetchall()
-        auction_roles = {role:id for id, role in auction_roles}
+        auction_roles = self.lookups.table('auction_role', cur)
 
         # Split and flatten
         auction_administrator = []
@@ -544,10 +1458,12 @@ class LocalDB():
             seq_params=auction_administrator
         )
         print(f'{cur.rowcount} administration roles added to `mpce.auction_administrator`.')
-        self.conn.commit()
+        self._commit()
 
         # Import individual sales
-        cur.execute("""
+        unit_key = self.lookups.table('unit', cur).create_key_table(cur, self.STOCK_SALE_UNITS)
+        sale_type_key = self.lookups.table('sale_type', cur).create_key_table(cur)
+        cur.execute(f"""
             INSERT INTO mpce.parisian_stock_sale (
                 ID, auction_id, purchaser,
                 purchased_edition, sale_type,
@@ -558,17 +1474,8 @@ class LocalDB():
             )
             SELECT
                 ss.ID, ss.ID_Sale_Agent, ss.ID_DealerName,
-                ss.ID_EditionName, st.ID,
-                ss.EventCopies,
-                CASE WHEN EventCopiesType = 'packet' THEN 5
-                    WHEN EventCopiesType = 'copies' THEN 3
-                    WHEN EventCopiesType = 'privilege' THEN 8
-                    WHEN EventCopiesType = 'plates' THEN 6
-                    WHEN EventCopiesType = 'basket' THEN 4
-                    WHEN EventCopiesType = 'vols' THEN 9
-                    WHEN EventCopiesType = 'crate' THEN 2
-                    ELSE NULL
-                    END AS units,
+                ss.ID_EditionName, st.id,
+                ss.EventCopies, u.id AS units,
                 EventVols, EventLotPrice, IF(EventDate = '', NULL, EventDate), EventFolioPage,
                 EventCitation,
                 CASE
@@ -579,11 +1486,14 @@ class LocalDB():
                 EventNotes,
                 EventOther, EventMoreNotes
             FROM manuscripts.manuscript_events_sales AS ss
-            LEFT JOIN mpce.sale_type AS st
-                ON ss.EventType = st.type
+            LEFT JOIN {sale_type_key} AS st
+                ON ss.EventType = st.name
+            LEFT JOIN {unit_key} AS u
+                ON ss.EventCopiesType = u.name
         """)
         print(f'{cur.rowcount} sales added to `mpce.parisian_stock_sale`.')
-        self.conn.commit()
+        cur.execute(f'DROP TEMPORARY TABLE {unit_key}, {sale_type_key}')
+        self._commit()
 
         # Finish
         cur.close()
@@ -592,35 +1502,32 @@ class LocalDB():
         """Imports major data spreadsheets from MPCE.
 
         NB: This function does not fully import the consignments data. The confiscation
-        register signatories and the censors are left to self.resolve_agents()."""
+        register signatories and the censors are left to self.resolve_agents().
+
+        Each sheet is loaded by a SheetMapping, which streams it: rows are read,
+        transformed and written a chunk at a time, with the reading done on a
+        background thread (see `sheet_rows`). The sheets are streamed from the
+        workbooks or their snapshots, except for 'Confiscations master', which
+        is read several times and so is buffered once if it has no snapshot
+        (see `WorkbookCache`)."""
 
         cur = self.conn.cursor()
 
         # Import consignments
-        with path('mpcereform.spreadsheets', 'consignments.xlsx') as pth:
-            print(f'Importing confiscations data from {pth} ...')
-            consignments = load_workbook(pth, read_only=True, keep_vba=False)
-        insert_params = []
+        print('Importing confiscations data from consignments.xlsx ...')
 
         def remove_nulls(x): return None if isinstance(
             x, str) and x == 'null' else x
-        for row in consignments['Confiscations master'].iter_rows(min_row=2,
-                                                                  max_col=45, values_only=True):
-
-            if row[0] is None:
-                break
-            
-            row = [remove_nulls(x) for x in row]
 
-            # Process certain columns:
-            cust_reg_ms = row[3]
+        def customs_register_ms(cust_reg_ms):
             if isinstance(cust_reg_ms, str):
                 try:
                     cust_reg_ms = int(cust_reg_ms.replace(',',''))
                 except ValueError:
                     cust_reg_ms = None
+            return cust_reg_ms
 
-            acquit = row[9]
+        def acquit_a_caution(acquit):
             if isinstance(acquit, str):
                 if acquit.startswith('y'):
                     acquit = 'yes'
@@ -630,135 +1537,55 @@ class LocalDB():
                     acquit = None
             else:
                 acquit = None
+            return acquit
 
-            or_code = row[34]
-            if isinstance(acquit, str):
+        def consignment(rec):
+            or_code = rec.origin_code
+            if isinstance(rec.acquit_a_caution, str):
                 or_code = or_code[:5]  # can't take more than one code
+            return rec._replace(uuid=str(uuid1()), origin_code=or_code)
 
-            insert_params.append({
-                'ID': row[0],
-                'UUID': str(uuid1()),
-                'conf_reg_ms': row[1],
-                'conf_reg_fol': row[2],
-                'cust_reg_ms': cust_reg_ms,
-                'cust_reg_fol': row[4],
-                '21935_fol': row[5],
-                '21935_no': row[44],
-                'date': row[6],
-                'ship_no': row[7],
-                'marque': row[8],
-                'acquit': acquit,
-                'stakeholder': row[32],
-                'or_text': row[33],
-                'or_code': or_code,
-                'return_name': row[36],
-                'return_agent': row[38],
-                'return_town': row[40],
-                'return_place': row[41],
-                'notes': row[42]
-            })
-
-        cur.executemany("""
-            INSERT INTO mpce.consignment (
-                ID, UUID, confiscation_register_ms, confiscation_register_folio,
-                customs_register_ms, customs_register_folio,
-                ms_21935_folio, ms_21935_entry_no, shipping_number, marque,
-                inspection_date, origin_text, origin_code,
-                other_stakeholder, acquit_a_caution, returned_to_name,
-                returned_to_agent, returned_to_town,
-                returned_to_place, notes
-            )
-            VALUES (
-                %(ID)s, %(UUID)s, %(conf_reg_ms)s, %(conf_reg_fol)s,
-                %(cust_reg_ms)s, %(cust_reg_fol)s,
-                %(21935_fol)s, %(21935_no)s, %(ship_no)s, %(marque)s,
-                %(date)s, %(or_text)s, %(or_code)s,
-                %(stakeholder)s, %(acquit)s, %(return_name)s,
-                %(return_agent)s, %(return_town)s,
-                %(return_place)s, %(notes)s
-            )
-        """, insert_params)
-        print(f'{cur.rowcount} consignments imported into `mpce.consignment`.')
-        self.conn.commit()
+        inserted = SheetMapping(
+            'consignments.xlsx', 'Confiscations master', Consignment, key='A',
+            clean=remove_nulls, transform=consignment, fields={
+                'customs_register_ms': customs_register_ms,
+                'acquit_a_caution': acquit_a_caution
+            }).load(self)
+        print(f'{inserted} consignments imported into `mpce.consignment`.')
+        self._commit()
 
         # Import concerned agents for each consignment
         self._import_spreadsheet_agents(
-            'mpce.consignment_addressee', consignments['Confiscations master'], cur, 'L', 'M')
+            'mpce.consignment_addressee', 'Confiscations master', cur, 'L', 'M')
         self._import_spreadsheet_agents(
-            'mpce.consignment_signatory', consignments['Confiscations master'], cur, 'AB', 'AD')
+            'mpce.consignment_signatory', 'Confiscations master', cur, 'AB', 'AD')
         self._import_spreadsheet_agents(
-            'mpce.consignment_handling_agent', consignments['Confiscations master'], cur, 'R', 'S')
+            'mpce.consignment_handling_agent', 'Confiscations master', cur, 'R', 'S')
 
         # Import permission simple
-        with path('mpcereform.spreadsheets', 'permission_simple.xlsx') as pth:
-            perm_simp = load_workbook(pth, read_only=True, keep_vba=False)
-            print(f'Importing permission simple data from {pth} ...')
-
-        perm_simp_grants = []
-        for row in perm_simp['Licences'].iter_rows(min_row=2, max_row=1768, max_col=14, values_only=True):
-            daw_wk, daw_ed, date, edn, _, _ = row[:6]
-            licensee, _, _, _, l_cop, p_cop, spbk_conf, ed_conf = row[6:14]
-
-            date = parse_date(date)
+        print('Importing permission simple data from permission_simple.xlsx ...')
 
-            perm_simp_grants.append(
-                (daw_wk, daw_ed, date, edn, licensee,
-                 l_cop, p_cop, spbk_conf, ed_conf)
-            )
-
-        cur.executemany("""
-            INSERT INTO mpce.permission_simple_grant (
-                dawson_work, dawson_edition, date_granted,
-                edition_code, licensee, licensed_copies,
-                printed_copies_estimate, work_confirmed,
-                edition_confirmed
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, seq_params=perm_simp_grants)
-        print(f'{cur.rowcount} licences imported into `mpce.permission_simple_grant`.')
-        self.conn.commit()
+        def parse_grant_dates(grants):
+            dates = parse_dates([grant.date_granted for grant in grants])
+            return [grant._replace(date_granted=date) for grant, date in zip(grants, dates)]
 
-        updated_edition_data = []
-        for row in perm_simp['Editions'].iter_rows(min_row=2, max_row=1768, max_col=30, values_only=True):
-            code, status, ed_type, _, full_title, short_title = row[:6]
-            trans_title, trans_lang, lang, imprint_pub = row[6:10]
-            act_pub, _, imp_place, act_place, _, stated_yrs = row[10:16]
-            act_yrs, pge, quick_pg, vols, sec, edn, sheets = row[16:23]
-            _, _, _, _, notes, research_notes, url = row[23:30]
+        inserted = SheetMapping('permission_simple.xlsx', 'Licences', PermissionGrant,
+                                batch=parse_grant_dates).load(self)
+        print(f'{inserted} licences imported into `mpce.permission_simple_grant`.')
+        self._commit()
 
+        def number_of_volumes(vols):
             # Validate certain columns
             try:
                 int(vols)
             except ValueError:
                 vols = None
+            return vols
 
-            updated_edition_data.append((
-                code, status, ed_type, full_title, short_title,
-                trans_title, trans_lang, lang, imprint_pub,
-                act_pub, imp_place, act_place, stated_yrs,
-                act_yrs, pge, quick_pg, vols, sec, edn, sheets,
-                notes, research_notes, url
-            ))
-
-        cur.executemany("""
-            INSERT INTO mpce.edition (
-                edition_code, edition_status, edition_type,
-                full_book_title, short_book_titles,
-                translated_title, translated_language,
-                languages, imprint_publishers,
-                actual_publishers, imprint_publication_places,
-                actual_publication_places, imprint_publication_years,
-                actual_publication_years, pages,
-                quick_pages, number_of_volumes, section,
-                edition, book_sheets, notes, research_notes,
-                url
-            )
-            VALUES(
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s
-            )
-            ON DUPLICATE KEY UPDATE
+        upserted = SheetMapping(
+            'permission_simple.xlsx', 'Editions', PermissionEdition,
+            fields={'number_of_volumes': number_of_volumes}
+        ).load(self, on_duplicate="""
                 edition_status = VALUES(edition_status),
                 edition_type = VALUES(edition_type),
                 full_book_title = VALUES(full_book_title),
@@ -779,84 +1606,51 @@ class LocalDB():
                 notes = VALUES(notes),
                 research_notes = VALUES(research_notes),
                 url = VALUES(url)
-        """, seq_params=updated_edition_data)
-        print(f'{cur.rowcount} editions added or updated from permission simple spreadsheet.')
-        self.conn.commit()
+        """)
+        print(f'{upserted} editions added or updated from permission simple spreadsheet.')
+        self._commit()
 
         # Import condemnations
-        with path('mpcereform.spreadsheets', 'condemnations.xlsx') as pth:
-            comdemn = load_workbook(pth, read_only=True, keep_vba=False)
-            print(f'Importing condemnation data from {pth} ...')
-
-        condemn_data = []
-        for row in comdemn['Sheet1'].iter_rows(
-                min_row=2, max_row=114, max_col=6, values_only=True):
-            folio, title, notes, institution_text, date, other_judgment = row
+        print('Importing condemnation data from condemnations.xlsx ...')
 
+        def split_dates(condemnation):
             # Parse dates and split when appropriate
-            for date in date.split(';'):
+            for date in condemnation.date.split(';'):
                 date = date.strip()
                 parts = date.split('/')
                 if len(parts) > 3:
                     date = None
                 else:
                     date = f'{parts[2]}-{parts[1]}-{parts[0]}'
-                condemn_data.append((folio, title, notes, institution_text, date, other_judgment))
+                yield condemnation._replace(date=date)
 
-        cur.executemany("""
-            INSERT INTO mpce.condemnation (
-                folio, title, notes, institution_text, date, other_judgment
-            )
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, seq_params=condemn_data)
-        print(f'{cur.rowcount} condemnations inserted into `mpce.condemnation`.')
-        self.conn.commit()
+        inserted = SheetMapping('condemnations.xlsx', 'Sheet1', Condemnation,
+                                split=split_dates).load(self)
+        print(f'{inserted} condemnations inserted into `mpce.condemnation`.')
+        self._commit()
 
         # Import Darnton sample
-        with path('mpcereform.spreadsheets', 'CommandesLibrairesfrancais.xlsx') as pth:
-            darnton_sample = load_workbook(pth, read_only=True, keep_vba=False)
-            print(f'Importing additional STN order data from {pth} ...')
-
-        darnton_data = []
-        for row in darnton_sample['FicheSauvegarde'].iter_rows(min_row=2, max_row=3399, max_col=11, values_only=True):
-
-            # Unpack row
-            title, bk_format, volumes, author, num, date = row[:6]
-            long_title, darn_id, ordered_by, _, notes = row[6:11]
-
-            # Get client code
-            if ordered_by in self.DARNTON_CLIENTS:
-                ordered_by = self.DARNTON_CLIENTS[ordered_by]
+        print('Importing additional STN order data from CommandesLibrairesfrancais.xlsx ...')
 
+        def date_ordered(date):
             # Reformat date
             date = date.replace('?', '0')
             date = date.replace(' ', '')
             day = date[0:2]
             month = date[3:5]
             year = date[6:10]
-            date = year + '-' + month + '-' + day
-
-            darnton_data.append(
-                (darn_id, title, bk_format, volumes, author, num, date,
-                 long_title, ordered_by, notes)
-            )
+            return year + '-' + month + '-' + day
 
-        cur.executemany("""
-            INSERT INTO mpce.stn_darnton_sample_order (
-                ID, title, format, volumes, author, num_ordered, date_ordered,
-                edition_long_title, ordered_by, notes
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, seq_params=darnton_data)
-        print(f'{cur.rowcount} book orders imported into `mpce.stn_darnton_sample_order`.')
+        inserted = SheetMapping(
+            'CommandesLibrairesfrancais.xlsx', 'FicheSauvegarde', DarntonOrder, fields={
+                # Get client code
+                'ordered_by': lambda client: self.DARNTON_CLIENTS.get(client, client),
+                'date_ordered': date_ordered
+            }).load(self)
+        print(f'{inserted} book orders imported into `mpce.stn_darnton_sample_order`.')
 
         # Import provincial inspections
-        with path('mpcereform.spreadsheets', 'provincial_inspections.xlsx') as pth:
-            prov_insp = load_workbook(pth, read_only=True, keep_vba=False)
-            print(f'Importing provincial inspections from {pth} ...')
-
-        inspection_data = [row for row in prov_insp['Amalgamated sheet'].iter_rows(
-            min_row=2, max_row=230, max_col=23, values_only=True)]
+        print('Importing provincial inspections from provincial_inspections.xlsx ...')
 
         cur.execute("""
             CREATE TEMPORARY TABLE mpce.prov_insp_temp (
@@ -887,21 +1681,7 @@ class LocalDB():
                 PRIMARY KEY(`ID`)
             )
         """)
-        cur.executemany("""
-            INSERT INTO prov_insp_temp (
-                ms_ref, folio, inspected_in, item, inspected_on, ballot,
-                consignment, acquit_a_caution, origin, author,
-                title, imprint_place, imprint_publisher,
-                imprint_date, volumes, format, languages, addressee,
-                num_copies, inspected_by, decision, decision_date,
-                notes
-            )
-            VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s
-            )
-        """, seq_params=inspection_data)
+        SheetMapping('provincial_inspections.xlsx', 'Amalgamated sheet', ProvincialInspection).load(self)
         cur.execute("""
             INSERT INTO provincial_inspection (
                 ID, ms_ref, folio, inspected_in, item,
@@ -942,27 +1722,32 @@ class LocalDB():
         # Import basic agent data
         # Lenghten all person_codes by two digits.
         print('Importing existing agent data...')
-        cur.execute("""
-            SELECT
-                CONCAT('id00', RIGHT(person_code, 4)), person_name, sex, title,
-                other_names, designation, status, birth_date, death_date, notes
-            FROM manuscripts.people
-        """)
-        people = []
-        for person in cur.fetchall():
-            birth = parse_date(person[7])
-            death = parse_date(person[8])
-            people.append(person[:7] + (birth,) + (death,) + person[-1:])
-        cur.executemany("""
-            INSERT INTO mpce.agent (
-                agent_code, name, sex, title, other_names,
-                designation, status, start_date, end_date,
-                notes
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, people)
-        print(f'{cur.rowcount} agents imported from `manuscripts.people` into `mpce.agent`.')
-        self.conn.commit()
+        if self.sql_dates:
+            cur.execute("""
+                INSERT INTO mpce.agent (
+                    agent_code, name, sex, title, other_names,
+                    designation, status, start_date, end_date, notes
+                )
+                SELECT
+                    CONCAT('id00', RIGHT(person_code, 4)), person_name, sex, title,
+                    other_names, designation, status,
+                    mpce.parse_date(birth_date), mpce.parse_date(death_date), notes
+                FROM manuscripts.people
+            """)
+            inserted = cur.rowcount
+        else:
+            cur.execute("""
+                SELECT
+                    CONCAT('id00', RIGHT(person_code, 4)), person_name, sex, title,
+                    other_names, designation, status, birth_date, death_date, notes
+                FROM manuscripts.people
+            """)
+            inserted = self.bulk_writer('mpce.agent', [
+                'agent_code', 'name', 'sex', 'title', 'other_names',
+                'designation', 'status', 'start_date', 'end_date', 'notes'
+            ]).write(self._parse_date_columns(cur.fetchall(), (7, 8)))
+        print(f'{inserted} agents imported from `manuscripts.people` into `mpce.agent`.')
+        self._commit()
 
         # Get client-agent data from STN database
         print('Importing stn client-agent relationships...')
@@ -972,7 +1757,7 @@ class LocalDB():
             FROM manuscripts.clients_people
         """)
         print(f'{cur.rowcount} relationships inserted into `mpce.stn_client_agent`.')
-        self.conn.commit()
+        self._commit()
 
         # Import agent metadata
         cur.execute("""
@@ -989,14 +1774,12 @@ class LocalDB():
             'Professions and assignments imported from `manuscripts.professions` '
             'and `manuscripts.people_professions`.'
         ))
-        self.conn.commit()
+        self._commit()
 
         # The permission simple and confiscations workbooks contain some new professions
-        with path('mpcereform.spreadsheets', 'permission_simple.xlsx') as pth:
-            print(f'Importing new profession data from {pth}')
-            p_simple = load_workbook(pth, read_only=True, keep_vba=False)
-        new_professions = [row for row in p_simple['New Professions'].iter_rows(
-            min_row=2, values_only=True) if row[0] is not None]
+        print('Importing new profession data from permission_simple.xlsx')
+        new_professions = [row for row in self.workbooks.rows(
+            'permission_simple.xlsx', 'New Professions', min_row=2) if row[0] is not None]
         cur.executemany("""
             INSERT IGNORE INTO mpce.profession (
                 profession_type, profession_code, profession_group, economic_sector
@@ -1004,12 +1787,10 @@ class LocalDB():
             VALUES (%s, %s, %s, %s)
         """, new_professions)
         print(f'{cur.rowcount} new professions imported from permission simple workbook.')
-        self.conn.commit()
-        with path('mpcereform.spreadsheets', 'consignments.xlsx') as pth:
-            print(f'Importing new profession data from {pth}')
-            consignments = load_workbook(pth, read_only=True, keep_vba=False)
-        new_professions = [row for row in consignments['New professions'].iter_rows(
-            min_row=2, max_row=43, values_only=True) if row[0] is not None]
+        self._commit()
+        print('Importing new profession data from consignments.xlsx')
+        new_professions = [row for row in self.workbooks.rows(
+            'consignments.xlsx', 'New professions', min_row=2) if row[0] is not None]
         cur.executemany("""
             INSERT IGNORE INTO mpce.profession (
                 profession_type, profession_code, profession_group, economic_sector
@@ -1018,7 +1799,7 @@ class LocalDB():
         """, new_professions)
         print(
             f'{cur.rowcount} new professions imported from consignment workbook.')
-        self.conn.commit()
+        self._commit()
 
         # Now all agent_codes (person_codes) have been imported, as have profession codes.
 
@@ -1026,12 +1807,10 @@ class LocalDB():
 
         # Import author data
         print('Resolving authors...')
-        with path('mpcereform.spreadsheets', 'author_person.xlsx') as pth:
-            author_person = load_workbook(pth, read_only=True, keep_vba=False)
-            print(f'Author-agent assignments loaded from {pth}')
+        print('Author-agent assignments loaded from author_person.xlsx')
         # Get list of all authors who already have agent codes
         assigned_authors = []
-        for row in author_person['author_person'].iter_rows(min_row=2, values_only=True):
+        for row in self.workbooks.rows('author_person.xlsx', 'author_person', min_row=2):
             # If the match is correct...
             if row[7] == 'Y':
                 # ... append (agent_code, author_code)
@@ -1050,7 +1829,7 @@ class LocalDB():
             INSERT INTO mpce.author_agent
             VALUES (%s, %s)
         """, seq_params=assigned_authors)
-        self.conn.commit()
+        self._commit()
         print(f'{cur.rowcount} authors with agent_codes found in spreadsheet.')
 
         # Create new agents for all authors without an agent_code
@@ -1066,14 +1845,21 @@ class LocalDB():
         unassigned_auths = {code:name for name, code in cur.fetchall()}
         # Get unique names, and assign agent_codes
         unique_names = set(unassigned_auths.values())
+        agent_index = None
+        if self.propose_matches:
+            agent_index = AgentIndex.from_database(cur)
+            self._propose_matches(agent_index, 'author', unassigned_auths.items())
         num = len(unique_names)
-        new_agent_codes = self._get_code_sequence('mpce.agent', 'agent_code', num, cur)
+        new_agent_codes = self.reserve_codes('agent', num)
         name_code = {name: code for name, code in zip(
             unique_names, new_agent_codes)}
         cur.executemany("""
             INSERT INTO mpce.agent (agent_code, name)
             VALUES (%s, %s)
         """, seq_params=[(code, name) for name, code in name_code.items()])
+        if agent_index is not None:
+            for name, code in name_code.items():
+                agent_index.add(code, name)
         # Now map these new agent codes back onto author table
         auth_agent = [(author_code, name_code[name]) for author_code, name in unassigned_auths.items()]
         cur.executemany("""
@@ -1081,9 +1867,10 @@ class LocalDB():
             VALUES (%s, %s)
         """, seq_params=auth_agent)
         print(f'{cur.rowcount} authors assigned new agent_codes...')
-        self.conn.commit()
+        self._commit()
         # Now import authorship data
-        cur.execute("""
+        key_table = self.lookups.table('author_type', cur).create_key_table(cur)
+        cur.execute(f"""
             INSERT INTO mpce.edition_author (
                 edition_code, author, author_type, certain
             )
@@ -1091,12 +1878,13 @@ class LocalDB():
                 FROM manuscripts.manuscript_books_authors AS ba
                 LEFT JOIN mpce.author_agent AS aa
                     ON ba.author_code = aa.author_code
-                LEFT JOIN mpce.author_type AS at
-                    ON ba.author_type LIKE at.type
+                LEFT JOIN {key_table} AS at
+                    ON ba.author_type = at.name
             WHERE aa.agent_code IS NOT NULL
         """)
         print(f'All authors resolved into agents. {cur.rowcount} authorship attributions imported into `mpce.edition_author`.')
-        self.conn.commit()
+        cur.execute(f'DROP TEMPORARY TABLE {key_table}')
+        self._commit()
 
         # Apply new profession code to all authors
         cur.execute("""
@@ -1113,7 +1901,7 @@ class LocalDB():
         """)
         print(
             f'{cur.rowcount} profession codes assigned to "aucteurs", "redacteurs" and "traducteurs".')
-        self.conn.commit()
+        self._commit()
 
         # RESOLVE CLIENTS
 
@@ -1163,16 +1951,15 @@ class LocalDB():
         """)
 
         # New clients in consignments workbook
-        with path('mpcereform.spreadsheets', 'consignments.xlsx') as pth:
-            print(f'Scanning {pth} ...')
-            consignments = load_workbook(pth, read_only=True, keep_vba=False)
+        print('Scanning consignments.xlsx ...')
         consignment_clients = {}
-        for row in consignments['People Final'].iter_rows(min_row=2, values_only=True):
+        for row in self.workbooks.rows('consignments.xlsx', 'People Final', min_row=2,
+                                       max_col=ConsignmentClient.MAX_COL):
             if not row:
                 break
 
             # Unpack data
-            name, code, notes, title, _, addresses, _, professions, sex, corporate = row[2:12]
+            code, name, notes, title, addresses, professions, sex, corporate = ConsignmentClient.read(row)
 
             # Ensure no trailing whitespace, reduce sex variable
             if isinstance(name, str):
@@ -1193,28 +1980,18 @@ class LocalDB():
                 corporate = None
 
             if code not in consignment_clients:
-                consignment_clients[code] = (code, name, notes, title, addresses, professions, sex, corporate)
-        cur.executemany("""
-            INSERT INTO mpce.all_clients (
-                client_code, name, notes, title, place_codes, prof_codes, gender, corporate
-            )
+                consignment_clients[code] = ConsignmentClient(code, name, notes, title, addresses, professions, sex, corporate)
+        cur.executemany(f"""
+            INSERT INTO {ConsignmentClient.TABLE} ({', '.join(ConsignmentClient.COLUMNS)})
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             ON DUPLICATE KEY UPDATE mpce.all_clients.notes = CONCAT(IFNULL(mpce.all_clients.notes, ''), ' Confiscations notes: ', VALUES(notes))
         """, seq_params=consignment_clients.values())
 
         # New clients in permission simple
-        with path('mpcereform.spreadsheets', 'permission_simple.xlsx') as pth:
-            print(f'Scanning {pth} ...')
-            per_simp = load_workbook(pth, read_only=True, keep_vba=False)
-        cur.executemany("""
-            INSERT INTO mpce.all_clients (
-                client_code, name, alt_name, gender, prof_codes, place_codes, notes
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE mpce.all_clients.notes = CONCAT(IFNULL(mpce.all_clients.notes, ''), ' Permission simple notes: ', VALUES(notes))
-        """, [(r[0], r[1], r[2], r[3], r[5], r[7], r[8])
-              for r in per_simp['Clients'].iter_rows(min_row=2, max_row=249, values_only=True)])
-        self.conn.commit()
+        print('Scanning permission_simple.xlsx ...')
+        SheetMapping('permission_simple.xlsx', 'Clients', PermissionClient, key='A').load(
+            self, on_duplicate="mpce.all_clients.notes = CONCAT(IFNULL(mpce.all_clients.notes, ''), ' Permission simple notes: ', VALUES(notes))")
+        self._commit()
         cur.execute('SELECT COUNT(client_code) FROM mpce.all_clients')
         print(f'{cur.fetchone()[0]} clients found across all datasets.')
 
@@ -1244,13 +2021,11 @@ class LocalDB():
         """)
 
         # Import new agents from `clients_without_person_codes.xlsx`
-        with path('mpcereform.spreadsheets', 'clients_without_person_codes.xlsx') as pth:
-            print(f'Creating new agents according from data in {pth} ...')
-            new_stn_clients = load_workbook(
-                pth, read_only=True, keep_vba=False)
+        print('Creating new agents according from data in clients_without_person_codes.xlsx ...')
 
         new_cl_ls = []
-        for row in new_stn_clients['clients_without_person_codes'].iter_rows(min_row=2, values_only=True):
+        for row in self.workbooks.rows('clients_without_person_codes.xlsx',
+                                       'clients_without_person_codes', min_row=2):
             client_code = row[0]
             client_name = row[1]
             if row[2] == 'Y':
@@ -1261,26 +2036,25 @@ class LocalDB():
                 continue
             notes = row[4]
             new_cl_ls.append((client_code, client_name, corporate, notes))
-        new_cl_agts = self._get_code_sequence(
-            'mpce.agent', 'agent_code', len(new_cl_ls), cur)
+        new_cl_agts = self.reserve_codes('agent', len(new_cl_ls))
 
         cur.executemany("""
             INSERT INTO mpce.agent (agent_code, name, corporate_entity, notes)
             VALUES (%s, %s, %s, %s)
         """, seq_params=[(code, name, corp, notes) for code, (client, name, corp, notes) in zip(new_cl_agts, new_cl_ls)])
         print(f'{cur.rowcount} new agents created.')
-        self.conn.commit()
+        self._commit()
         cur.executemany("""
             INSERT INTO mpce.stn_client_agent (client_code, agent_code)
             VALUES (%s, %s)
         """, seq_params=[(client, code) for code, (client, name, corp, notes) in zip(new_cl_agts, new_cl_ls)])
         print(f'{cur.rowcount} new relationships inserted into `stn_client_agent`')
-        self.conn.commit()
+        self._commit()
         cur.executemany("""
             INSERT INTO mpce.client_agent (client_code, agent_code)
             VALUES (%s, %s)
         """, seq_params=[(client, code) for code, (client, name, corp, notes) in zip(new_cl_agts, new_cl_ls)])
-        self.conn.commit()
+        self._commit()
 
         # Generate new agent codes
         # NB: The problem of corporate entities having person codes assigned to them
@@ -1300,15 +2074,16 @@ class LocalDB():
                 AND ac.name NOT LIKE 'null'
         """)
         new_agents = cur.fetchall()
+        if agent_index is not None:
+            self._propose_matches(agent_index, 'client', [client[:2] for client in new_agents])
         num_new_codes = len(new_agents)
         print(f'Assigning new agent codes to {num_new_codes} clients ...')
-        code_list = self._get_code_sequence(
-            'mpce.agent', 'agent_code', num_new_codes, cur)
+        code_list = self.reserve_codes('agent', num_new_codes)
         cur.executemany("""
             INSERT INTO mpce.client_agent (client_code, agent_code)
             VALUES (%s, %s)
         """, seq_params=[(client[0], code) for client, code in zip(new_agents, code_list)])
-        self.conn.commit()
+        self._commit()
 
         # Process new_agent data:
         processed_agents = []
@@ -1344,14 +2119,11 @@ class LocalDB():
             )
 
         # Generate new agents
-        cur.executemany("""
-            INSERT INTO mpce.agent (
-                agent_code, name, other_names, sex, corporate_entity, title
-            )
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, seq_params=processed_agents)
-        print(f'{cur.rowcount} new agents added to `mpce.agent`.')
-        self.conn.commit()
+        inserted = self.bulk_writer('mpce.agent', [
+            'agent_code', 'name', 'other_names', 'sex', 'corporate_entity', 'title'
+        ]).write(processed_agents)
+        print(f'{inserted} new agents added to `mpce.agent`.')
+        self._commit()
 
         # Assign places to new agents:
         # Using stn address data
@@ -1363,7 +2135,7 @@ class LocalDB():
                     ON addr.client_code = ca.client_code
         """)
         print(f'{cur.rowcount} addresses imported from `manuscripts.clients_addresses`.')
-        self.conn.commit()
+        self._commit()
 
         # Using generated python list
         # I tried to do this by creating a temporary index on agent_code and place_code,
@@ -1377,7 +2149,7 @@ class LocalDB():
             VALUES (%s, %s)
         """, seq_params=new_place_assigns)
         print(f'{cur.rowcount} addresses imported from new datasets.')
-        self.conn.commit()
+        self._commit()
 
         # Assign professions to new agents:
         cur.executemany("""
@@ -1385,7 +2157,7 @@ class LocalDB():
             VALUES (%s, %s)
         """, seq_params=new_prof_assigns)
         print(f'{cur.rowcount} new professions assigned to agents')
-        self.conn.commit()
+        self._commit()
 
         # Update notes:
         cur.execute("""
@@ -1394,22 +2166,7 @@ class LocalDB():
             WHERE a.agent_code = ca.agent_code AND ca.client_code = ac.client_code
         """)
         print(f'Notes concatenated from different datasets for {cur.rowcount} agents.')
-        self.conn.commit()
-
-        # Use temporary join table to replace client codes throughout db:
-        cur.execute("""
-            UPDATE mpce.consignment AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.other_stakeholder = ca.client_code
-            SET tbl.other_stakeholder = ca.agent_code
-        """)
-        print(
-            f'{cur.rowcount} other_stakeholders in `mpce.consignment` resolved into agent_codes.')
-        cur.execute("""
-            UPDATE mpce.consignment AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.returned_to_agent = ca.client_code
-            SET tbl.returned_to_agent = ca.agent_code
-        """)
-        print(f'{cur.rowcount} returned_to_agents in `mpce.consignment` resolved into agent_codes.')
+        self._commit()
 
         # Store all_collectors and all_censors as strings
         cur.execute("""
@@ -1431,108 +2188,30 @@ class LocalDB():
 
         # Get collector and censor data from consignments workbook
         self._import_spreadsheet_agents(
-            'all_collectors', consignments['Confiscations master'], cur, 'Y', 'Z')
+            'all_collectors', 'Confiscations master', cur, 'Y', 'Z')
         self._import_spreadsheet_agents(
-            'all_censors', consignments['Confiscations master'], cur, 'U', 'V')
+            'all_censors', 'Confiscations master', cur, 'U', 'V')
         # Splice into consignment table
-        cur.execute("""
-            UPDATE mpce.consignment AS cons
-            LEFT JOIN (
-                SELECT
-                    consignment,
-                    GROUP_CONCAT(
-                        CONCAT(all_c.text, ' (', ac.agent_code, ')')
-                        SEPARATOR '; '
-                    ) AS out_string
-                FROM all_collectors AS all_c
-                    LEFT JOIN client_agent AS ac
-                        ON all_c.agent_code = ac.client_code
-                GROUP BY consignment
-            ) AS colls
-            ON colls.consignment = cons.ID
-            SET cons.all_collectors = colls.out_string
-        """)
-        cur.execute("""
-            UPDATE mpce.consignment AS cons
-            LEFT JOIN (
-                SELECT
-                    consignment,
-                    GROUP_CONCAT(
-                        CONCAT(all_c.text, ' (', ac.agent_code, ')')
-                        SEPARATOR '; '
-                    ) AS out_string
-                FROM all_censors AS all_c
-                    LEFT JOIN client_agent AS ac
-                        ON all_c.agent_code = ac.client_code
-                GROUP BY consignment
-            ) AS colls
-            ON colls.consignment = cons.ID
-            SET cons.all_censors = colls.out_string
-        """)
+        for column in ('all_collectors', 'all_censors'):
+            out_string = self.dialect.group_concat(
+                self.dialect.concat('all_c.text', "' ('", 'ac.agent_code', "')'"), '; ')
+            cur.execute(self.dialect.update_join(
+                'mpce.consignment', 'cons',
+                f"""(
+                    SELECT consignment, {out_string} AS out_string
+                    FROM {column} AS all_c
+                        LEFT JOIN client_agent AS ac
+                            ON all_c.agent_code = ac.client_code
+                    GROUP BY consignment
+                )""", 'colls',
+                'colls.consignment = cons.ID',
+                {column: 'colls.out_string'}
+            ))
         print(f'Censor and collector data imported into `mpce.consignment`.')
 
-        cur.execute("""
-            UPDATE mpce.consignment_addressee AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.agent_code = ca.client_code
-            SET tbl.agent_code = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.consignment_addressee` resolved into agent_codes.')
-        cur.execute("""
-            UPDATE mpce.consignment_signatory AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.agent_code = ca.client_code
-            SET tbl.agent_code = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.consignment_signatory` resolved into agent_codes.')
-        cur.execute("""
-            UPDATE mpce.consignment_handling_agent AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.agent_code = ca.client_code
-            SET tbl.agent_code = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.consignment_handling_agent` resolved into agent_codes.')
-
-        cur.execute("""
-            UPDATE mpce.stamping AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.permitted_dealer = ca.client_code
-            SET tbl.permitted_dealer = ca.agent_code
-        """)
-        cur.execute("""
-            UPDATE mpce.stamping AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.attending_inspector = ca.client_code
-            SET tbl.attending_inspector = ca.agent_code
-        """)
-        cur.execute("""
-            UPDATE mpce.stamping AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.attending_adjoint = ca.client_code
-            SET tbl.attending_adjoint = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.stamping` resolved into agent_codes.')
-
-        cur.execute("""
-            UPDATE mpce.parisian_stock_auction AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.previous_owner = ca.client_code
-            SET tbl.previous_owner = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.parisian_stock_auction` resolved into agent_codes.')
-        cur.execute("""
-            UPDATE mpce.auction_administrator AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.administrator_id = ca.client_code
-            SET tbl.administrator_id = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.auction_administrator` resolved into agent_codes.')
-        cur.execute("""
-            UPDATE mpce.parisian_stock_sale AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.purchaser = ca.client_code
-            SET tbl.purchaser = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.parisian_stock_sale` resolved into agent_codes.')
-        self.conn.commit()
-        cur.execute("""
-            UPDATE mpce.permission_simple_grant AS tbl
-            LEFT JOIN mpce.client_agent AS ca ON tbl.licensee = ca.client_code
-            SET tbl.licensee = ca.agent_code
-        """)
-        print(f'{cur.rowcount} client codes in `mpce.permission_simple_grant` resolved into agent_codes.')
-        self.conn.commit()
+        # Use temporary join table to replace client codes throughout db:
+        self.resolve_agent_references(cur)
+        self._commit()
 
         # Populate 'is member of' from stn data
         cur.execute("""
@@ -1550,76 +2229,223 @@ class LocalDB():
                 a.corporate_entity IS NOT TRUE
         """)
         print(f'{cur.rowcount} memberships of corporate entities imported from STN data.')
-        self.conn.commit()
+        self._commit()
 
         # Finish
         cur.close()
 
+    def _propose_matches(self, agent_index, source, names):
+        """Looks up each (code, name) in an AgentIndex, and records the matches proposed."""
+
+        before = len(self.match_proposals)
+        for code, name in names:
+            for agent_code, agent_name, score in agent_index.match(name):
+                self.match_proposals.append(
+                    (source, code, name, agent_code, agent_name, round(score, 3)))
+        print(f'{len(self.match_proposals) - before} possible matches with existing agents '
+              f'proposed for new {source}s.')
+
+    def write_match_report(self, pth):
+        """Writes the proposed agent matches to a CSV file, for checking by hand.
+
+        Returns:
+        ==========
+            The number of matches written
+        """
+
+        with open(pth, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['source', 'source_code', 'source_name',
+                             'agent_code', 'agent_name', 'score'])
+            writer.writerows(self.match_proposals)
+        return len(self.match_proposals)
+
+    def resolve_agent_references(self, cur):
+        """Replaces the client codes in every column of AGENT_REFERENCES with agent codes.
+
+        The client-agent mapping in `mpce.client_agent` is reduced to one agent
+        per client (the lowest agent code), and indexed on the client code. Then
+        each table is updated once, for all of its columns. Codes with no agent
+        are left as they are, and reported, rather than being set to NULL.
+
+        Returns:
+        ==========
+            A dict mapping each (table, column) with unresolved codes to a list
+            of those codes
+        """
+
+        # A temporary table cannot be opened twice in one statement, so there
+        # is one copy of the mapping for each column a table can have
+        copies = max([len(columns) for columns in self.AGENT_REFERENCES.values()])
+        cur.execute("""
+            CREATE TEMPORARY TABLE mpce.agent_resolution_0 (
+                `client_code` CHAR(6) NOT NULL,
+                `agent_code` CHAR(8) NOT NULL,
+                PRIMARY KEY (`client_code`)
+            )
+        """)
+        try:
+            cur.execute("""
+                INSERT INTO mpce.agent_resolution_0 (client_code, agent_code)
+                SELECT client_code, MIN(agent_code)
+                FROM mpce.client_agent
+                GROUP BY client_code
+            """)
+            for idx in range(1, copies):
+                cur.execute(f'CREATE TEMPORARY TABLE mpce.agent_resolution_{idx} LIKE mpce.agent_resolution_0')
+                cur.execute(f'INSERT INTO mpce.agent_resolution_{idx} SELECT * FROM mpce.agent_resolution_0')
+
+            for table, columns in self.AGENT_REFERENCES.items():
+                joins = '\n'.join([
+                    f'LEFT JOIN mpce.agent_resolution_{idx} AS r{idx} ON tbl.{col} = r{idx}.client_code'
+                    for idx, col in enumerate(columns)
+                ])
+                assignments = ', '.join([
+                    f'tbl.{col} = COALESCE(r{idx}.agent_code, tbl.{col})'
+                    for idx, col in enumerate(columns)
+                ])
+                matched = ' OR '.join([
+                    f'r{idx}.client_code IS NOT NULL' for idx in range(len(columns))
+                ])
+                cur.execute(f'UPDATE {table} AS tbl {joins} SET {assignments} WHERE {matched}')
+                print(f'{cur.rowcount} rows of `{table}` resolved into agent_codes.')
+
+            unresolved = self.unresolved_agent_references(cur)
+        finally:
+            cur.execute('DROP TEMPORARY TABLE IF EXISTS ' + ', '.join(
+                [f'mpce.agent_resolution_{idx}' for idx in range(copies)]))
+
+        for (table, column), codes in unresolved.items():
+            sample = ', '.join(codes[:5]) + (', ...' if len(codes) > 5 else '')
+            print(f'{len(codes)} codes in `{table}`.`{column}` could not be resolved: {sample}')
+
+        return unresolved
+
+    def unresolved_agent_references(self, cur):
+        """Finds the codes in the columns of AGENT_REFERENCES that are not agent codes.
+
+        Returns:
+        ==========
+            A dict mapping each (table, column) with unresolved codes to a
+            sorted list of those codes
+        """
+
+        unresolved = {}
+        for table, columns in self.AGENT_REFERENCES.items():
+            cur.execute(' UNION ALL '.join([f"""
+                SELECT DISTINCT '{col}', tbl.{col}
+                FROM {table} AS tbl
+                    LEFT JOIN mpce.agent AS a ON tbl.{col} = a.agent_code
+                WHERE tbl.{col} IS NOT NULL AND a.agent_code IS NULL
+            """ for col in columns]))
+            for column, code in cur.fetchall():
+                unresolved.setdefault((table, column), []).append(code)
+
+        return {key: sorted(codes) for key, codes in unresolved.items()}
+
     def create_triggers(self):
-        """Creates triggers to generate new ids on tables with string codes."""
+        """Creates triggers to generate new ids on tables with string codes.
+
+        Also creates the procedure `mpce.reserve_codes`, which reserves a block
+        of codes at once. Rows inserted with their codes already filled in are
+        left alone by the triggers, so bulk loaders can reserve codes up front
+        and skip the trigger's extra write for every row."""
 
         print('Building triggers to generate new unique codes.')
 
+        with self.cursor() as cur:
+            cur.execute('DROP PROCEDURE IF EXISTS mpce.reserve_codes')
+            cur.execute("""
+                CREATE PROCEDURE mpce.reserve_codes(
+                    IN code_prefix VARCHAR(10), IN how_many INT,
+                    OUT first_value INT, OUT digits INT
+                )
+                BEGIN
+                    UPDATE mpce.code_sequence
+                    SET next_value = LAST_INSERT_ID(next_value + how_many)
+                    WHERE prefix = code_prefix;
+                    IF ROW_COUNT() = 0 THEN
+                        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No code sequence has this prefix';
+                    END IF;
+                    SELECT LAST_INSERT_ID() - how_many, padding INTO first_value, digits
+                    FROM mpce.code_sequence
+                    WHERE prefix = code_prefix;
+                END
+            """)
+        print('Procedure `mpce.reserve_codes` created.')
+
         for table, column in self.STRING_IDS.items():
             self._build_index_trigger(table, column)
             print(f'Trigger increment_{table} created on `mpce.{table}`.')
 
     def _build_index_trigger(self, table, column):
-        """Creates a trigger for the primary key column of a table with string id."""
+        """Creates a trigger for the primary key column of a table with string id.
+
+        The trigger only numbers rows inserted without a code."""
+
+        with self.cursor() as cur:
+            cur.execute('USE mpce')
+            # Seeds the table's sequence, if nothing has reserved a code yet
+            _, prefix, padding = self.codes.peek(f'mpce.{table}', column, self.conn)
+            cur.execute(f"""
+                CREATE TRIGGER increment_{table}
+                BEFORE INSERT ON {table} FOR EACH ROW
+                BEGIN
+                    IF NEW.{column} IS NULL OR NEW.{column} IN ('', 'new') THEN
+                        UPDATE code_sequence
+                        SET next_value = LAST_INSERT_ID(next_value + 1)
+                        WHERE prefix = '{prefix}';
+                        SET NEW.{column} = CONCAT('{prefix}', LPAD(LAST_INSERT_ID() - 1, {padding}, '0'));
+                    END IF;
+                END
+            """)
 
-        cur = self.conn.cursor()
+        self._commit()
 
-        cur.execute('USE mpce')
-        # Auto-increment edition_code
-        next_id, prefix, padding = self._get_auto_increment(table, column, cur)
-        cur.execute(f"""
-            CREATE TABLE _{table}_id (
-                id INT AUTO_INCREMENT PRIMARY KEY
-            ) AUTO_INCREMENT = {next_id} DEFAULT CHARSET=utf8
-        """)
-        cur.execute(f"""
-            CREATE TRIGGER increment_{table}
-            BEFORE INSERT ON {table} FOR EACH ROW
-            BEGIN
-                INSERT INTO _{table}_id VALUES (NULL);
-                SET NEW.{column} = CONCAT('{prefix}', LPAD(LAST_INSERT_ID(), {padding}, '0'));
-            END
-        """)
+    def reserve_codes(self, table, num):
+        """Reserves new codes for one of the tables in STRING_IDS.
 
-        self.conn.commit()
-        cur.close()
+        Rows inserted with these codes skip the table's trigger. NB: Do not
+        reserve codes while the current transaction has rows numbered by a
+        trigger that are not yet committed, as the trigger holds the sequence
+        until the transaction ends.
+
+        Arguments:
+        ==========
+            table (str): name of the table in `mpce`, e.g. 'agent'
+            num (int): number of codes to reserve
+
+        Returns:
+        ==========
+            A list of `num` new codes
+        """
+
+        # The table is read on this connection, which sees the phase's uncommitted rows
+        return self.codes.reserve(f'mpce.{table}', self.STRING_IDS[table], num, self.conn)
 
     def summarise(self):
-        """Outputs summary statistics about the database."""
+        """Outputs summary statistics about the database, from `mpce.statistic`."""
 
-        cur = self.conn.cursor()
+        stats = self.statistics()
+        if not stats:
+            # Built before statistics were kept
+            self.refresh_statistics()
+            stats = self.statistics()
+        rows = stats.get('rows', {})
 
         print('\nMPCE data import complete.\n')
         print('SUMMARY STATISTICS:\n========================\n')
 
         # Works
-        cur.execute('SELECT COUNT(work_code) FROM mpce.work')
-        print(f'Distinct works: {cur.fetchone()[0]}, which have been assigned')
-        cur.execute('SELECT COUNT(*) FROM mpce.work_keyword')
-        print(f'     {cur.fetchone()[0]} keywords from a set of')
-        cur.execute('SELECT COUNT(keyword_code) FROM mpce.keyword')
-        print(f'     {cur.fetchone()[0]} categories devised by the project')
+        print(f"Distinct works: {rows.get('mpce.work', 0)}, which have been assigned")
+        print(f"     {rows.get('mpce.work_keyword', 0)} keywords from a set of")
+        print(f"     {rows.get('mpce.keyword', 0)} categories devised by the project")
 
         print('')
 
         # Editions
-        cur.execute('SELECT COUNT(edition_code) FROM mpce.edition')
-        print(f'Distinct editions: {cur.fetchone()[0]}, produced by')
-        cur.execute("""
-            SELECT at.type, COUNT(*)
-            FROM mpce.edition_author AS ea
-                LEFT JOIN mpce.author_type AS at
-                    ON ea.author_type = at.ID
-            GROUP BY ea.author_type
-        """)
-        for auth_type, num in cur.fetchall():
-            if auth_type is None:
-                continue
+        print(f"Distinct editions: {rows.get('mpce.edition', 0)}, produced by")
+        for auth_type, num in sorted(stats.get('authors', {}).items()):
             if auth_type in {'Primary', 'Secondary'}:
                 print(f'     {num} {auth_type} authors')
             else:
@@ -1628,48 +2454,22 @@ class LocalDB():
         print('')
 
         # Agents:
-        cur.execute("SELECT COUNT(agent_code), SUM(corporate_entity) FROM mpce.agent")
-        agents, entities = cur.fetchone()
-        print(f'Distinct agents: {agents}, of which')
-        print(f'     {agents - entities} are persons')
-        print(f'     {entities} are corporate entities')
-        cur.execute('SELECT COUNT(*) FROM mpce.stn_client_agent')
-        print(f'     {cur.fetchone()[0]} were clients of the STN')
+        agents = stats.get('agents', {})
+        print(f"Distinct agents: {rows.get('mpce.agent', 0)}, of which")
+        print(f"     {agents.get('persons', 0)} are persons")
+        print(f"     {agents.get('corporate entities', 0)} are corporate entities")
+        print(f"     {rows.get('mpce.stn_client_agent', 0)} were clients of the STN")
 
         print('')
 
         # Places:
-        cur.execute("SELECT COUNT(place_code) FROM mpce.place")
-        print(f'Distinct places: {cur.fetchone()[0]}')
+        print(f"Distinct places: {rows.get('mpce.place', 0)}")
 
         print('')
 
         # Events
-        events = {}
-        cur.execute("SELECT COUNT(*) FROM mpce.banned_list_record")
-        events['banned by the authorities'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.bastille_register_record")
-        events['sequestered in the Bastille'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.condemnation")
-        events['condemned by the authorities'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.consignment")
-        events['intercepted in a suspect consignment by Paris customs'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.parisian_stock_sale")
-        events['sold, or the right to print them transferred, at the Paris stock sales'] = cur.fetchone()[
-            0]
-        cur.execute("SELECT COUNT(*) FROM mpce.permission_simple_grant")
-        events['licensed under the permission simple'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.provincial_inspection")
-        events['inspected by provincial authorities'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.stamping")
-        events['stamped to legalise their sale, though they were pirated'] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.stn_transaction")
-        events[(
-            'bought, sold, sent, returned, printed, warehoused or otherwise\n'
-            '         dealt with by the Société Typographique de Neuchâtel'
-        )] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM mpce.stn_darnton_sample_order")
-        events['ordered by one of Robert Darnton\'s selected buyers'] = cur.fetchone()[0]
+        events = {description: rows.get(table, 0)
+                  for table, description in self.EVENT_TABLES.items()}
 
         print(f'All of which were involved in\n')
         print(f'     {sum(events.values())} distinct events\n')
@@ -1678,107 +2478,218 @@ class LocalDB():
         for key, val in events.items():
             print(f'     {val} times books were {key}')
 
-        cur.close()
+    def export(self, directory, tables=None, fmt=None, jobs=1, chunk_size=50000):
+        """Exports tables of `mpce` to Parquet or CSV files, one file per table.
 
-    # Utility methods
-    def _get_code_sequence(self, table, column, num, cursor=None):
-        """Return a list of the next n free codes.
+        Tables are exported on up to `jobs` workers at once, largest first.
 
         Arguments:
         ==========
-            table (str): name of table to be queried
-            column (str): name of column to be queried
-            num (int): number of new ids to be generated
-            cursor (MySQLCursor): a cursor, if you don't wish to create a new one
+            directory (str): where to write the files
+            tables (list): names of the tables to export. If None, every table
+            fmt (str): 'parquet' or 'csv'. If None, Parquet if pyarrow is
+                installed, otherwise CSV
+            jobs (int): the number of tables to export at once
+            chunk_size (int): number of rows fetched and written at a time
 
         Returns:
         ==========
-            A sequence of n new codes
+            A dict mapping each table to the path and row count of its file
         """
 
-        # Regexes
-        num_extr_rgx = re.compile(r'[1-9]\d*') # Extract numerical part of id
-        prefix_rgx = re.compile(r'[a-z]+') # To find frame
+        if fmt is None:
+            fmt = 'parquet' if parquet_available() else 'csv'
+            if fmt == 'csv':
+                print('pyarrow is not installed, so tables will be exported to CSV.')
+        elif fmt == 'parquet' and not parquet_available():
+            raise ImportError('Exporting to Parquet requires pyarrow.')
+
+        with self.cursor() as cur:
+            cur.execute("""
+                SELECT TABLE_NAME
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = 'mpce' AND TABLE_TYPE = 'BASE TABLE'
+                ORDER BY TABLE_ROWS DESC, TABLE_NAME
+            """)
+            names = [name for name, in cur.fetchall()]
+        if tables is not None:
+            unknown = set(tables) - set(names)
+            if unknown:
+                raise ValueError(f'No such tables in mpce: {", ".join(sorted(unknown))}')
+            names = [name for name in names if name in set(tables)]
+
+        os.makedirs(directory, exist_ok=True)
+
+        def export_on_worker(table):
+            worker = self.worker()
+            try:
+                return export_table(worker.conn, 'mpce', table, directory, fmt, chunk_size)
+            finally:
+                worker.close()
 
-        # Get a cursor
-        if cursor is not None:
-            cur = cursor
+        if jobs <= 1:
+            results = [export_table(self.conn, 'mpce', table, directory, fmt, chunk_size)
+                       for table in names]
         else:
-            cur = self.conn.cursor()
+            with ThreadPoolExecutor(max_workers=jobs) as exporters:
+                results = list(exporters.map(export_on_worker, names))
+
+        exported = {}
+        for table, (pth, rows) in zip(names, results):
+            print(f'{rows} rows of mpce.{table} exported to {pth}')
+            exported[table] = (pth, rows)
+        return exported
+
+    def build_embedded(self, path, backend='sqlite', chunk_size=50000):
+        """Copies the built `mpce` database into a single-file SQLite or DuckDB database.
 
-        # Get sequence of codes from DB
-        cur.execute(f'SELECT {column} FROM {table}')
-        codes = cur.fetchall()
+        Every table is created with the equivalent column types and primary key,
+        and streamed across a chunk at a time. A table already in the file is
+        dropped first, so refreshing the file after an incremental build leaves
+        no rows the build has since removed. In SQLite, triggers code rows
+        inserted without a code, as on the server.
 
-        # Work out the frame:
-        prefix = prefix_rgx.match(codes[0][0]).group(0)
-        n_digits = len(codes[0][0]) - len(prefix)
-        frame = ''.join([prefix] + ['0' for n in range(n_digits)])
+        Arguments:
+        ==========
+            path (str): the database file to write
+            backend (str): 'sqlite' or 'duckdb'
+            chunk_size (int): number of rows fetched and written at a time
 
-        # Extract numeric part of codes
-        codes = [int(num_extr_rgx.search(id).group(0))
-                 for (id,) in codes]
+        Returns:
+        ==========
+            A dict mapping each table to the number of rows copied
+        """
 
-        if cursor is None:
-            cur.close()
+        if backend not in EMBEDDED:
+            raise ValueError(f'Unknown embedded database {backend!r}: use one of {", ".join(EMBEDDED)}')
+        dialect = EMBEDDED[backend]
+
+        # Seed every code sequence before `code_sequence` is copied
+        sequences = {table: self.codes.peek(f'mpce.{table}', column, self.conn)[1:]
+                     for table, column in self.STRING_IDS.items()}
+
+        with self.cursor() as cur:
+            cur.execute("""
+                SELECT TABLE_NAME
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = 'mpce' AND TABLE_TYPE = 'BASE TABLE'
+                ORDER BY TABLE_NAME
+            """)
+            tables = [name for name, in cur.fetchall()]
+            cur.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME
+                FROM information_schema.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = 'mpce' AND CONSTRAINT_NAME = 'PRIMARY'
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """)
+            primary_keys = {}
+            for table, column in cur.fetchall():
+                primary_keys.setdefault(table, []).append(column)
+            columns = {table: table_columns(cur, 'mpce', table) for table in tables}
+
+        embedded = dialect.connect(path)
+        copied = {}
+        try:
+            for table in tables:
+                names = [dialect.quote(column[0]) for column in columns[table]]
+                embedded.execute(f'DROP TABLE IF EXISTS {dialect.quote(table)}')
+                embedded.execute(dialect.create_table(
+                    table, [column[:3] for column in columns[table]], primary_keys.get(table, [])))
+                insert = dialect.upsert(dialect.quote(table), names)
+                copied[table] = 0
+                with self.cursor(buffered=False) as cur:
+                    cur.execute(f'SELECT * FROM mpce.`{table}`')
+                    for chunk in iter(lambda: cur.fetchmany(chunk_size), []): #pylint:disable=cell-var-from-loop;
+                        embedded.executemany(insert, [[dialect.adapt(val) for val in row]
+                                                      for row in chunk])
+                        copied[table] += len(chunk)
+                print(f'{copied[table]} rows of mpce.{table} copied to {path}')
+            if dialect.supports_triggers:
+                for table, (prefix, padding) in sequences.items():
+                    embedded.execute(dialect.code_trigger(
+                        table, self.STRING_IDS[table], prefix, padding))
+            embedded.commit()
+        finally:
+            embedded.close()
+
+        return copied
 
-        # Get the maximum numeric id
-        next_id = max(codes) + 1
+    # Utility methods
+    @staticmethod
+    def _read_sql(file_name):
+        """Reads a file from `mpcereform.sql`, and returns its statements without comments."""
 
-        # Return list of codes
-        return [frame[:-len(str(id))] + str(id) for id in range(next_id, next_id + num)]
+        sql_raw = read_text('mpcereform.sql', file_name)
 
-    def _import_spreadsheet_agents(self, table, worksheet, cursor, text_col, code_col):
-        """Custom method for consignments workbook."""
-        agents = []
+        # Strip multiline comments
+        # Use a non-greedy match, so it will find each seperate comment
+        sql_com_rgx = re.compile(r'/\*.+?\*/', re.DOTALL)
+        sql_stripped = sql_com_rgx.sub('', sql_raw)
 
-        text_col = convert_colname(text_col)
-        code_col = convert_colname(code_col)
+        # Split on semicolons, dropping any statements that are only whitespace or comments
+        statements = []
+        for stmt in sql_stripped.split(';'):
+            if re.sub(r'--[^\n]*', '', stmt).strip():
+                statements.append(stmt)
+        return statements
 
-        for row in worksheet.iter_rows(min_row=2, values_only=True):
-            # break on empty row
-            if not row:
-                break
+    def sheet_rows(self, workbook, sheet, **limits):
+        """Yields the rows of a sheet, read a chunk ahead on a background thread.
 
-            consignment_id = row[0]
-            names, codes = row[text_col], row[code_col]
-            if not isinstance(names, str) or not isinstance(codes, str):
-                continue
-            elif names.lower().startswith('null'):
-                continue
-            else:
-                names = names.split(';')
-                codes = codes.split(';')
-            for name, code in zip(names, codes):
-                agents.append((consignment_id, code.strip(), name.strip()))
-        cursor.executemany((
-            f'INSERT INTO {table} (consignment, agent_code, text) '
-            'VALUES (%s, %s, %s)'
-        ), agents)
-        print(f'{cursor.rowcount} agency relations inserted into `{table}`.')
-        self.conn.commit()
+        Arguments:
+        ==========
+            workbook (str): file name of the workbook
+            sheet (str): name of the sheet
+            limits: row and column limits, as for `WorkbookCache.rows`
+        """
 
-    def _get_auto_increment(self, table, column, cur=None):
-        """Returns the frame and next id value for the nominated id column."""
-        if cur is None:
-            cur = self.conn.cursor()
+        return prefetch(self.workbooks.rows(workbook, sheet, **limits), self.batch_size)
 
-        # Regexes
-        num_extr_rgx = re.compile(r'[1-9]\d*') # Extract numerical part of id
-        prefix_rgx = re.compile(r'[a-z]+') # To find frame
+    def bulk_writer(self, table, columns, assign_codes=False, **kwargs):
+        """Returns a BulkWriter for a table, using this database's connection and settings.
 
-        cur.execute(f'SELECT {column} FROM {table}')
-        ids = cur.fetchall()
+        If `assign_codes` is set, and the table is in STRING_IDS, rows without
+        a code are given new codes, reserved a batch at a time."""
 
-        # The next id is the max value + 1
-        # Remember each record is a tuple
-        next_id = max([int(num_extr_rgx.search(record[0]).group(0)) for record in ids]) + 1
+        if assign_codes:
+            short_name = table.split('.')[-1]
+            kwargs.setdefault('code_column', self.STRING_IDS[short_name])
+            kwargs.setdefault('codes', lambda num: self.reserve_codes(short_name, num))
+        kwargs.setdefault('batch_size', self.batch_size)
+        kwargs.setdefault('local_infile', self.local_infile)
+        kwargs.setdefault('statements', self.statements)
+        return BulkWriter(self.conn, table, columns, **kwargs)
 
-        # Get the frame from any of the values
-        # For legacy reasons, some of these id columns have different frames
-        # This function gets the latest value inserted in the table
-        prefix = prefix_rgx.search(ids[0][0]).group(0)
+    def _import_spreadsheet_agents(self, table, sheet, cursor, text_col, code_col):
+        """Custom method for consignments workbook."""
 
-        padding = max([len(x) for (x,) in ids]) - len(prefix)
+        text_col = convert_colname(text_col)
+        code_col = convert_colname(code_col)
 
-        return next_id, prefix, padding
+        def agents():
+            for row in self.sheet_rows('consignments.xlsx', sheet, min_row=2):
+                # break on empty row
+                if not row:
+                    break
+
+                consignment_id = row[0]
+                names, codes = row[text_col], row[code_col]
+                if not isinstance(names, str) or not isinstance(codes, str):
+                    continue
+                elif names.lower().startswith('null'):
+                    continue
+                else:
+                    names = names.split(';')
+                    codes = codes.split(';')
+                for name, code in zip(names, codes):
+                    yield (consignment_id, code.strip(), name.strip())
+
+        inserted = 0
+        for chunk in chunked(agents(), self.batch_size):
+            cursor.executemany((
+                f'INSERT INTO {table} (consignment, agent_code, text) '
+                'VALUES (%s, %s, %s)'
+            ), chunk)
+            inserted += cursor.rowcount
+        print(f'{inserted} agency relations inserted into `{table}`.')
+        self._commit()
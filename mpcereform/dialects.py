@@ -0,0 +1,250 @@
+"""SQL dialects of the servers and embedded databases the MPCE schema can be written to.
+
+The import phases are written for MySQL/MariaDB. A dialect renders the
+statements that differ between databases: upserts, updates from a joined
+table, string aggregation, concatenation and the triggers that number new
+rows. `MYSQL` renders the native MySQL forms, so the import phases run
+unchanged; `SQLITE` and `DUCKDB` render the equivalents for a single-file
+database (see `LocalDB.build_embedded`).
+"""
+
+import datetime
+import decimal
+import sqlite3
+
+class Dialect():
+    """The MySQL/MariaDB dialect, which the others override where they differ."""
+
+    name = 'mysql'
+    # Parameter placeholder of the database's driver
+    placeholder = '%s'
+    # Whether the database can number new rows with a trigger
+    supports_triggers = True
+
+    def quote(self, name):
+        """Quotes the name of a table or column."""
+
+        return f'`{name}`'
+
+    def column_type(self, data_type, column_type):
+        """Returns the type to declare for a column, given its MySQL data and column type."""
+
+        return column_type
+
+    def adapt(self, value):
+        """Converts a value read from MySQL into one the driver can write."""
+
+        return value
+
+    def create_table(self, table, columns, primary_key=()):
+        """Returns a CREATE TABLE statement.
+
+        Arguments:
+        ==========
+            table (str): name of the table
+            columns (list): (name, MySQL data type, MySQL column type) of each column
+            primary_key (sequence): names of the primary key columns, if any
+        """
+
+        defs = [f'{self.quote(name)} {self.column_type(data_type, column_type)}'
+                for name, data_type, column_type in columns]
+        if primary_key:
+            defs.append('PRIMARY KEY (' + ', '.join([self.quote(col) for col in primary_key]) + ')')
+        return (f'CREATE TABLE IF NOT EXISTS {self.quote(table)} (\n    '
+                + ',\n    '.join(defs) + '\n)')
+
+    def upsert(self, table, columns, keys=()):
+        """Returns an INSERT statement that replaces the non-key values of existing rows.
+
+        Arguments:
+        ==========
+            table (str): name of the table
+            columns (sequence): columns of each row, in order
+            keys (sequence): the primary key columns. If empty, rows are
+                simply inserted
+        """
+
+        values = ', '.join([self.placeholder] * len(columns))
+        stmt = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({values})'
+        updates = [col for col in columns if col not in keys]
+        if keys and updates:
+            stmt += ' ' + self._on_conflict(keys, updates)
+        return stmt
+
+    def _on_conflict(self, keys, updates):
+        return 'ON DUPLICATE KEY UPDATE ' + ', '.join([f'{col} = VALUES({col})' for col in updates])
+
+    def concat(self, *parts):
+        """Returns an expression concatenating strings, which is NULL if any part is NULL."""
+
+        return 'CONCAT(' + ', '.join(parts) + ')'
+
+    def group_concat(self, expr, separator=','):
+        """Returns an aggregate expression joining the values of `expr` in a group."""
+
+        return f"GROUP_CONCAT({expr} SEPARATOR '{separator}')"
+
+    def update_join(self, target, alias, source, source_alias, on, assignments):
+        """Returns an UPDATE that sets columns of a table from the matching row of another.
+
+        As with MySQL's `UPDATE ... LEFT JOIN`, the columns of rows with no
+        matching row are set to NULL. `source` must match at most one row.
+
+        Arguments:
+        ==========
+            target (str): the table to update
+            alias (str): alias of the target table
+            source (str): table or parenthesised subquery to read values from
+            source_alias (str): alias of the source
+            on (str): condition matching the source row to the target row
+            assignments (dict): maps each target column to an expression over
+                the source
+        """
+
+        sets = ', '.join([f'{alias}.{col} = {expr}' for col, expr in assignments.items()])
+        return (f'UPDATE {target} AS {alias} LEFT JOIN {source} AS {source_alias} '
+                f'ON {on} SET {sets}')
+
+    def code_trigger(self, table, column, prefix, padding):
+        """Returns a statement creating a trigger that codes rows inserted without a code.
+
+        The trigger takes the next number from the `code_sequence` table, as
+        `LocalDB._build_index_trigger` does on the server."""
+
+        return f"""
+            CREATE TRIGGER increment_{table}
+            BEFORE INSERT ON {table} FOR EACH ROW
+            BEGIN
+                IF NEW.{column} IS NULL OR NEW.{column} IN ('', 'new') THEN
+                    UPDATE code_sequence
+                    SET next_value = LAST_INSERT_ID(next_value + 1)
+                    WHERE prefix = '{prefix}';
+                    SET NEW.{column} = CONCAT('{prefix}', LPAD(LAST_INSERT_ID() - 1, {padding}, '0'));
+                END IF;
+            END
+        """
+
+    def connect(self, path):
+        """Opens an embedded database file. Servers are connected to by `LocalDB`."""
+
+        raise NotImplementedError(f'{self.name} is not an embedded database.')
+
+class SQLiteDialect(Dialect):
+    """The dialect of SQLite 3.24 or later."""
+
+    name = 'sqlite'
+    placeholder = '?'
+
+    def quote(self, name):
+        return f'"{name}"'
+
+    def column_type(self, data_type, column_type):
+        if data_type in {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year'}:
+            return 'INTEGER'
+        if data_type in {'float', 'double'}:
+            return 'REAL'
+        if data_type == 'decimal':
+            return 'NUMERIC'
+        if data_type in {'binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob'}:
+            return 'BLOB'
+        # Dates and times are stored as ISO 8601 strings
+        return 'TEXT'
+
+    def adapt(self, value):
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        if isinstance(value, datetime.timedelta):
+            return _format_time(value)
+        return value
+
+    def _on_conflict(self, keys, updates):
+        return (f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET '
+                + ', '.join([f'{col} = excluded.{col}' for col in updates]))
+
+    def concat(self, *parts):
+        return '(' + ' || '.join(parts) + ')'
+
+    def group_concat(self, expr, separator=','):
+        return f"group_concat({expr}, '{separator}')"
+
+    def update_join(self, target, alias, source, source_alias, on, assignments):
+        # A correlated subquery per column gives NULL where there is no match
+        sets = ', '.join([f'{col} = (SELECT {expr} FROM {source} AS {source_alias} WHERE {on})'
+                          for col, expr in assignments.items()])
+        return f'UPDATE {target} AS {alias} SET {sets}'
+
+    def code_trigger(self, table, column, prefix, padding):
+        # SQLite cannot assign to NEW, so the row is coded after it is inserted
+        return f"""
+            CREATE TRIGGER IF NOT EXISTS increment_{table}
+            AFTER INSERT ON {table} FOR EACH ROW
+            WHEN NEW.{column} IS NULL OR NEW.{column} IN ('', 'new')
+            BEGIN
+                UPDATE code_sequence SET next_value = next_value + 1 WHERE prefix = '{prefix}';
+                UPDATE {table}
+                SET {column} = '{prefix}' || printf('%0{padding}d', (
+                    SELECT next_value - 1 FROM code_sequence WHERE prefix = '{prefix}'))
+                WHERE rowid = NEW.rowid;
+            END
+        """
+
+    def connect(self, path):
+        return sqlite3.connect(path)
+
+class DuckDBDialect(SQLiteDialect):
+    """The dialect of DuckDB 0.8 or later, which has no triggers."""
+
+    name = 'duckdb'
+    supports_triggers = False
+
+    def column_type(self, data_type, column_type):
+        if data_type == 'bigint':
+            return 'UBIGINT' if 'unsigned' in column_type else 'BIGINT'
+        if data_type in {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'year'}:
+            return 'BIGINT' if 'unsigned' in column_type else 'INTEGER'
+        if data_type == 'decimal':
+            return column_type.replace('unsigned', '').strip().upper()
+        if data_type in {'date', 'time'}:
+            return data_type.upper()
+        if data_type in {'datetime', 'timestamp'}:
+            return 'TIMESTAMP'
+        if data_type in {'float', 'double'}:
+            return 'DOUBLE'
+        if data_type in {'binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob'}:
+            return 'BLOB'
+        return 'VARCHAR'
+
+    def adapt(self, value):
+        if isinstance(value, datetime.timedelta):
+            return _format_time(value)
+        return value
+
+    def group_concat(self, expr, separator=','):
+        return f"string_agg({expr}, '{separator}')"
+
+    def code_trigger(self, table, column, prefix, padding):
+        return None
+
+    def connect(self, path):
+        try:
+            import duckdb #pylint:disable=import-outside-toplevel;
+        except ImportError as err:
+            raise ImportError('Building a DuckDB database requires duckdb.') from err
+        return duckdb.connect(path)
+
+def _format_time(delta):
+    """Formats a MySQL TIME value, which the connector reads as a timedelta, as HH:MM:SS."""
+
+    seconds = int(delta.total_seconds())
+    sign = '-' if seconds < 0 else ''
+    hours, rest = divmod(abs(seconds), 3600)
+    return f'{sign}{hours:02d}:{rest // 60:02d}:{rest % 60:02d}'
+
+MYSQL = Dialect()
+SQLITE = SQLiteDialect()
+DUCKDB = DuckDBDialect()
+
+# Dialects of the embedded databases, by name
+EMBEDDED = {dialect.name: dialect for dialect in (SQLITE, DUCKDB)}
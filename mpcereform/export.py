@@ -0,0 +1,149 @@
+"""Export of database tables to Parquet or CSV files, for analysis.
+
+Each table is streamed from the server in chunks, through an unbuffered
+cursor, so no more than one chunk of a table is held in memory. With pyarrow
+installed, tables are written to Parquet with a typed column for each
+database column, and code columns (e.g. `agent_code`) are dictionary
+encoded, so they load into pandas as categoricals. Otherwise tables are
+written to CSV.
+"""
+
+import csv
+import os
+import re
+
+from mpcereform import connections
+
+# Columns of codes, which repeat across many rows
+CODE_COLUMN_RGX = re.compile(r'(^|_)code$')
+
+FORMATS = ('parquet', 'csv')
+
+def parquet_available():
+    """Tells whether pyarrow is installed, so that tables can be written to Parquet."""
+
+    try:
+        import pyarrow #pylint:disable=import-outside-toplevel,unused-import;
+    except ImportError:
+        return False
+    return True
+
+def table_columns(cur, schema, table):
+    """Returns the (name, data type, column type, precision, scale) of each column of a table."""
+
+    cur.execute("""
+        SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+        ORDER BY ORDINAL_POSITION
+    """, (schema, table))
+    return [(name, data_type.lower(), column_type.lower(), precision, scale)
+            for name, data_type, column_type, precision, scale in cur.fetchall()]
+
+def is_code_column(name, data_type):
+    """Tells whether a column holds codes, which are dictionary encoded."""
+
+    return data_type in {'char', 'varchar'} and CODE_COLUMN_RGX.search(name) is not None
+
+def arrow_schema(columns):
+    """Returns the pyarrow schema for a table's columns, as given by `table_columns`."""
+
+    import pyarrow as pa #pylint:disable=import-outside-toplevel;
+
+    def arrow_type(name, data_type, column_type, precision, scale):
+        if is_code_column(name, data_type):
+            return pa.dictionary(pa.int32(), pa.string())
+        if column_type.startswith('tinyint(1)'):
+            return pa.bool_()
+        if data_type == 'bigint':
+            return pa.uint64() if 'unsigned' in column_type else pa.int64()
+        if data_type in {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'year'}:
+            return pa.int64() if 'unsigned' in column_type else pa.int32()
+        if data_type == 'decimal':
+            return pa.decimal128(precision, scale)
+        if data_type == 'float':
+            return pa.float32()
+        if data_type == 'double':
+            return pa.float64()
+        if data_type == 'date':
+            return pa.date32()
+        if data_type in {'datetime', 'timestamp'}:
+            return pa.timestamp('us')
+        if data_type == 'time':
+            return pa.duration('us')
+        if data_type in {'binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob'}:
+            return pa.binary()
+        return pa.string()
+
+    return pa.schema([(column[0], arrow_type(*column)) for column in columns])
+
+def export_table(conn, schema, table, directory, fmt='parquet', chunk_size=50000):
+    """Streams one table into a Parquet or CSV file named after it.
+
+    Arguments:
+    ==========
+        conn (MySQLConnection): connection to read the table on
+        schema (str): database the table is in
+        table (str): name of the table
+        directory (str): where to write the file
+        fmt (str): 'parquet' or 'csv'
+        chunk_size (int): number of rows fetched and written at a time
+
+    Returns:
+    ==========
+        The path of the file and the number of rows written
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}: use one of {", ".join(FORMATS)}')
+
+    with connections.cursor(conn) as cur:
+        columns = table_columns(cur, schema, table)
+    pth = os.path.join(directory, f'{table}.{fmt}')
+
+    # An unbuffered cursor fetches each chunk from the server as it is needed
+    with connections.cursor(conn, buffered=False) as cur:
+        cur.execute(f'SELECT * FROM `{schema}`.`{table}`')
+        chunks = iter(lambda: cur.fetchmany(chunk_size), [])
+        if fmt == 'parquet':
+            rows = _write_parquet(pth, columns, chunks)
+        else:
+            rows = _write_csv(pth, columns, chunks)
+
+    return pth, rows
+
+def _write_parquet(pth, columns, chunks):
+    """Writes chunks of rows to a Parquet file, one row group per chunk."""
+
+    import pyarrow as pa #pylint:disable=import-outside-toplevel;
+    import pyarrow.parquet as pq #pylint:disable=import-outside-toplevel;
+
+    schema = arrow_schema(columns)
+    rows = 0
+    with pq.ParquetWriter(pth, schema) as writer:
+        for chunk in chunks:
+            arrays = []
+            for field, values in zip(schema, zip(*chunk)):
+                if pa.types.is_dictionary(field.type):
+                    arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+                elif pa.types.is_boolean(field.type):
+                    # The connector returns TINYINT(1) values as ints
+                    arrays.append(pa.array([None if val is None else bool(val) for val in values],
+                                           type=field.type))
+                else:
+                    arrays.append(pa.array(values, type=field.type))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+def _write_csv(pth, columns, chunks):
+    """Writes chunks of rows to a CSV file, with a header row of column names."""
+
+    rows = 0
+    with open(pth, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow([column[0] for column in columns])
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
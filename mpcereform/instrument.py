@@ -0,0 +1,197 @@
+"""Timing, row-count and traffic instrumentation for the build."""
+
+import json
+import re
+import threading
+from contextlib import contextmanager
+from time import perf_counter, thread_time
+
+class Instrument():
+    """Records what each phase of the build, and each statement it executes, costs.
+
+    Connections passed through `wrap` hand out cursors that time every
+    `execute` and `executemany`. Statements are attributed to the phase
+    running on the calling thread (see `phase`), or to None outside a phase,
+    unless the connection was wrapped with a phase of its own.
+
+    For each statement, `wall` is the elapsed time, `cpu` the Python CPU time
+    spent by the calling thread, and `wait` the difference between the two:
+    the time the thread spent off the CPU. That is mostly waiting for the
+    server and the network, but it also includes waiting for locks and for
+    other threads to release the GIL, so it is not the server's own time.
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.statements = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def wrap(self, conn, phase=None):
+        """Returns a proxy for a connection, whose cursors are instrumented.
+
+        If a phase is given, every statement on the connection is attributed
+        to it, e.g. for connections used by threads that a phase started."""
+        return InstrumentedConnection(conn, self, phase)
+
+    def current_phase(self):
+        """Returns the name of the phase running on the calling thread, or None."""
+        return getattr(self._local, 'phase', None)
+
+    @contextmanager
+    def phase(self, name, conn=None):
+        """Records the cost of the phase run inside the block.
+
+        If a connection is given, the bytes the server received on it during
+        the phase are recorded too."""
+
+        self._local.phase = name
+        first_statement = len(self.statements)
+        bytes_before = _bytes_received(conn)
+        start, cpu_start = perf_counter(), thread_time()
+        try:
+            yield
+        finally:
+            wall = perf_counter() - start
+            cpu = thread_time() - cpu_start
+            bytes_after = _bytes_received(conn)
+            self._local.phase = None
+            with self._lock:
+                statements = [stmt for stmt in self.statements[first_statement:]
+                              if stmt['phase'] == name]
+                rows = sum([stmt['rows'] for stmt in statements])
+                self.phases.append({
+                    'phase': name,
+                    'wall': wall,
+                    'wait': sum([stmt['wait'] for stmt in statements]),
+                    'cpu': cpu,
+                    'statements': len(statements),
+                    'rows': rows,
+                    'rows_per_second': rows / wall if wall else 0.0,
+                    'bytes_sent': (bytes_after - bytes_before
+                                   if None not in (bytes_before, bytes_after)
+                                   else sum([stmt['bytes_sent'] for stmt in statements]))
+                })
+
+    def record(self, operation, wall, cpu, rows, bytes_sent, phase=None):
+        """Records one statement, in the given phase or else the calling thread's."""
+
+        if isinstance(operation, (bytes, bytearray)):
+            operation = operation.decode('utf-8', errors='replace')
+        with self._lock:
+            self.statements.append({
+                'phase': phase if phase is not None else self.current_phase(),
+                'sql': re.sub(r'\s+', ' ', str(operation)).strip()[:200],
+                'wall': wall,
+                'wait': max(wall - cpu, 0.0),
+                'cpu': cpu,
+                'rows': max(rows, 0),
+                'bytes_sent': bytes_sent
+            })
+
+    def report(self):
+        """Returns everything recorded, as a dict that can be serialised to JSON."""
+
+        with self._lock:
+            return {'phases': list(self.phases), 'statements': list(self.statements)}
+
+    def write_json(self, pth):
+        """Writes the report to a JSON file."""
+
+        with open(pth, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def format_table(self, slowest=10):
+        """Returns the per-phase costs, and the slowest statements, as a text table."""
+
+        report = self.report()
+        lines = [
+            f"{'PHASE':<26} {'WALL(s)':>9} {'WAIT(s)':>10} {'CPU(s)':>8} "
+            f"{'STMTS':>6} {'ROWS':>9} {'ROWS/s':>9} {'SENT(kB)':>9}"
+        ]
+        for phase in report['phases']:
+            lines.append(
+                f"{phase['phase']:<26} {phase['wall']:9.2f} {phase['wait']:10.2f} "
+                f"{phase['cpu']:8.2f} {phase['statements']:6d} {phase['rows']:9d} "
+                f"{phase['rows_per_second']:9.0f} {phase['bytes_sent'] / 1024:9.1f}"
+            )
+
+        statements = sorted(report['statements'], key=lambda stmt: stmt['wall'], reverse=True)
+        if statements:
+            lines.extend(['', f'Slowest {min(slowest, len(statements))} statements:'])
+            for stmt in statements[:slowest]:
+                lines.append(
+                    f"{stmt['wall']:9.2f}s {stmt['rows']:9d} rows  "
+                    f"[{stmt['phase']}] {stmt['sql'][:70]}"
+                )
+
+        return '\n'.join(lines)
+
+class InstrumentedConnection():
+    """Proxy for a connection, which hands out instrumented cursors."""
+
+    def __init__(self, conn, instrument, phase=None):
+        self.raw = conn
+        self.instrument = instrument
+        self.phase = phase
+
+    def cursor(self, *args, **kwargs):
+        """Returns an instrumented cursor."""
+        return InstrumentedCursor(self.raw.cursor(*args, **kwargs), self.instrument, self.phase)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+class InstrumentedCursor():
+    """Proxy for a cursor, which records each statement it executes."""
+
+    def __init__(self, cur, instrument, phase=None):
+        self.raw = cur
+        self.instrument = instrument
+        self.phase = phase
+
+    def execute(self, operation, *args, **kwargs):
+        """Executes a statement, recording its cost."""
+
+        if kwargs.get('multi'):
+            return self.raw.execute(operation, *args, **kwargs)
+        start, cpu_start = perf_counter(), thread_time()
+        result = self.raw.execute(operation, *args, **kwargs)
+        self._record(operation, start, cpu_start)
+        return result
+
+    def executemany(self, operation, *args, **kwargs):
+        """Executes a statement for a sequence of parameters, recording the total cost."""
+
+        start, cpu_start = perf_counter(), thread_time()
+        result = self.raw.executemany(operation, *args, **kwargs)
+        self._record(operation, start, cpu_start)
+        return result
+
+    def _record(self, operation, start, cpu_start):
+        wall = perf_counter() - start
+        cpu = thread_time() - cpu_start
+        # The statement as sent, with its parameters interpolated, where known
+        sent = getattr(self.raw, 'statement', None) or operation
+        if isinstance(sent, str):
+            sent = sent.encode('utf-8')
+        self.instrument.record(operation, wall, cpu, self.raw.rowcount, len(sent), self.phase)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+def _bytes_received(conn):
+    """Returns the number of bytes the server has received on a connection, if known."""
+
+    if conn is None:
+        return None
+    cur = getattr(conn, 'raw', conn).cursor()
+    try:
+        cur.execute("SHOW SESSION STATUS LIKE 'Bytes_received'")
+        result = cur.fetchone()
+    finally:
+        cur.close()
+    return int(result[1]) if result else None
@@ -0,0 +1,164 @@
+"""Cached lookup tables, such as `mpce.author_type`, for coding values by name.
+
+The small tables that code the values of other tables are read once per
+build. Names are matched by hash lookup in Python after normalisation (see
+`normalise_key`), or on the server by an equality join against a temporary
+key table of the names and aliases as they are written:
+
+    directions = db.lookups.table('transaction_direction', cur)
+    directions['out (return)']  # 2
+    key_table = directions.create_key_table(cur)
+    # ... LEFT JOIN {key_table} AS td ON t.direction_of_transaction = td.name
+"""
+
+import re
+import threading
+import unicodedata
+
+WHITESPACE_RGX = re.compile(r'\s+')
+
+def normalise_key(value):
+    """Returns the form of a name that lookups match on.
+
+    Case, accents and surrounding or repeated whitespace are ignored, as the
+    server's case-insensitive collation ignores case and accents."""
+
+    if value is None:
+        return None
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join([char for char in value if not unicodedata.combining(char)])
+    return WHITESPACE_RGX.sub(' ', value).strip().casefold()
+
+class LookupTable():
+    """The ids of the names in one lookup table, and any aliases of those names.
+
+    Arguments:
+    ==========
+        table (str): name of the table in `mpce`
+        id_column (str): the table's id column
+        name_column (str): the column of names
+        aliases (dict): maps other names to one of the table's names, or
+            directly to an id
+    """
+
+    def __init__(self, table, id_column, name_column, aliases=None):
+        self.table = table
+        self.id_column = id_column
+        self.name_column = name_column
+        self.aliases = dict(aliases or {})
+        self._ids = None
+        self._names = None
+
+    def load(self, cur):
+        """Reads the table, and resolves the aliases."""
+
+        cur.execute(f'SELECT `{self.id_column}`, `{self.name_column}` FROM mpce.`{self.table}`')
+        ids = {}
+        names = []
+        for id_, name in cur.fetchall():
+            self._add(ids, name, id_)
+            names.append((name, id_))
+        for alias, target in self.aliases.items():
+            if isinstance(target, str):
+                if normalise_key(target) not in ids:
+                    raise ValueError(f'Alias {alias!r} refers to {target!r}, which is not in mpce.{self.table}')
+                target = ids[normalise_key(target)]
+            self._add(ids, alias, target)
+            names.append((alias, target))
+        self._ids = ids
+        self._names = [(name, id_) for name, id_ in names if name is not None]
+
+    def _add(self, ids, name, id_):
+        key = normalise_key(name)
+        if key is None:
+            return
+        if ids.get(key, id_) != id_:
+            raise ValueError(f'{name!r} has two ids in mpce.{self.table}: {ids[key]} and {id_}')
+        ids[key] = id_
+
+    def __getitem__(self, name):
+        return self._ids[normalise_key(name)]
+
+    def __contains__(self, name):
+        return normalise_key(name) in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get(self, name, default=None):
+        """Returns the id of a name, or `default` if it is not in the table."""
+
+        return self._ids.get(normalise_key(name), default)
+
+    def items(self):
+        """Returns the (normalised name, id) of every name and alias."""
+
+        return list(self._ids.items())
+
+    @property
+    def key_table(self):
+        """Name of the temporary table created by `create_key_table`."""
+
+        return f'mpce.{self.table}_key'
+
+    def create_key_table(self, cur, names=None):
+        """Creates a temporary table of names and ids, for equality joins on the server.
+
+        The table has the columns `name`, its primary key, and `id`. The
+        names and aliases go in as they are written, not normalised, as the
+        joins compare them with source columns as they are stored. The
+        server's case-insensitive collation ignores case and accents, and
+        names that it finds equal are only inserted once. Drop the table
+        with `DROP TEMPORARY TABLE` when finished.
+
+        Arguments:
+        ==========
+            cur (MySQLCursor): cursor to create the table on
+            names (sequence): if given, only these names and aliases are put
+                in the table, so that any other value joins to NULL
+
+        Returns:
+        ==========
+            The name of the temporary table
+        """
+
+        items = self._names
+        if names is not None:
+            items = [(name, self[name]) for name in names]
+
+        key_table = self.key_table
+        cur.execute(f'DROP TEMPORARY TABLE IF EXISTS {key_table}')
+        cur.execute(f"""
+            CREATE TEMPORARY TABLE {key_table} (
+                name VARCHAR(255) PRIMARY KEY,
+                id INT
+            )
+        """)
+        cur.executemany(f'INSERT IGNORE INTO {key_table} (name, id) VALUES (%s, %s)', items)
+        return key_table
+
+class LookupRegistry():
+    """Loads every registered lookup table the first time any of them is needed.
+
+    The lookup tables are created with the schema and never change, so the
+    registry is shared by a LocalDB and its workers.
+
+    Arguments:
+    ==========
+        tables (dict): maps each table to its (id column, name column, aliases)
+    """
+
+    def __init__(self, tables):
+        self._tables = {table: LookupTable(table, *spec) for table, spec in tables.items()}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def table(self, name, cur):
+        """Returns a lookup table, loading every table on `cur` if they are not yet loaded."""
+
+        with self._lock:
+            if not self._loaded:
+                for lookup in self._tables.values():
+                    lookup.load(cur)
+                self._loaded = True
+        return self._tables[name]
@@ -0,0 +1,155 @@
+"""Declarative mappings from spreadsheet sheets to database tables."""
+
+from mpcereform.pipeline import map_chunks
+from mpcereform.utils import convert_colname
+
+class SheetMapping():
+    """Declares how the rows of one sheet are loaded into one table.
+
+    The columns read, and the table and columns written, come from a record
+    type (see `mpcereform.records`). The mapping adds the transformations,
+    and where the data starts and ends. Rather than a fixed last row, the data
+    ends at the first row that is empty in the `key` column, or in every
+    mapped column, so new rows are picked up and the rest of the sheet is
+    never read.
+
+    Only the steps a mapping declares are compiled into its loader.
+
+    Arguments:
+    ==========
+        workbook (str): file name of the workbook
+        sheet (str): name of the sheet
+        record (type): the record type of the sheet's rows
+        first_row (int): the first row of data, below any header
+        key (str): letter of a column that is filled in on every row of data
+        clean (callable): applied to every value read
+        fields (dict): maps field names to functions applied to their values
+        transform (callable): applied to each record after `fields`. Returns
+            the record to write, or None to skip the row
+        split (callable): applied to each record. Returns an iterable of the
+            records to write in its place
+        batch (callable): applied to each chunk of records. Returns the
+            records to write, e.g. with a column of dates parsed at once
+    """
+
+    def __init__(self, workbook, sheet, record, first_row=2, key=None, clean=None,
+                 fields=None, transform=None, split=None, batch=None):
+        self.workbook = workbook
+        self.sheet = sheet
+        self.record = record
+        self.first_row = first_row
+        self.key = key
+        self.clean = clean
+        self.fields = dict(fields or {})
+        self.transform = transform
+        self.split = split
+        self.batch = batch
+
+        unknown = set(self.fields) - set(record._fields)
+        if unknown:
+            raise ValueError(f'{record.__name__} has no fields: {", ".join(sorted(unknown))}')
+        self.max_col = max(record.MAX_COL, convert_colname(key) + 1 if key else 0)
+        self._is_end = _end_test(record, key)
+        self._loader = self._compile()
+
+    def records(self, rows, size=1000):
+        """Yields the records to write, given the sheet's rows from `first_row` on.
+
+        Arguments:
+        ==========
+            rows (iterable): rows of at least `max_col` values
+            size (int): number of records passed to `batch` at a time
+        """
+
+        return self._loader(rows, size)
+
+    def extent(self, rows):
+        """Yields the sheet's rows from `first_row` on, up to the end of the data.
+
+        Arguments:
+        ==========
+            rows (iterable): rows of at least `max_col` values
+        """
+
+        is_end = self._is_end
+        for row in rows:
+            if is_end(row):
+                return
+            yield row
+
+    def load(self, db, **kwargs):
+        """Streams the sheet into its table.
+
+        Arguments:
+        ==========
+            db (LocalDB): the database to load, which supplies the rows and writer
+            kwargs: passed on to the bulk writer, e.g. `on_duplicate`
+
+        Returns:
+        ==========
+            The number of rows affected
+        """
+
+        rows = db.sheet_rows(self.workbook, self.sheet, min_row=self.first_row,
+                             max_col=self.max_col)
+        writer = db.bulk_writer(self.record.TABLE, self.record.COLUMNS, **kwargs)
+        return writer.write(self.records(rows, db.batch_size))
+
+    def _compile(self):
+        """Builds the loader, a generator function with only the declared steps."""
+
+        record = self.record
+        read = _reader(record, self.clean, self.fields)
+        extent = self.extent
+
+        stages = [lambda records, size: map(read, extent(records))]
+        if self.transform is not None:
+            transform = self.transform
+            stages.append(lambda records, size: (
+                rec for rec in map(transform, records) if rec is not None))
+        if self.split is not None:
+            split = self.split
+            stages.append(lambda records, size: (
+                part for rec in records for part in split(rec)))
+        if self.batch is not None:
+            batch = self.batch
+            stages.append(lambda records, size: map_chunks(batch, records, size))
+
+        def loader(rows, size):
+            for stage in stages:
+                rows = stage(rows, size)
+            return rows
+
+        return loader
+
+def _reader(record, clean, fields):
+    """Returns a function that builds a record from a row, applying `clean` and `fields`."""
+
+    if not fields:
+        return lambda row: record.read(row, clean)
+
+    converters = [fields.get(name) for name in record._fields]
+    steps = list(zip(record.INDEXES, converters))
+
+    def read(row):
+        values = []
+        for idx, convert in steps:
+            value = None if idx is None else row[idx]
+            if clean is not None and idx is not None:
+                value = clean(value)
+            if convert is not None:
+                value = convert(value)
+            values.append(value)
+        return tuple.__new__(record, values)
+
+    return read
+
+def _end_test(record, key):
+    """Returns a function that tells whether a row is past the end of the data."""
+
+    if key is not None:
+        idx = convert_colname(key)
+        return lambda row: row[idx] is None
+
+    indexes = [idx for idx in record.INDEXES if idx is not None]
+    return lambda row: all([row[idx] is None for idx in indexes])
@@ -0,0 +1,79 @@
+"""Helpers for streaming rows from a source to the database in bounded chunks."""
+
+import queue
+import threading
+from itertools import islice
+
+# Marks the end of a prefetched stream
+_DONE = object()
+
+def chunked(rows, size):
+    """Yields lists of up to `size` rows from an iterable."""
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def map_chunks(func, rows, size):
+    """Applies a function to each chunk of `size` rows, and yields the rows it returns.
+
+    Use this for transformations that are cheaper over many rows at once,
+    such as `parse_dates`, without holding more than one chunk in memory."""
+
+    for chunk in chunked(rows, size):
+        yield from func(chunk)
+
+def prefetch(rows, size, depth=2):
+    """Reads an iterable on a background thread, and yields its rows.
+
+    The reader stays at most `depth` chunks of `size` rows ahead of the
+    consumer, so memory is bounded however long the iterable is, while the
+    consumer (e.g. a database write) overlaps with the reading (e.g. XLSX
+    parsing). Exceptions raised by the reader are re-raised in the consumer.
+
+    Arguments:
+    ==========
+        rows (iterable): the rows to read
+        size (int): number of rows handed over at a time
+        depth (int): number of chunks the reader may get ahead by
+    """
+
+    chunks = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up if the consumer has stopped listening
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        try:
+            for chunk in chunked(rows, size):
+                if not put(chunk):
+                    return
+        except Exception as err: #pylint:disable=broad-except;
+            put(err)
+            return
+        put(_DONE)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _DONE:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield from chunk
+    finally:
+        stop.set()
+        reader.join()
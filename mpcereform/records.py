@@ -0,0 +1,248 @@
+"""Compact record types for the rows of the data spreadsheets.
+
+Each record type is a named tuple (so it has no per-row `__dict__`) that
+declares, for each of its fields, the spreadsheet column it is read from and
+the database column it is written to. Records are plain tuples in the order
+of `COLUMNS`, so they can be handed straight to a positional bulk writer:
+
+    writer = db.bulk_writer(Consignment.TABLE, Consignment.COLUMNS)
+    writer.write(Consignment.read(row) for row in rows)
+
+The declarations are validated once, when the record type is built, rather
+than on every row.
+"""
+
+import re
+from collections import namedtuple
+
+from mpcereform.utils import convert_colname
+
+COLUMN_LETTERS = re.compile(r'[A-Z]{1,3}')
+
+class Record(tuple):
+    """Base class of the spreadsheet record types. See `record_type`."""
+
+    __slots__ = ()
+
+    # Table the records are written to, and its columns in field order
+    TABLE = None
+    COLUMNS = ()
+    # Spreadsheet column letter and index of each field, or None for derived fields
+    LETTERS = ()
+    INDEXES = ()
+    # Number of spreadsheet columns that must be read to fill a record
+    MAX_COL = 0
+
+    @classmethod
+    def read(cls, row, clean=None):
+        """Builds a record from a spreadsheet row.
+
+        Derived fields are left as None, to be filled in with `_replace`.
+
+        Arguments:
+        ==========
+            row (sequence): values of the row, at least MAX_COL of them
+            clean (callable): applied to every value read, if given
+
+        Returns:
+        ==========
+            A new record
+        """
+
+        if clean is None:
+            return tuple.__new__(cls, [None if idx is None else row[idx] for idx in cls.INDEXES])
+        return tuple.__new__(cls, [None if idx is None else clean(row[idx]) for idx in cls.INDEXES])
+
+def record_type(name, table, fields):
+    """Builds a record type for the rows of a sheet.
+
+    Arguments:
+    ==========
+        name (str): name of the record type
+        table (str): table the records are written to
+        fields (sequence): (attribute, column letter, database column) for
+            each field, in the order they are written. Fields with no column
+            letter are derived, rather than read from the sheet
+
+    Returns:
+    ==========
+        A subclass of Record
+    """
+
+    attributes = [attr for attr, _, _ in fields]
+    columns = [column for _, _, column in fields]
+    letters = [letter for _, letter, _ in fields]
+
+    for kind, names in (('attribute', attributes), ('column', columns)):
+        duplicates = sorted({nme for nme in names if names.count(nme) > 1})
+        if duplicates:
+            raise ValueError(f'{name} declares duplicate {kind}s: {", ".join(duplicates)}')
+    for attr, letter in zip(attributes, letters):
+        if letter is not None and not COLUMN_LETTERS.fullmatch(letter):
+            raise ValueError(f'{name}.{attr} has an invalid column letter: {letter!r}')
+
+    indexes = tuple(None if letter is None else convert_colname(letter) for letter in letters)
+    return type(name, (Record, namedtuple(name, attributes)), {
+        '__slots__': (),
+        '__doc__': f'A row of the spreadsheet data for `{table}`.',
+        'TABLE': table,
+        'COLUMNS': tuple(columns),
+        'LETTERS': tuple(letters),
+        'INDEXES': indexes,
+        'MAX_COL': max([idx + 1 for idx in indexes if idx is not None], default=0)
+    })
+
+# consignments.xlsx, 'List of new places'
+NewPlace = record_type('NewPlace', 'mpce.place', [
+    (column.lower(), letter, column) for column, letter in zip([
+        'place_code', 'name', 'alternative_names', 'C18_lower_territory',
+        'C18_sovereign_territory', 'C21_admin', 'C21_country', 'geographic_zone',
+        'BSR', 'EL', 'HRE', 'IFC', 'P', 'HE', 'HT', 'WT', 'PT', 'PrT',
+        'distance_from_neuchatel', 'latitude', 'longitude', 'geoname', 'notes'
+    ], 'ABCDEFGHIJKLMNOPQRSTUVW')
+])
+
+# consignments.xlsx, 'Confiscations master'
+Consignment = record_type('Consignment', 'mpce.consignment', [
+    ('id', 'A', 'ID'),
+    ('uuid', None, 'UUID'),
+    ('confiscation_register_ms', 'B', 'confiscation_register_ms'),
+    ('confiscation_register_folio', 'C', 'confiscation_register_folio'),
+    ('customs_register_ms', 'D', 'customs_register_ms'),
+    ('customs_register_folio', 'E', 'customs_register_folio'),
+    ('ms_21935_folio', 'F', 'ms_21935_folio'),
+    ('ms_21935_entry_no', 'AS', 'ms_21935_entry_no'),
+    ('shipping_number', 'H', 'shipping_number'),
+    ('marque', 'I', 'marque'),
+    ('inspection_date', 'G', 'inspection_date'),
+    ('origin_text', 'AH', 'origin_text'),
+    ('origin_code', 'AI', 'origin_code'),
+    ('other_stakeholder', 'AG', 'other_stakeholder'),
+    ('acquit_a_caution', 'J', 'acquit_a_caution'),
+    ('returned_to_name', 'AK', 'returned_to_name'),
+    ('returned_to_agent', 'AM', 'returned_to_agent'),
+    ('returned_to_town', 'AO', 'returned_to_town'),
+    ('returned_to_place', 'AP', 'returned_to_place'),
+    ('notes', 'AQ', 'notes')
+])
+
+# consignments.xlsx, 'People Final'
+ConsignmentClient = record_type('ConsignmentClient', 'mpce.all_clients', [
+    ('code', 'D', 'client_code'),
+    ('name', 'C', 'name'),
+    ('notes', 'E', 'notes'),
+    ('title', 'F', 'title'),
+    ('addresses', 'H', 'place_codes'),
+    ('professions', 'J', 'prof_codes'),
+    ('sex', 'K', 'gender'),
+    ('corporate', 'L', 'corporate')
+])
+
+# permission_simple.xlsx, 'Licences'
+PermissionGrant = record_type('PermissionGrant', 'mpce.permission_simple_grant', [
+    ('dawson_work', 'A', 'dawson_work'),
+    ('dawson_edition', 'B', 'dawson_edition'),
+    ('date_granted', 'C', 'date_granted'),
+    ('edition_code', 'D', 'edition_code'),
+    ('licensee', 'G', 'licensee'),
+    ('licensed_copies', 'K', 'licensed_copies'),
+    ('printed_copies_estimate', 'L', 'printed_copies_estimate'),
+    ('work_confirmed', 'M', 'work_confirmed'),
+    ('edition_confirmed', 'N', 'edition_confirmed')
+])
+
+# permission_simple.xlsx, 'Editions'
+PermissionEdition = record_type('PermissionEdition', 'mpce.edition', [
+    ('edition_code', 'A', 'edition_code'),
+    ('edition_status', 'B', 'edition_status'),
+    ('edition_type', 'C', 'edition_type'),
+    ('full_book_title', 'E', 'full_book_title'),
+    ('short_book_titles', 'F', 'short_book_titles'),
+    ('translated_title', 'G', 'translated_title'),
+    ('translated_language', 'H', 'translated_language'),
+    ('languages', 'I', 'languages'),
+    ('imprint_publishers', 'J', 'imprint_publishers'),
+    ('actual_publishers', 'K', 'actual_publishers'),
+    ('imprint_publication_places', 'M', 'imprint_publication_places'),
+    ('actual_publication_places', 'N', 'actual_publication_places'),
+    ('imprint_publication_years', 'P', 'imprint_publication_years'),
+    ('actual_publication_years', 'Q', 'actual_publication_years'),
+    ('pages', 'R', 'pages'),
+    ('quick_pages', 'S', 'quick_pages'),
+    ('number_of_volumes', 'T', 'number_of_volumes'),
+    ('section', 'U', 'section'),
+    ('edition', 'V', 'edition'),
+    ('book_sheets', 'W', 'book_sheets'),
+    ('notes', 'AB', 'notes'),
+    ('research_notes', 'AC', 'research_notes'),
+    ('url', 'AD', 'url')
+])
+
+# permission_simple.xlsx, 'Clients'
+PermissionClient = record_type('PermissionClient', 'mpce.all_clients', [
+    ('code', 'A', 'client_code'),
+    ('name', 'B', 'name'),
+    ('alt_name', 'C', 'alt_name'),
+    ('gender', 'D', 'gender'),
+    ('professions', 'F', 'prof_codes'),
+    ('places', 'H', 'place_codes'),
+    ('notes', 'I', 'notes')
+])
+
+# condemnations.xlsx, 'Sheet1'
+Condemnation = record_type('Condemnation', 'mpce.condemnation', [
+    ('folio', 'A', 'folio'),
+    ('title', 'B', 'title'),
+    ('notes', 'C', 'notes'),
+    ('institution_text', 'D', 'institution_text'),
+    ('date', 'E', 'date'),
+    ('other_judgment', 'F', 'other_judgment')
+])
+
+# CommandesLibrairesfrancais.xlsx, 'FicheSauvegarde'
+DarntonOrder = record_type('DarntonOrder', 'mpce.stn_darnton_sample_order', [
+    ('id', 'H', 'ID'),
+    ('title', 'A', 'title'),
+    ('format', 'B', 'format'),
+    ('volumes', 'C', 'volumes'),
+    ('author', 'D', 'author'),
+    ('num_ordered', 'E', 'num_ordered'),
+    ('date_ordered', 'F', 'date_ordered'),
+    ('edition_long_title', 'G', 'edition_long_title'),
+    ('ordered_by', 'I', 'ordered_by'),
+    ('notes', 'K', 'notes')
+])
+
+# provincial_inspections.xlsx, 'Amalgamated sheet'. Loaded into a temporary
+# table first, so that place names can be resolved to codes.
+ProvincialInspection = record_type('ProvincialInspection', 'mpce.prov_insp_temp', [
+    ('ms_ref', 'A', 'ms_ref'),
+    ('folio', 'B', 'folio'),
+    ('inspected_in', 'C', 'inspected_in'),
+    ('item', 'D', 'item'),
+    ('inspected_on', 'E', 'inspected_on'),
+    ('ballot', 'F', 'ballot'),
+    ('consignment', 'G', 'consignment'),
+    ('acquit_a_caution', 'H', 'acquit_a_caution'),
+    ('origin', 'I', 'origin'),
+    ('author', 'J', 'author'),
+    ('title', 'K', 'title'),
+    ('imprint_place', 'L', 'imprint_place'),
+    ('imprint_publisher', 'M', 'imprint_publisher'),
+    ('imprint_date', 'N', 'imprint_date'),
+    ('volumes', 'O', 'volumes'),
+    ('format', 'P', 'format'),
+    ('languages', 'Q', 'languages'),
+    ('addressee', 'R', 'addressee'),
+    ('num_copies', 'S', 'num_copies'),
+    ('inspected_by', 'T', 'inspected_by'),
+    ('decision', 'U', 'decision'),
+    ('decision_date', 'V', 'decision_date'),
+    ('notes', 'W', 'notes')
+])
+
+# Every record type, e.g. for validating the spreadsheets or generating test data
+RECORD_TYPES = (
+    NewPlace, Consignment, ConsignmentClient, PermissionGrant, PermissionEdition,
+    PermissionClient, Condemnation, DarntonOrder, ProvincialInspection
+)
@@ -1,7 +1,10 @@
 """Command for reshaping existing 'manuscripts' database, and porting it to the new structure"""
 import sys
 import argparse
+from mpcereform.benchmark import format_results, run_benchmark, write_results
 from mpcereform.core import LocalDB
+from mpcereform.snapshots import DEFAULT_DIRECTORY
+from mpcereform.workbooks import WorkbookCache
 
 def main():
     """Main entry point for the script"""
@@ -15,38 +18,184 @@ def main():
     parser.add_argument('-hst', '--host', type=str,
                         help='hostname for your MySQL/MariaDB server (defaults to localhost)',
                         default='127.0.0.1')
+    parser.add_argument('-s', '--snapshot-dir', type=str,
+                        help=('directory of spreadsheet snapshots built by `snapshot-spreadsheets` '
+                              f'(defaults to {DEFAULT_DIRECTORY})'),
+                        default=DEFAULT_DIRECTORY)
+    parser.add_argument('--spreadsheet-dir', type=str,
+                        help=('directory to read the data spreadsheets from, instead of the '
+                              'copies bundled with this package'),
+                        default=None)
+    parser.add_argument('-b', '--batch-size', type=int,
+                        help='rows per INSERT statement when bulk loading data (defaults to 1000)',
+                        default=1000)
+    parser.add_argument('--no-local-infile', dest='local_infile', action='store_false',
+                        help='never use LOAD DATA LOCAL INFILE to bulk load data')
+    parser.add_argument('--copy-chunk-size', type=int,
+                        help=('rows per statement, and per transaction, when copying large STN '
+                              'tables (defaults to 50000)'),
+                        default=50000)
+    parser.add_argument('-j', '--jobs', type=int,
+                        help=('number of import phases to run at once, each on its own connection '
+                              '(defaults to 1)'),
+                        default=1)
+    parser.add_argument('-c', '--commit', dest='commit_policy', type=str,
+                        choices=list(LocalDB.COMMIT_POLICIES),
+                        help=('when to commit imported data: '
+                              + '; '.join([f"'{policy}' {desc}" for policy, desc
+                                           in LocalDB.COMMIT_POLICIES.items()])
+                              + " (defaults to 'statement')"),
+                        default='statement')
+    parser.add_argument('--keep-phases', action='store_true',
+                        help=("with the 'build' commit policy, commit the phases that finished "
+                              'if a later phase fails, rather than rolling back the whole build'))
+    parser.add_argument('--tune-session', action='store_true',
+                        help=('turn off unique and foreign key checks and binary logging, and relax '
+                              'InnoDB log flushing, until the build is finished (needs privileges '
+                              'to set these variables)'))
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help=('update an existing MPCE database, re-running only the import phases '
+                              'whose source tables or spreadsheets have changed since it was built'))
+    parser.add_argument('--check-dates', action='store_true',
+                        help=('before building, check that the server parses every client and '
+                              'person date exactly as the Python date parser does'))
+    parser.add_argument('--match-report', type=str,
+                        help=('propose matches between new authors and clients and existing agents '
+                              'by name, and write them to this CSV file for checking'),
+                        default=None)
+    parser.add_argument('-e', '--export', type=str,
+                        help=('after building, export every table to this directory, as Parquet '
+                              'files if pyarrow is installed and CSV files otherwise'),
+                        default=None)
+    parser.add_argument('--export-format', type=str, choices=['parquet', 'csv'],
+                        help='file format for --export (defaults to Parquet if available)',
+                        default=None)
+    parser.add_argument('--embedded', type=str,
+                        help=('after building, copy the database into this SQLite or DuckDB file, '
+                              'for use without a server'),
+                        default=None)
+    parser.add_argument('--embedded-backend', type=str, choices=['sqlite', 'duckdb'],
+                        help="database engine for --embedded (defaults to 'sqlite')",
+                        default='sqlite')
+    parser.add_argument('-m', '--metrics', type=str,
+                        help=('where to write the timings, row counts and traffic of each phase '
+                              'and statement, as JSON (defaults to reform-db-metrics.json)'),
+                        default='reform-db-metrics.json')
 
     args = parser.parse_args()
 
     arg_dict = vars(args)
+    jobs = arg_dict.pop('jobs')
+    metrics = arg_dict.pop('metrics')
+    check_dates = arg_dict.pop('check_dates')
+    match_report = arg_dict.pop('match_report')
+    export = arg_dict.pop('export')
+    export_format = arg_dict.pop('export_format')
+    embedded = arg_dict.pop('embedded')
+    embedded_backend = arg_dict.pop('embedded_backend')
 
     # Start connection, build schema if necessary
     print('\nDATABASE CONNECTION')
     print('======================\n')
-    db = LocalDB(**arg_dict) #pylint:disable=invalid-name;
+    db = LocalDB(pool_size=max(jobs, 1), propose_matches=match_report is not None, #pylint:disable=invalid-name;
+                 **arg_dict)
 
-    # Run import methods
-    print('\nENTITY IMPORT')
-    print('======================\n')
-    db.import_works()
-    db.import_editions()
-    db.import_places()
+    if check_dates:
+        print('\nCHECKING DATE PARSING')
+        print('======================\n')
+        if db.create_routines():
+            for date_string, python, sql in db.check_date_parity():
+                print(f'{date_string!r}: Python {python}, SQL {sql}')
 
-    print('\nEVENT IMPORT')
-    print('======================\n')
-    db.import_stn()
-    db.import_new_tables()
-    db.import_data_spreadsheets()
+    # Run import methods. Phases that do not depend on each other run
+    # concurrently if jobs > 1.
+    print('\nBUILDING DATABASE')
+    print('======================')
+    db.run_build(jobs=jobs)
 
-    print('\nRESOLVING AGENT DATA')
-    print('======================\n')
-    db.resolve_agents()
+    db.summarise()
 
-    print('\nADDING ADDITIONAL STRUCTURE TO DATABASE')
+    print('\nBUILD METRICS')
     print('======================\n')
-    db.create_triggers()
+    print(db.instrument.format_table())
+    db.instrument.write_json(metrics)
+    print(f'\nMetrics for every phase and statement written to {metrics}.')
 
-    db.summarise()
+    if match_report is not None:
+        written = db.write_match_report(match_report)
+        print(f'{written} proposed agent matches written to {match_report}.')
+
+    if export is not None:
+        print('\nEXPORTING TABLES')
+        print('======================\n')
+        db.export(export, fmt=export_format, jobs=jobs)
+
+    if embedded is not None:
+        print('\nCOPYING TO EMBEDDED DATABASE')
+        print('======================\n')
+        db.build_embedded(embedded, backend=embedded_backend)
+
+def snapshot():
+    """Entry point for building columnar snapshots of the bundled spreadsheets"""
+
+    parser = argparse.ArgumentParser(
+        description='Build fast-loading snapshots of the bundled spreadsheets.')
+    parser.add_argument('-d', '--directory', type=str,
+                        help=f'where to write the snapshots (defaults to {DEFAULT_DIRECTORY})',
+                        default=DEFAULT_DIRECTORY)
+
+    args = parser.parse_args()
+
+    cache = WorkbookCache(LocalDB.SPREADSHEET_READS, snapshot_dir=args.directory)
+    written = cache.build_snapshots()
+    print(f'{len(written)} sheet snapshots written to {args.directory}.')
+
+def benchmark():
+    """Entry point for benchmarking the build against synthetic data"""
+
+    parser = argparse.ArgumentParser(
+        description=('Time each phase of the build against synthetic data. NB: this replaces the '
+                     "'manuscripts' and 'mpce' databases on the server."))
+    parser.add_argument('-u', '--user', type=str,
+                        help='username for your MySQL/MariaDB server', default='root')
+    parser.add_argument('-p', '--password', type=str,
+                        help='password for your MySQL/MariaDB server', default=None)
+    parser.add_argument('-hst', '--host', type=str,
+                        help='hostname for your MySQL/MariaDB server (defaults to localhost)',
+                        default='127.0.0.1')
+    parser.add_argument('--scales', type=int, nargs='+',
+                        help='multiples of the FBTEE-1 data volumes to benchmark (defaults to 1)',
+                        default=[1])
+    parser.add_argument('--seed', type=int,
+                        help='seed for the synthetic data (defaults to 0)', default=0)
+    parser.add_argument('-w', '--work-dir', type=str,
+                        help=('where to write the scaled spreadsheets (defaults to a temporary '
+                              'directory)'),
+                        default=None)
+    parser.add_argument('-b', '--batch-size', type=int,
+                        help='rows per INSERT statement when bulk loading data (defaults to 1000)',
+                        default=1000)
+    parser.add_argument('--no-local-infile', dest='local_infile', action='store_false',
+                        help='never use LOAD DATA LOCAL INFILE to bulk load data')
+    parser.add_argument('-o', '--output', type=str,
+                        help='where to write the results, as JSON (defaults to reform-db-benchmark.json)',
+                        default='reform-db-benchmark.json')
+
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        print(f'\nBENCHMARK AT SCALE {scale}')
+        print('======================\n')
+        results.extend(run_benchmark(
+            scale, seed=args.seed, user=args.user, host=args.host, password=args.password,
+            work_dir=args.work_dir, batch_size=args.batch_size, local_infile=args.local_infile))
+        write_results(results, args.output)
+
+    print('\nBENCHMARK RESULTS')
+    print('======================\n')
+    print(format_results(results))
+    print(f'\nResults written to {args.output}.')
 
 if __name__ == '__main__':
     sys.exit(main())
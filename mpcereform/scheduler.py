@@ -0,0 +1,113 @@
+"""Dependency-aware scheduling of the import phases."""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Scheduler():
+    """Works out which phases of the build depend on each other, and runs them.
+
+    A phase depends on every earlier phase that writes a table it reads or
+    writes, or reads a table it writes. Phases with no such conflict may run
+    at the same time.
+
+    Each table is owned by the first phase that writes it, other than phases
+    marked 'ddl', which only change its structure.
+
+    Arguments:
+    ==========
+        phases (dict): maps the name of each phase, in sequential order, to a
+            dict with the sets of tables it 'reads' and 'writes', and whether
+            it is a 'ddl' phase
+    """
+
+    def __init__(self, phases):
+        self.order = list(phases)
+        self.reads = {name: set(spec.get('reads', ())) for name, spec in phases.items()}
+        self.writes = {name: set(spec.get('writes', ())) for name, spec in phases.items()}
+
+        self.ddl = {name for name, spec in phases.items() if spec.get('ddl')}
+
+        self.owners = {}
+        for name in self.order:
+            if name in self.ddl:
+                continue
+            for table in self.writes[name]:
+                self.owners.setdefault(table, name)
+
+        self.depends = {}
+        for idx, name in enumerate(self.order):
+            self.depends[name] = {
+                earlier for earlier in self.order[:idx]
+                if self._conflicts(earlier, name)
+            }
+
+    def _conflicts(self, first, second):
+        """Checks whether two phases touch the same table, with at least one writing it."""
+
+        return bool(
+            self.writes[first] & (self.reads[second] | self.writes[second]) or
+            self.reads[first] & self.writes[second]
+        )
+
+    def dependents(self, names):
+        """Returns the given phases, and every phase downstream of them."""
+
+        found = set(names)
+        for name in self.order:
+            if self.depends[name] & found:
+                found.add(name)
+        return found
+
+    def owned(self, name):
+        """Returns the tables a phase owns."""
+        return {table for table, owner in self.owners.items() if owner == name}
+
+    def rerun_set(self, names):
+        """Returns the phases that must be re-run if the given phases are re-run.
+
+        Re-running a phase replaces the contents of the tables it owns. So every
+        phase downstream of it must be re-run, and so must the owners of any
+        tables it modifies but does not own, so that it starts from fresh rows.
+        ('ddl' phases only change the structure of tables, not their rows.)
+        """
+
+        rerun = set(names)
+        while True:
+            expanded = self.dependents(rerun)
+            for name in expanded - self.ddl:
+                for table in self.writes[name] - self.owned(name):
+                    if table in self.owners:
+                        expanded.add(self.owners[table])
+            if expanded == rerun:
+                return rerun
+            rerun = expanded
+
+    def run(self, target, jobs=1, phases=None):
+        """Calls `target(name)` for every phase, running up to `jobs` phases at once.
+
+        Each phase starts as soon as all the phases it depends on have finished.
+        If a phase raises an exception, no further phases are started, and the
+        exception is re-raised once the running phases have finished.
+
+        If `phases` is given, only those phases are run, and the others are
+        treated as already finished.
+        """
+
+        done = set(self.order) - set(phases) if phases is not None else set()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while len(done) < len(self.order):
+                # Only `jobs` phases are submitted at once, so none is left
+                # queued to start after another has failed
+                for name in self.order:
+                    if len(running) >= jobs:
+                        break
+                    if name not in done and name not in running and self.depends[name] <= done:
+                        running[name] = pool.submit(target, name)
+
+                finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for name, future in list(running.items()):
+                    if future in finished:
+                        del running[name]
+                        future.result()
+                        done.add(name)
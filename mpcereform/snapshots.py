@@ -0,0 +1,311 @@
+"""Columnar binary snapshots of spreadsheet sheets.
+
+A snapshot stores one sheet as a set of fixed-width columns, plus a shared
+string table, in a single file that can be memory-mapped. Each snapshot is
+keyed by the SHA-256 hash of the workbook it was built from, so a stale
+snapshot is never read.
+
+File layout:
+    MAGIC (8 bytes) | header length (8 bytes) | JSON header | padding | blobs
+
+Every blob starts on an eight-byte boundary, and the header records each
+blob's offset from the end of the padded header. Each column has a `tags` blob,
+one byte per row recording the type of the cell, and a `values` blob of
+eight-byte slots holding ints, float bits, string indexes or date values.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from datetime import date, datetime, time, timedelta
+
+MAGIC = b'MPCESNP1'
+VERSION = 1
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.mpcereform', 'snapshots')
+
+# Cell type tags
+NONE, INT, FLOAT, STR, BOOL, DATETIME, DATE, TIME = range(8)
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+class SnapshotError(ValueError):
+    """Raised when a sheet cannot be stored in, or read from, a snapshot."""
+
+def file_hash(pth):
+    """Returns the SHA-256 hex digest of a file."""
+
+    digest = hashlib.sha256()
+    with open(pth, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def snapshot_path(directory, workbook, sheet, source_hash):
+    """Returns the path of the snapshot of a sheet, for a given workbook hash."""
+
+    stem = os.path.splitext(workbook)[0]
+    slug = re.sub(r'\W+', '_', sheet).strip('_')
+    return os.path.join(directory, f'{stem}-{source_hash[:16]}-{slug}.snap')
+
+def write_snapshot(pth, rows, width, source_hash):
+    """Writes a buffered sheet to a snapshot file.
+
+    Arguments:
+    ==========
+        pth (str): where to write the snapshot
+        rows (sequence): the row tuples of the sheet
+        width (int): the width openpyxl reported for the sheet, or None
+        source_hash (str): hash of the workbook the sheet was read from
+    """
+
+    num_rows = len(rows)
+    num_cols = max([len(row) for row in rows] or [0])
+    lengths = array('I', [len(row) for row in rows])
+
+    strings = {}
+    columns = []
+    for col in range(num_cols):
+        tags = bytearray(num_rows)
+        slots = bytearray(8 * num_rows)
+        ints = memoryview(slots).cast('q')
+        floats = memoryview(slots).cast('d')
+        for idx, row in enumerate(rows):
+            if col >= len(row) or row[col] is None:
+                continue
+            value = row[col]
+            # bool must be tested before int, and datetime before date
+            if isinstance(value, bool):
+                tags[idx], ints[idx] = BOOL, int(value)
+            elif isinstance(value, int):
+                if not -2**63 <= value < 2**63:
+                    raise SnapshotError(f'Integer {value} is too large for a snapshot.')
+                tags[idx], ints[idx] = INT, value
+            elif isinstance(value, float):
+                tags[idx], floats[idx] = FLOAT, value
+            elif isinstance(value, str):
+                tags[idx], ints[idx] = STR, strings.setdefault(value, len(strings))
+            elif isinstance(value, datetime):
+                tags[idx], ints[idx] = DATETIME, (value - EPOCH) // MICROSECOND
+            elif isinstance(value, date):
+                tags[idx], ints[idx] = DATE, value.toordinal()
+            elif isinstance(value, time):
+                tags[idx], ints[idx] = TIME, (
+                    datetime.combine(EPOCH, value) - EPOCH) // MICROSECOND
+            else:
+                raise SnapshotError(f'Cannot store {type(value).__name__} in a snapshot.')
+        columns.append((bytes(tags), bytes(slots)))
+
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = array('Q', [0])
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+
+    blobs = [lengths.tobytes(), offsets.tobytes(), b''.join(encoded)]
+    for tags, slots in columns:
+        blobs.extend([tags, slots])
+
+    # Blob offsets are relative to the end of the (padded) header
+    positions = []
+    position = 0
+    for blob in blobs:
+        positions.append([position, len(blob)])
+        position = _align(position + len(blob))
+
+    header = json.dumps({
+        'version': VERSION,
+        'byteorder': sys.byteorder,
+        'source': source_hash,
+        'rows': num_rows,
+        'columns': num_cols,
+        'width': width,
+        'blobs': positions
+    }).encode('utf-8')
+    data_start = _align(16 + len(header))
+
+    tmp_pth = pth + '.tmp'
+    with open(tmp_pth, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(8, 'little'))
+        file.write(header)
+        for (offset, _), blob in zip(positions, blobs):
+            file.write(b'\0' * (data_start + offset - file.tell()))
+            file.write(blob)
+    os.replace(tmp_pth, pth)
+
+def read_snapshot(pth, source_hash=None):
+    """Reads a snapshot, returning the row tuples and width of the sheet.
+
+    Raises SnapshotError if the file is not a valid snapshot, or was built
+    from a different version of the workbook."""
+
+    with open(pth, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            with memoryview(buffer) as view:
+                return _decode(view, source_hash)
+
+class SnapshotRows():
+    """The rows of a memory-mapped snapshot, decoded one at a time as they are read.
+
+    Unlike `read_snapshot`, this never holds more than one decoded row, so a
+    sheet can be streamed from its snapshot however large it is. Rows are
+    indexed from 0, and each is trimmed to its stored length, as in the
+    tuple returned by `read_snapshot`. Close the snapshot when finished, or
+    use it as a context manager.
+
+    Raises SnapshotError if the file is not a valid snapshot, or was built
+    from a different version of the workbook."""
+
+    def __init__(self, pth, source_hash=None):
+        self._file = open(pth, 'rb') #pylint:disable=consider-using-with;
+        self._views = []
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            header, blobs = _layout(self._view(memoryview(self._map)), source_hash)
+        except BaseException:
+            self.close()
+            raise
+
+        self.width = header['width']
+        self._rows = header['rows']
+        blobs = [self._view(blob) for blob in blobs]
+        self._lengths = self._view(blobs[0].cast('I'))
+        self._offsets = self._view(blobs[1].cast('Q'))
+        self._strings = blobs[2]
+        self._columns = [(blobs[3 + 2 * col],
+                          self._view(blobs[4 + 2 * col].cast('q')),
+                          self._view(blobs[4 + 2 * col].cast('d')))
+                         for col in range(header['columns'])]
+
+    def _view(self, view):
+        """Records a view of the map, which must be released before the map is closed."""
+        self._views.append(view)
+        return view
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self._rows:
+            raise IndexError(idx)
+        strings = self._strings
+        offsets = self._offsets
+        row = []
+        for tags, ints, floats in self._columns[:self._lengths[idx]]:
+            tag = tags[idx]
+            if tag == STR:
+                index = ints[idx]
+                row.append(bytes(strings[offsets[index]:offsets[index + 1]]).decode('utf-8'))
+            else:
+                row.append(_decode_value(tag, ints[idx], floats[idx]))
+        return tuple(row)
+
+    def close(self):
+        """Unmaps the file."""
+
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _layout(view, source_hash):
+    """Checks the header of a memory-mapped snapshot, and returns it with views of the blobs."""
+
+    if bytes(view[:8]) != MAGIC:
+        raise SnapshotError('Not a snapshot file.')
+    header_len = int.from_bytes(view[8:16], 'little')
+    header = json.loads(bytes(view[16:16 + header_len]).decode('utf-8'))
+    if header['version'] != VERSION or header['byteorder'] != sys.byteorder:
+        raise SnapshotError('Snapshot was written by an incompatible version.')
+    if source_hash is not None and header['source'] != source_hash:
+        raise SnapshotError('Snapshot is stale.')
+
+    data_start = _align(16 + header_len)
+    blobs = [view[data_start + offset:data_start + offset + length]
+             for offset, length in header['blobs']]
+    return header, blobs
+
+def _decode(view, source_hash):
+    """Decodes the rows of a memory-mapped snapshot."""
+
+    header, blobs = _layout(view, source_hash)
+    lengths = blobs[0].cast('I')
+    offsets = blobs[1].cast('Q')
+    string_data = bytes(blobs[2])
+    strings = [string_data[offsets[i]:offsets[i + 1]].decode('utf-8')
+               for i in range(len(offsets) - 1)]
+
+    num_rows = header['rows']
+    columns = []
+    for col in range(header['columns']):
+        tags = blobs[3 + 2 * col]
+        slots = blobs[4 + 2 * col]
+        columns.append(_decode_column(tags, slots.cast('q'), slots.cast('d'), strings))
+    # Transpose back into rows, trimmed to their stored lengths
+    cells = list(zip(*columns)) if columns else [()] * num_rows
+
+    rows = tuple(cells[idx][:lengths[idx]] for idx in range(num_rows))
+    return rows, header['width']
+
+def _decode_column(tags, ints, floats, strings):
+    """Converts the slots of a single column back into Python values."""
+
+    values = []
+    append = values.append
+    for idx, tag in enumerate(tags):
+        if tag == NONE:
+            append(None)
+        elif tag == STR:
+            append(strings[ints[idx]])
+        elif tag == INT:
+            append(ints[idx])
+        elif tag == FLOAT:
+            append(floats[idx])
+        elif tag == BOOL:
+            append(bool(ints[idx]))
+        elif tag == DATETIME:
+            append(EPOCH + ints[idx] * MICROSECOND)
+        elif tag == DATE:
+            append(date.fromordinal(ints[idx]))
+        elif tag == TIME:
+            append((EPOCH + ints[idx] * MICROSECOND).time())
+        else:
+            raise SnapshotError(f'Unknown cell type {tag}.')
+    return values
+
+def _decode_value(tag, int_slot, float_slot):
+    """Converts one non-string slot back into a Python value."""
+
+    if tag == NONE:
+        return None
+    if tag == INT:
+        return int_slot
+    if tag == FLOAT:
+        return float_slot
+    if tag == BOOL:
+        return bool(int_slot)
+    if tag == DATETIME:
+        return EPOCH + int_slot * MICROSECOND
+    if tag == DATE:
+        return date.fromordinal(int_slot)
+    if tag == TIME:
+        return (EPOCH + int_slot * MICROSECOND).time()
+    raise SnapshotError(f'Unknown cell type {tag}.')
+
+def _align(position, boundary=8):
+    """Rounds a file position up to the next boundary."""
+    return (position + boundary - 1) // boundary * boundary
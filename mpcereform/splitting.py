@@ -0,0 +1,75 @@
+"""Splitting of delimited lists, such as 'k001, k002', into one row per item.
+
+Lists can be split on the server, by a recursive common table expression
+(`split_list_cte`), or in Python (`split_list`). Both give the same items:
+split on any of the separators, with surrounding whitespace removed.
+"""
+
+import re
+
+def split_list(rows, separators=','):
+    """Splits the list in each (key, list) row into (key, item) rows.
+
+    Arguments:
+    ==========
+        rows (iterable): (key, delimited list) tuples
+        separators (str): the characters that separate items
+
+    Returns:
+    ==========
+        A generator of (key, item) tuples
+    """
+
+    splitter = re.compile('[' + re.escape(separators) + ']')
+    for key, items in rows:
+        for item in splitter.split(items):
+            yield (key, item.strip())
+
+def split_list_cte(name, table, key, column, separators=',', where=None):
+    """Returns a recursive common table expression that splits a column of lists.
+
+    The expression defines a table `name` with the columns `item_key` and
+    `item`, with one row per item, for use in a `WITH RECURSIVE` clause:
+
+        f'WITH RECURSIVE {split_list_cte(...)} SELECT item_key, item FROM {name}'
+
+    Each recursion takes one item off the front of every list that still has
+    some left, so there are as many recursions as items in the longest list.
+    MySQL stops at `cte_max_recursion_depth` (1000 by default) recursions.
+
+    Arguments:
+    ==========
+        name (str): name of the table the expression defines
+        table (str): table the lists are read from
+        key (str): column (or expression) to identify each list by
+        column (str): column of lists
+        separators (str): the characters that separate items
+        where (str): condition on the rows of `table` to split
+
+    Returns:
+    ==========
+        The expression, as a string
+    """
+
+    # Use the first separator for all of them
+    separator = separators[0]
+    lists = column
+    for other in separators[1:]:
+        lists = f"REPLACE({lists}, '{other}', '{separator}')"
+
+    def first(expr):
+        return f"REGEXP_REPLACE(SUBSTRING_INDEX({expr}, '{separator}', 1), '^[[:space:]]+|[[:space:]]+$', '')"
+
+    def rest(expr):
+        return (f"IF(LOCATE('{separator}', {expr}) > 0, "
+                f"SUBSTRING({expr}, LOCATE('{separator}', {expr}) + 1), NULL)")
+
+    return f"""{name} (item_key, item, remainder) AS (
+        SELECT {key}, {first(lists)}, {rest(lists)}
+        FROM {table}
+        {f'WHERE {where}' if where else ''}
+        UNION ALL
+        SELECT item_key, {first('remainder')}, {rest('remainder')}
+        FROM {name}
+        WHERE remainder IS NOT NULL
+    )"""
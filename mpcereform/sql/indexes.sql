@@ -28,5 +28,64 @@ process.
 
 1. UNIQUE INDEXES FOR VALIDATING JOINS
 
+These indexes are also declared in mpce_database.sql. They are dropped once
+the schema has been created, and rebuilt here once the data has been loaded,
+so that each one is built in a single pass rather than row by row.
+
+MySQL names an unnamed index after its first column, so the names below match
+the indexes created by the schema.
+
+The unique indexes on `keyword_free_association` and `keyword_tree_association`
+are not deferred, because the import relies on them to discard duplicates.
+
+*/
+
+ALTER TABLE mpce.work_keyword ADD UNIQUE INDEX work_code (work_code, keyword_code);
+ALTER TABLE mpce.is_member_of ADD UNIQUE INDEX member (member, corporate_entity);
+ALTER TABLE mpce.stn_client_agent ADD UNIQUE INDEX client_code (client_code, agent_code);
+ALTER TABLE mpce.stn_client_profession ADD UNIQUE INDEX client_code (client_code, profession_code);
+ALTER TABLE mpce.edition_author ADD UNIQUE INDEX edition_code (edition_code, author, author_type);
+ALTER TABLE mpce.stn_edition_call_number ADD UNIQUE INDEX edition_code (edition_code, call_number);
+ALTER TABLE mpce.stn_edition_catalogue ADD UNIQUE INDEX edition_code (edition_code, catalogue);
+ALTER TABLE mpce.stn_client_correspondence_ms ADD UNIQUE INDEX client_code (client_code, position);
+ALTER TABLE mpce.stn_client_correspondence_place ADD UNIQUE INDEX client_code (client_code, place_code);
+ALTER TABLE mpce.consignment_addressee ADD UNIQUE INDEX consignment (consignment, agent_code);
+ALTER TABLE mpce.consignment_signatory ADD UNIQUE INDEX consignment (consignment, agent_code);
+ALTER TABLE mpce.consignment_handling_agent ADD UNIQUE INDEX consignment (consignment, agent_code);
+ALTER TABLE mpce.stn_order_agent ADD UNIQUE INDEX order_code (order_code, client_code);
+ALTER TABLE mpce.stn_order_sent_via ADD UNIQUE INDEX order_code (order_code, client_code);
+ALTER TABLE mpce.stn_order_sent_via_place ADD UNIQUE INDEX order_code (order_code, place_code);
+ALTER TABLE mpce.stn_transaction ADD UNIQUE INDEX order_code (order_code, transaction_code);
+ALTER TABLE mpce.stn_transaction_volumes_exchanged ADD UNIQUE INDEX transaction_code (transaction_code, order_code, volume_number);
+
+/*
+
+2. SECONDARY INDEXES FOR AGENT RESOLUTION AND SUMMARY STATISTICS
+
+Every column that is joined against, or looked up, when client codes are
+resolved into agent codes or the summary statistics are compiled.
+
 */
 
+-- Columns holding client codes, which are resolved into agent codes
+CREATE INDEX idx_consignment_other_stakeholder ON mpce.consignment (other_stakeholder);
+CREATE INDEX idx_consignment_returned_to_agent ON mpce.consignment (returned_to_agent);
+CREATE INDEX idx_consignment_addressee_agent_code ON mpce.consignment_addressee (agent_code);
+CREATE INDEX idx_consignment_signatory_agent_code ON mpce.consignment_signatory (agent_code);
+CREATE INDEX idx_consignment_handling_agent_agent_code ON mpce.consignment_handling_agent (agent_code);
+CREATE INDEX idx_stamping_permitted_dealer ON mpce.stamping (permitted_dealer);
+CREATE INDEX idx_stamping_attending_inspector ON mpce.stamping (attending_inspector);
+CREATE INDEX idx_stamping_attending_adjoint ON mpce.stamping (attending_adjoint);
+CREATE INDEX idx_parisian_stock_auction_previous_owner ON mpce.parisian_stock_auction (previous_owner);
+CREATE INDEX idx_auction_administrator_administrator_id ON mpce.auction_administrator (administrator_id);
+CREATE INDEX idx_parisian_stock_sale_purchaser ON mpce.parisian_stock_sale (purchaser);
+CREATE INDEX idx_permission_simple_grant_licensee ON mpce.permission_simple_grant (licensee);
+
+-- Agent metadata
+CREATE INDEX idx_stn_client_agent_agent_code ON mpce.stn_client_agent (agent_code);
+CREATE INDEX idx_agent_address_agent_code ON mpce.agent_address (agent_code, place_code);
+CREATE INDEX idx_agent_profession_agent_code ON mpce.agent_profession (agent_code, profession_code);
+
+-- Authorship
+CREATE INDEX idx_edition_author_author ON mpce.edition_author (author);
+CREATE INDEX idx_edition_author_author_type ON mpce.edition_author (author_type);
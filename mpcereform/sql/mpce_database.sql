@@ -971,4 +971,51 @@ CREATE TABLE IF NOT EXISTS `mmf_error` (
 	`text` TEXT,
 	`error_note` VARCHAR(255),
 	`date` DATE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8;
\ No newline at end of file
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+/*
+
+# SECTION 5: BUILD METADATA
+
+Fingerprints of the sources the database was built from: a checksum of each
+table in the 'manuscripts' database, and a hash of each spreadsheet. An
+incremental rebuild compares them with the current sources, and only re-runs
+the import phases whose sources have changed.
+
+*/
+
+CREATE TABLE IF NOT EXISTS `build_source` (
+	`source` VARCHAR(255) NOT NULL PRIMARY KEY,	-- table name or spreadsheet file name
+	`fingerprint` VARCHAR(64),					-- table checksum or SHA-256 of file
+	`recorded` DATETIME							-- when the fingerprint was taken
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+/*
+Sequences for new string codes (e.g. 'id000123' in `agent`), one per prefix.
+Each is seeded from the highest code in its table the first time a code is
+needed, and codes are then reserved by incrementing `next_value`.
+*/
+
+CREATE TABLE IF NOT EXISTS `code_sequence` (
+	`prefix` VARCHAR(10) NOT NULL PRIMARY KEY,	-- letters at the start of every code, e.g. 'id'
+	`table_name` VARCHAR(64) NOT NULL,			-- table the codes are for
+	`column_name` VARCHAR(64) NOT NULL,			-- column the codes are for
+	`next_value` INT NOT NULL,					-- number of the next code to hand out
+	`padding` INT NOT NULL,						-- number of digits in each code
+	UNIQUE INDEX (`table_name`, `column_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+/*
+Summary statistics about the database: row counts, event counts by dataset,
+authorship by author type and agents by kind. Each statistic is refreshed by
+the import phases that write the tables it counts, so summaries can be read
+without rescanning the tables.
+*/
+
+CREATE TABLE IF NOT EXISTS `statistic` (
+	`statistic` VARCHAR(64) NOT NULL,			-- e.g. 'rows', 'authors', 'agents'
+	`subject` VARCHAR(255) NOT NULL,			-- what is counted, e.g. 'mpce.work' or 'Primary'
+	`value` BIGINT NOT NULL,
+	`updated` DATETIME,							-- when the statistic was last refreshed
+	PRIMARY KEY (`statistic`, `subject`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
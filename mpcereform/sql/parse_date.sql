@@ -0,0 +1,48 @@
+/*
+
+MPCE DATABASE ROUTINES
+
+Server-side version of `mpcereform.utils.parse_date`, so that dates can be
+normalised in a single INSERT ... SELECT. It finds the first four-digit year,
+the first capitalised word (read as a month from its first three letters) and
+the first one- or two-digit day in a string, and returns NULL unless all three
+make a valid date.
+
+The patterns are matched case-sensitively, as in Python, whatever the
+collation of the column.
+
+This file holds a single statement, as the routine's body contains semicolons.
+
+*/
+
+CREATE FUNCTION mpce.parse_date(date_string VARCHAR(255))
+RETURNS DATE
+DETERMINISTIC
+BEGIN
+	DECLARE year_str CHAR(4);
+	DECLARE month_num INT;
+	DECLARE day_num INT;
+	DECLARE first_of_month DATE;
+
+	IF date_string IS NULL OR date_string = '' THEN
+		RETURN NULL;
+	END IF;
+
+	SET year_str = IFNULL(REGEXP_SUBSTR(date_string, '(?-i)\\b\\d{4}\\b'), '');
+	SET month_num = FIELD(
+		LEFT(REGEXP_SUBSTR(date_string, '(?-i)\\b[A-Z][a-z]{2,8}\\b'), 3),
+		'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'
+	);
+	SET day_num = IFNULL(NULLIF(REGEXP_SUBSTR(date_string, '(?-i)\\b\\d{1,2}(?=[a-z]{0,2}\\b)'), ''), 0);
+
+	IF year_str = '' OR year_str = '0000' OR month_num < 1 OR day_num < 1 THEN
+		RETURN NULL;
+	END IF;
+	-- Build the date from strings, so that years before 100 are not read as 19xx or 20xx
+	SET first_of_month = CAST(CONCAT(year_str, '-', LPAD(month_num, 2, '0'), '-01') AS DATE);
+	IF day_num > DAY(LAST_DAY(first_of_month)) THEN
+		RETURN NULL;
+	END IF;
+
+	RETURN first_of_month + INTERVAL day_num - 1 DAY;
+END
@@ -0,0 +1,740 @@
+"""Synthetic `manuscripts` databases and spreadsheets, for benchmarking the build."""
+
+import os
+import random
+import re
+from datetime import date, datetime, timedelta
+from importlib.resources import contents, path
+from uuid import UUID
+
+from openpyxl import Workbook, load_workbook
+
+from mpcereform.bulk import BulkWriter
+from mpcereform.connections import cursor
+from mpcereform.mapping import SheetMapping
+from mpcereform.records import Condemnation, Consignment, DarntonOrder, NewPlace, \
+    PermissionClient, PermissionEdition, PermissionGrant, ProvincialInspection
+from mpcereform.utils import MONTHS, convert_colname
+
+# Table in the synthetic `manuscripts` database recording how it was generated.
+# The benchmark will not overwrite a `manuscripts` database without it.
+MARKER = '_synthetic'
+
+BASE_ROWS = {
+    # Approximate size of each entity in FBTEE-1, i.e. at scale 1
+    'works': 3900,
+    'editions': 4500,
+    'keywords': 600,
+    'parisian_keywords': 70,
+    'tags': 30,
+    'places': 750,
+    'clients': 3700,
+    'orders': 19000,
+    'transactions': 85000,
+    'people': 3000,
+    'professions': 330,
+    'authors': 2700,
+    'attributions': 5000,
+    'stampings': 6000,
+    'illegal_titles': 3400,
+    'auctions': 60,
+    'stock_sales': 5000,
+    'dealers': 600,
+    'inspectors': 40
+}
+
+CODE_SPACE = {
+    # Most codes have a fixed number of digits, which caps how many there can be
+    'keywords': 9999,
+    'parisian_keywords': 999,
+    'tags': 99,
+    'places': 999,
+    'clients': 9999,
+    'people': 9999,
+    'professions': 999,
+    'authors': 9999,
+    'auctions': 9999
+}
+
+TABLES = {
+    # Columns of each `manuscripts` table that the build reads. Tables copied
+    # with `SELECT *` have their columns in the same order as in `mpce`.
+    'tags': (
+        ('tag_code', 'CHAR(3)'), ('tag', 'VARCHAR(50)'), ('tag_definition', 'VARCHAR(1000)')
+    ),
+    'parisian_keywords': (
+        ('parisian_category_code', 'CHAR(5)'), ('name', 'VARCHAR(255)'),
+        ('ancestor1', 'CHAR(5)'), ('ancestor2', 'CHAR(5)'), ('ancestor3', 'CHAR(5)')
+    ),
+    'keywords': (
+        ('keyword_code', 'VARCHAR(10)'), ('keyword', 'VARCHAR(250)'),
+        ('definition', 'VARCHAR(1000)'), ('tag_code', 'CHAR(3)')
+    ),
+    'keyword_free_associations': (('keyword', 'VARCHAR(250)'), ('association', 'VARCHAR(250)')),
+    'keyword_tree_associations': (('keyword', 'VARCHAR(250)'), ('association', 'VARCHAR(250)')),
+    'manuscript_books': (
+        ('super_book_code', 'CHAR(12)'), ('super_book_title', 'VARCHAR(750)'),
+        ('parisian_keyword', 'VARCHAR(2000)'), ('illegality', 'VARCHAR(2000)'),
+        ('keywords', 'VARCHAR(1000)')
+    ),
+    'manuscript_cat_fuzzy': (
+        ('super_book_code', 'CHAR(12)'), ('fuzzyValue', 'VARCHAR(10)'), ('fuzzyComment', 'TEXT')
+    ),
+    'manuscript_books_editions': (
+        ('book_code', 'CHAR(12)'), ('super_book_code', 'CHAR(12)'),
+        ('edition_status', 'VARCHAR(255)'), ('edition_type', 'VARCHAR(255)'),
+        ('full_book_title', 'VARCHAR(750)'), ('short_book_titles', 'VARCHAR(1000)'),
+        ('translated_title', 'VARCHAR(750)'), ('translated_language', 'VARCHAR(255)'),
+        ('languages', 'VARCHAR(200)'), ('stated_publishers', 'VARCHAR(1000)'),
+        ('actual_publishers', 'VARCHAR(1000)'), ('stated_publication_places', 'VARCHAR(1000)'),
+        ('actual_publication_places', 'VARCHAR(1000)'),
+        ('stated_publication_years', 'VARCHAR(1000)'),
+        ('actual_publication_years', 'VARCHAR(255)'), ('pages', 'VARCHAR(1000)'),
+        ('quick_pages', 'VARCHAR(255)'), ('number_of_volumes', 'INT'),
+        ('section', 'VARCHAR(255)'), ('edition', 'VARCHAR(255)'),
+        ('book_sheets', 'VARCHAR(255)'), ('notes', 'TEXT'), ('research_notes', 'VARCHAR(1000)')
+    ),
+    'places': (
+        ('place_code', 'CHAR(5)'), ('name', 'VARCHAR(255)'),
+        ('alternative_names', 'VARCHAR(255)'), ('town', 'VARCHAR(255)'),
+        ('C18_lower_territory', 'VARCHAR(255)'), ('C18_sovereign_territory', 'VARCHAR(255)'),
+        ('C21_admin', 'VARCHAR(255)'), ('C21_country', 'VARCHAR(255)'),
+        ('geographic_zone', 'VARCHAR(255)'), ('BSR', 'VARCHAR(255)'),
+        ('HRE', 'BIT(1)'), ('EL', 'BIT(1)'), ('IFC', 'BIT(1)'), ('P', 'BIT(1)'),
+        ('HE', 'BIT(1)'), ('HT', 'BIT(1)'), ('WT', 'BIT(1)'), ('PT', 'BIT(1)'),
+        ('PrT', 'BIT(1)'), ('distance_from_neuchatel', 'DOUBLE'),
+        ('latitude', 'DECIMAL(10,8)'), ('longitude', 'DECIMAL(10,8)'),
+        ('geoname', 'INT'), ('notes', 'TEXT')
+    ),
+    'clients': (
+        ('client_code', 'CHAR(6)'), ('client_name', 'VARCHAR(100)'),
+        ('has_correspondence', 'BIT(1)'), ('partnership', 'BIT(1)'), ('gender', 'VARCHAR(5)'),
+        ('data_source', 'VARCHAR(25)'), ('option_menu_type', 'VARCHAR(25)'),
+        ('number_of_letters', 'SMALLINT'), ('number_of_documents', 'SMALLINT'),
+        ('first_date', 'VARCHAR(255)'), ('last_date', 'VARCHAR(255)'), ('notes', 'TEXT')
+    ),
+    'clients_professions': (('client_code', 'CHAR(6)'), ('profession_code', 'CHAR(6)')),
+    'books_call_numbers': (('edition_code', 'CHAR(9)'), ('call_number', 'VARCHAR(255)')),
+    'books_stn_catalogues': (('edition_code', 'CHAR(9)'), ('catalogue', 'VARCHAR(255)')),
+    'clients_correspondence_manuscripts': (
+        ('client_code', 'CHAR(6)'), ('position', 'INT'), ('manuscript_numbers', 'VARCHAR(500)')
+    ),
+    'clients_correspondence_places': (
+        ('client_code', 'CHAR(6)'), ('place_code', 'CHAR(5)'), ('from_date', 'VARCHAR(255)')
+    ),
+    'orders': (
+        ('order_code', 'CHAR(9)'), ('client_code', 'CHAR(6)'), ('place_code', 'CHAR(5)'),
+        ('date', 'VARCHAR(255)'), ('manuscript_number', 'VARCHAR(50)'),
+        ('manuscript_type', 'VARCHAR(50)'), ('balle_number', 'VARCHAR(50)'), ('cash', 'BIT(1)')
+    ),
+    'orders_agents': (
+        ('order_code', 'CHAR(9)'), ('client_code', 'CHAR(6)'), ('place_code', 'CHAR(5)')
+    ),
+    'orders_sent_via': (
+        ('order_code', 'CHAR(9)'), ('client_code', 'CHAR(6)'), ('place_code', 'CHAR(5)')
+    ),
+    'orders_sent_via_place': (('order_code', 'CHAR(9)'), ('place_code', 'CHAR(5)')),
+    'transactions': (
+        ('transaction_code', 'CHAR(9)'), ('order_code', 'CHAR(9)'),
+        ('page_or_folio_numbers', 'VARCHAR(50)'), ('account_heading', 'VARCHAR(50)'),
+        ('direction_of_transaction', 'VARCHAR(50)'), ('super_book_code', 'CHAR(12)'),
+        ('book_code', 'CHAR(12)'), ('stn_abbreviated_title', 'VARCHAR(600)'),
+        ('total_number_of_volumes', 'INT'), ('notes', 'TEXT')
+    ),
+    'transactions_volumes_exchanged': (
+        ('transaction_code', 'CHAR(9)'), ('order_code', 'CHAR(9)'),
+        ('volume_number', 'INT'), ('number_of_copies', 'INT')
+    ),
+    'manuscript_events': (
+        ('ID', 'INT'), ('ID_EditionName', 'CHAR(12)'), ('ID_DealerName', 'CHAR(9)'),
+        ('ID_AgentA', 'CHAR(9)'), ('ID_AgentB', 'CHAR(9)'), ('ID_PlaceName', 'CHAR(5)'),
+        ('EventLocation', 'VARCHAR(50)'), ('EventCopies', 'VARCHAR(50)'),
+        ('EventVols', 'VARCHAR(50)'), ('EventDate', 'DATE'), ('ID_Archive', 'VARCHAR(50)'),
+        ('EventFolioPage', 'VARCHAR(50)'), ('EventCitation', 'TEXT'),
+        ('EventPageStamped', 'VARCHAR(255)'), ('EventNotes', 'TEXT'), ('EventOther', 'TEXT'),
+        ('EventArticle', 'VARCHAR(255)'), ('DateEntered', 'VARCHAR(255)'),
+        ('EventUser', 'VARCHAR(255)')
+    ),
+    'manuscript_titles_illegal': (
+        ('UUID', 'CHAR(36)'), ('illegal_super_book_code', 'CHAR(12)'),
+        ('illegal_full_book_title', 'VARCHAR(750)'), ('illegal_author_name', 'VARCHAR(255)'),
+        ('illegal_date', 'VARCHAR(50)'), ('illegal_folio', 'VARCHAR(50)'),
+        ('illegal_notes', 'TEXT'), ('record_status', 'VARCHAR(50)'),
+        ('bastille_book_category', 'VARCHAR(255)'), ('bastille_imprint_full', 'TEXT'),
+        ('bastille_copies_number', 'VARCHAR(255)'), ('bastille_current_volumes', 'VARCHAR(255)'),
+        ('bastille_total_volumes', 'VARCHAR(255)')
+    ),
+    'manuscript_sales_events': (
+        ('salesNumber', 'CHAR(5)'), ('msNumber', 'INT'), ('Client_Code', 'CHAR(8)'),
+        ('code', 'INT'), ('Place_Code', 'CHAR(5)'), ('ID_Agent', 'VARCHAR(255)')
+    ),
+    'manuscript_events_sales': (
+        ('ID', 'INT'), ('ID_Sale_Agent', 'CHAR(5)'), ('ID_DealerName', 'CHAR(8)'),
+        ('ID_EditionName', 'CHAR(12)'), ('EventType', 'VARCHAR(50)'),
+        ('EventCopies', 'VARCHAR(50)'), ('EventCopiesType', 'VARCHAR(50)'),
+        ('EventVols', 'VARCHAR(50)'), ('EventLotPrice', 'VARCHAR(50)'),
+        ('EventDate', 'VARCHAR(50)'), ('EventFolioPage', 'VARCHAR(50)'),
+        ('EventCitation', 'TEXT'), ('EventArticle', 'VARCHAR(50)'), ('EventNotes', 'TEXT'),
+        ('EventOther', 'TEXT'), ('EventMoreNotes', 'TEXT')
+    ),
+    'people': (
+        ('person_code', 'CHAR(6)'), ('person_name', 'VARCHAR(255)'), ('sex', 'CHAR(1)'),
+        ('title', 'VARCHAR(255)'), ('other_names', 'VARCHAR(1023)'),
+        ('designation', 'VARCHAR(255)'), ('status', 'VARCHAR(255)'),
+        ('birth_date', 'VARCHAR(255)'), ('death_date', 'VARCHAR(255)'), ('notes', 'TEXT')
+    ),
+    'clients_people': (('client_code', 'CHAR(6)'), ('person_code', 'CHAR(6)')),
+    'professions': (
+        ('profession_code', 'CHAR(5)'), ('profession_type', 'VARCHAR(50)'),
+        ('translated_profession', 'VARCHAR(100)'), ('profession_group', 'VARCHAR(100)'),
+        ('economic_sector', 'VARCHAR(100)')
+    ),
+    'people_professions': (('person_code', 'CHAR(6)'), ('profession_code', 'CHAR(5)')),
+    'manuscript_authors': (('author_name', 'VARCHAR(255)'), ('author_code', 'CHAR(6)')),
+    'manuscript_books_authors': (
+        ('book_code', 'CHAR(12)'), ('author_code', 'CHAR(6)'),
+        ('author_type', 'VARCHAR(20)'), ('certain', 'BIT(1)')
+    ),
+    'manuscript_dealers': (
+        ('Client_Code', 'CHAR(6)'), ('Dealer_Name', 'VARCHAR(255)'),
+        ('Alternative_Name', 'VARCHAR(255)'), ('Profession_Code', 'VARCHAR(255)'),
+        ('Place_Code', 'VARCHAR(255)'), ('Notes', 'TEXT')
+    ),
+    'manuscript_agents_inspectors': (
+        ('Client_Code', 'CHAR(6)'), ('Agent_Name', 'VARCHAR(255)'),
+        ('Place_Code', 'VARCHAR(255)'), ('Notes', 'TEXT')
+    ),
+    'clients_addresses': (
+        ('client_code', 'CHAR(6)'), ('place_code', 'CHAR(5)'), ('address', 'VARCHAR(255)')
+    )
+}
+
+WORDS = (
+    'abrege', 'amour', 'anecdotes', 'art', 'byblos', 'campagne', 'chretien', 'christianisme',
+    'commerce', 'contes', 'despotisme', 'dictionnaire', 'discours', 'education', 'esprit',
+    'essai', 'histoire', 'homme', 'lettres', 'libertin', 'loix', 'maximes', 'memoires',
+    'morale', 'nature', 'nouvelle', 'oeuvres', 'paix', 'philosophie', 'poesies', 'politique',
+    'raison', 'recueil', 'reflexions', 'religion', 'systeme', 'theatre', 'tolerance',
+    'traite', 'vie', 'voyage'
+)
+
+SURNAMES = (
+    'Bergeret', 'Buchet', 'Charmet', 'Chevrier', 'Durand', 'Fontanel', 'Gaude', 'Lair',
+    'Lepagnez', 'Letourmy', 'Mossy', 'Pavie', 'Rigaud', 'Robert', 'Gauthier', 'Sens',
+    'Boubers', 'Cazin', 'Desauges', 'Machuel', 'Malherbe', 'Ostervald', 'Bosset', 'Favarger'
+)
+
+CLIENT_DATE_SPAN = (date(1769, 1, 1), date(1794, 12, 31))
+
+SCALED_SHEETS = {
+    # Sheets the build reads with a SheetMapping: their record type, the key
+    # that marks the end of the data (as in the build), and the column that
+    # must hold a fresh key in each copy of a row
+    ('consignments.xlsx', 'List of new places'): (NewPlace, 'A', 'A'),
+    ('consignments.xlsx', 'Confiscations master'): (Consignment, 'A', 'A'),
+    ('permission_simple.xlsx', 'Licences'): (PermissionGrant, None, None),
+    ('permission_simple.xlsx', 'Editions'): (PermissionEdition, None, 'A'),
+    ('permission_simple.xlsx', 'Clients'): (PermissionClient, 'A', 'A'),
+    ('condemnations.xlsx', 'Sheet1'): (Condemnation, None, None),
+    ('CommandesLibrairesfrancais.xlsx', 'FicheSauvegarde'): (DarntonOrder, None, 'H'),
+    ('provincial_inspections.xlsx', 'Amalgamated sheet'): (ProvincialInspection, None, None)
+}
+
+# Codes of letters then digits, e.g. 'cl0393' or 'bk0010608'
+CODE = re.compile(r'([a-z]+)([0-9]+)')
+
+class SyntheticManuscripts():
+    """Generates a `manuscripts` database shaped like FBTEE-1, at a multiple of its size.
+
+    The same scale and seed always generate the same rows. Entities whose codes
+    have a fixed number of digits (see `CODE_SPACE`) cannot grow beyond that
+    many, so at large scales they are capped. `capped` lists them.
+
+    Arguments:
+    ==========
+        scale (int): multiple of the FBTEE-1 volumes to generate
+        seed (int): seed for the random number generators
+    """
+
+    def __init__(self, scale=1, seed=0):
+        self.scale = scale
+        self.seed = seed
+        self.counts = {
+            entity: min(base * scale, CODE_SPACE.get(entity, base * scale))
+            for entity, base in BASE_ROWS.items()
+        }
+
+    @property
+    def capped(self):
+        """A dict of each entity generated with fewer rows than its scale asks for, and its count."""
+
+        return {entity: count for entity, count in self.counts.items()
+                if count < BASE_ROWS[entity] * self.scale}
+
+    def rng(self, table):
+        """Returns a random number generator for one table, so each table is reproducible alone."""
+        return random.Random(f'{self.seed}-{self.scale}-{table}')
+
+    def tables(self):
+        """Yields the name, columns and rows of every table, in order."""
+
+        for table, columns in TABLES.items():
+            yield table, columns, getattr(self, f'_{table}')(self.rng(table))
+
+    # Codes
+
+    def _work(self, idx):
+        return f'spbk{idx:07d}'
+
+    def _edition(self, idx):
+        return f'bk{idx:07d}'
+
+    def _work_of_edition(self, idx):
+        return self._work((idx - 1) % self.counts['works'] + 1)
+
+    def _pick(self, rng, entity, fmt):
+        return fmt.format(rng.randint(1, self.counts[entity]))
+
+    def _client(self, rng):
+        return self._pick(rng, 'clients', 'cl{:04d}')
+
+    def _place(self, rng):
+        return self._pick(rng, 'places', 'pl{:03d}')
+
+    def _profession(self, rng):
+        return self._pick(rng, 'professions', 'pf{:03d}')
+
+    def _edition_any(self, rng):
+        return self._edition(rng.randint(1, self.counts['editions']))
+
+    def _order(self, idx):
+        return f'or{idx:07d}'
+
+    def _order_of_transaction(self, idx):
+        # Spread each order's transactions across the ledger
+        return self._order(idx * 7919 % self.counts['orders'] + 1)
+
+    def _valid_keywords(self):
+        # A few keyword codes are malformed, as in FBTEE-1
+        return self.counts['keywords'] - max(1, self.counts['keywords'] // 50)
+
+    def _keyword_code(self, idx):
+        return f'k{idx:04d}' if idx <= self._valid_keywords() else f'k{idx:04d}x'
+
+    # Values
+
+    @staticmethod
+    def _text(rng, low=1, high=6):
+        return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+    @staticmethod
+    def _name(rng):
+        return f'{rng.choice(SURNAMES)} {rng.choice(WORDS).title()}'
+
+    @staticmethod
+    def _date(rng, start=CLIENT_DATE_SPAN[0], end=CLIENT_DATE_SPAN[1]):
+        return start + timedelta(days=rng.randint(0, (end - start).days))
+
+    def _date_string(self, rng):
+        """A date as the clerks wrote it: sometimes partial, sometimes missing."""
+
+        when = self._date(rng)
+        month = list(MONTHS)[when.month - 1]
+        form = rng.random()
+        if form < 0.6:
+            return f'{when.day} {month} {when.year}'
+        if form < 0.8:
+            return f'{month} {when.year}'
+        if form < 0.9:
+            return str(when.year)
+        return ''
+
+    # Tables
+
+    def _tags(self, rng):
+        for idx in range(1, self.counts['tags'] + 1):
+            yield (f't{idx:02d}', f'{rng.choice(WORDS)} {idx}', self._text(rng, 5, 15))
+
+    def _parisian_keywords(self, rng):
+        for idx in range(1, self.counts['parisian_keywords'] + 1):
+            ancestors = [f'pc{rng.randint(1, idx):03d}' if idx > 1 and rng.random() < 0.5 else None
+                         for _ in range(3)]
+            yield (f'pc{idx:03d}', f'{rng.choice(WORDS)} {idx}', *ancestors)
+
+    def _keywords(self, rng):
+        for idx in range(1, self.counts['keywords'] + 1):
+            yield (self._keyword_code(idx), f'{rng.choice(WORDS)} {idx}',
+                   self._text(rng, 3, 12), self._pick(rng, 'tags', 't{:02d}'))
+
+    def _associations(self, rng):
+        # Keyword names are unique, so they can be regenerated from the same seed
+        names = [name for _, name, _, _ in self._keywords(self.rng('keywords'))]
+        for _ in range(self.counts['keywords'] * 2):
+            yield tuple(rng.sample(names, 2))
+
+    def _keyword_free_associations(self, rng):
+        return self._associations(rng)
+
+    def _keyword_tree_associations(self, rng):
+        return self._associations(rng)
+
+    def _manuscript_books(self, rng):
+        for idx in range(1, self.counts['works'] + 1):
+            keywords = ', '.join([self._keyword_code(rng.randint(1, self.counts['keywords']))
+                                  for _ in range(rng.randint(0, 4))])
+            yield (self._work(idx), self._text(rng, 2, 12),
+                   self._pick(rng, 'parisian_keywords', 'pc{:03d}'),
+                   self._text(rng, 0, 8), keywords)
+
+    def _manuscript_cat_fuzzy(self, rng):
+        for idx in range(1, self.counts['works'] + 1, 2):
+            value = rng.choice(['1', '2', '3', '4', '5', 'null'])
+            yield (self._work(idx), value, self._text(rng, 0, 10))
+
+    def _manuscript_books_editions(self, rng):
+        for idx in range(1, self.counts['editions'] + 1):
+            year = str(rng.randint(1700, 1794))
+            publisher = self._name(rng)
+            place = f'{rng.choice(WORDS).title()}'
+            yield (
+                self._edition(idx), self._work_of_edition(idx),
+                rng.choice(['Edition', 'Re-edition', 'Counterfeit']),
+                rng.choice(['Original', 'Translation', 'Abridgement']),
+                self._text(rng, 5, 30), self._text(rng, 1, 6), None, None, 'French',
+                publisher, publisher, place, place, year, year,
+                f'{rng.randint(20, 600)}p', str(rng.randint(20, 600)), rng.randint(1, 12),
+                rng.choice(['', '1', '2']), rng.choice(['', 'nouvelle edition']),
+                str(rng.randint(1, 40)), self._text(rng, 0, 20), self._text(rng, 0, 10)
+            )
+
+    def _places(self, rng):
+        for idx in range(1, self.counts['places'] + 1):
+            town = f'{rng.choice(WORDS).title()}-{idx}'
+            yield (
+                f'pl{idx:03d}', town, None, town, self._text(rng, 1, 2),
+                rng.choice(['France', 'Switzerland', 'Holy Roman Empire', 'Dutch Republic']),
+                self._text(rng, 1, 2), rng.choice(['France', 'Switzerland', 'Germany']),
+                rng.choice(['North', 'South', 'East', 'West']), rng.choice(['', 'BSR']),
+                *[rng.randint(0, 1) for _ in range(9)],
+                round(rng.uniform(0, 1500), 1), round(rng.uniform(40, 55), 6),
+                round(rng.uniform(-5, 15), 6), rng.randint(1000000, 9999999),
+                self._text(rng, 0, 10)
+            )
+
+    def _clients(self, rng):
+        for idx in range(1, self.counts['clients'] + 1):
+            yield (
+                f'cl{idx:04d}', self._name(rng), rng.randint(0, 1), int(rng.random() < 0.1),
+                rng.choice(['M', 'F', 'B']), 'STN', rng.choice(['Person', 'Partnership']),
+                rng.randint(0, 300), rng.randint(0, 50), self._date_string(rng),
+                self._date_string(rng), self._text(rng, 0, 20)
+            )
+
+    def _clients_professions(self, rng):
+        for idx in range(1, self.counts['clients'] + 1):
+            for prof in rng.sample(range(1, self.counts['professions'] + 1), rng.randint(0, 2)):
+                yield (f'cl{idx:04d}', f'pf{prof:03d}')
+
+    def _books_call_numbers(self, rng):
+        for idx in range(1, self.counts['editions'] + 1):
+            yield (self._edition(idx), f'{rng.choice(WORDS).upper()} {rng.randint(1, 9999)}')
+
+    def _books_stn_catalogues(self, rng):
+        for idx in range(1, self.counts['editions'] + 1, 2):
+            yield (self._edition(idx), f'Catalogue {rng.randint(1769, 1794)}')
+
+    def _clients_correspondence_manuscripts(self, rng):
+        for idx in range(1, self.counts['clients'] + 1):
+            for position in range(1, rng.randint(1, 3) + 1):
+                yield (f'cl{idx:04d}', position, f'ms{rng.randint(1000, 1300)}')
+
+    def _clients_correspondence_places(self, rng):
+        for idx in range(1, self.counts['clients'] + 1):
+            yield (f'cl{idx:04d}', self._place(rng), self._date_string(rng))
+
+    def _orders(self, rng):
+        for idx in range(1, self.counts['orders'] + 1):
+            yield (
+                self._order(idx), self._client(rng), self._place(rng),
+                self._date_string(rng), f'ms{rng.randint(1000, 1300)}',
+                rng.choice(['Copie de lettres', 'Brouillard', 'Journal']),
+                str(rng.randint(1, 5000)), int(rng.random() < 0.2)
+            )
+
+    def _orders_agents(self, rng):
+        for idx in range(1, self.counts['orders'] + 1):
+            yield (self._order(idx), self._client(rng), self._place(rng))
+
+    def _orders_sent_via(self, rng):
+        for idx in range(1, self.counts['orders'] + 1, 3):
+            yield (self._order(idx), self._client(rng), self._place(rng))
+
+    def _orders_sent_via_place(self, rng):
+        for idx in range(2, self.counts['orders'] + 1, 3):
+            yield (self._order(idx), self._place(rng))
+
+    def _transactions(self, rng):
+        directions = ['in', 'out', 'out', 'out', 'stock take', 'in (return)', 'out (free gifts)']
+        for idx in range(1, self.counts['transactions'] + 1):
+            edition = rng.randint(1, self.counts['editions'])
+            yield (
+                f'tr{idx:07d}', self._order_of_transaction(idx),
+                f'{rng.randint(1, 400)}', rng.choice(['Journal', 'Livre de commissions']),
+                rng.choice(directions), self._work_of_edition(edition),
+                self._edition(edition), self._text(rng, 1, 5), rng.randint(1, 12),
+                self._text(rng, 0, 6)
+            )
+
+    def _transactions_volumes_exchanged(self, rng):
+        for idx in range(1, self.counts['transactions'] + 1):
+            for volume in range(1, rng.randint(1, 3) + 1):
+                yield (f'tr{idx:07d}', self._order_of_transaction(idx), volume,
+                       rng.randint(1, 50))
+
+    def _manuscript_events(self, rng):
+        for idx in range(1, self.counts['stampings'] + 1):
+            copies = rng.choice(['', str(rng.randint(1, 200))])
+            yield (
+                idx, self._edition_any(rng), self._client(rng), self._client(rng),
+                self._client(rng), self._place(rng), rng.choice(['Chambre syndicale', 'Shop']),
+                copies, rng.choice(['', '', str(rng.randint(1, 6))]),
+                self._date(rng, date(1778, 1, 1), date(1789, 12, 31)),
+                f'ms{rng.randint(21800, 21999)}', f'{rng.randint(1, 400)}r',
+                self._text(rng, 5, 20), str(rng.randint(1, 500)), self._text(rng, 0, 10),
+                self._text(rng, 0, 5), str(rng.randint(1, 900)),
+                datetime(2016, 1, 1).isoformat(), 'synthetic'
+            )
+
+    def _manuscript_titles_illegal(self, rng):
+        for _ in range(self.counts['illegal_titles']):
+            bastille = rng.random() < 0.4
+            yield (
+                str(UUID(int=rng.getrandbits(128))), self._pick(rng, 'works', 'spbk{:07d}'),
+                self._text(rng, 3, 20), self._name(rng),
+                rng.choice([str(rng.randint(1700, 1789)), 'No Date Available']),
+                f'{rng.randint(1, 300)}', self._text(rng, 0, 10),
+                'DELETED' if rng.random() < 0.05 else 'ACTIVE',
+                rng.choice(['Livres philosophiques', 'Libelles', 'Jansenisme']) if bastille else '',
+                self._text(rng, 2, 6) if bastille else '',
+                str(rng.randint(1, 500)) if bastille else '',
+                str(rng.randint(1, 6)) if bastille else '',
+                str(rng.randint(1, 6)) if bastille else ''
+            )
+
+    def _manuscript_sales_events(self, rng):
+        for idx in range(1, self.counts['auctions'] + 1):
+            admins = rng.sample(range(1, self.counts['clients'] + 1), 3)
+            roles = ['Syndic', 'Adjoint', 'Auctioneer']
+            yield (
+                f'a{idx:04d}', rng.randint(21800, 21999), self._client(rng),
+                rng.randint(1, 4), 'pl306',
+                ','.join([f'cl{admin:04d} ({role})' for admin, role in zip(admins, roles)])
+            )
+
+    def _manuscript_events_sales(self, rng):
+        for idx in range(1, self.counts['stock_sales'] + 1):
+            yield (
+                idx, self._pick(rng, 'auctions', 'a{:04d}'), self._client(rng),
+                self._edition_any(rng), rng.choice(['Stock Sale', 'Sale of Privilege']),
+                str(rng.randint(1, 500)),
+                rng.choice(['packet', 'copies', 'privilege', 'plates', 'basket', 'vols', 'crate']),
+                str(rng.randint(1, 12)), f'{rng.randint(1, 900)}l',
+                rng.choice(['', self._date(rng, date(1770, 1, 1), date(1789, 12, 31)).isoformat()]),
+                f'{rng.randint(1, 400)}v', self._text(rng, 5, 20),
+                rng.choice(['', 't8', str(rng.randint(1, 900))]), self._text(rng, 0, 10),
+                self._text(rng, 0, 5), self._text(rng, 0, 5)
+            )
+
+    def _people(self, rng):
+        for idx in range(1, self.counts['people'] + 1):
+            yield (
+                f'id{idx:04d}', self._name(rng), rng.choice(['M', 'F', 'U']),
+                rng.choice([None, 'Sieur', 'Madame', 'Abbe']), None,
+                rng.choice([None, 'libraire', 'imprimeur']), None,
+                self._date_string(rng), self._date_string(rng), self._text(rng, 0, 15)
+            )
+
+    def _clients_people(self, rng):
+        for idx in range(1, self.counts['clients'] + 1):
+            if rng.random() < 0.7:
+                yield (f'cl{idx:04d}', self._pick(rng, 'people', 'id{:04d}'))
+
+    def _professions(self, rng):
+        for idx in range(1, self.counts['professions'] + 1):
+            yield (f'pf{idx:03d}', f'{rng.choice(WORDS)} {idx}', rng.choice(WORDS),
+                   rng.choice(['Book trade', 'Clergy', 'Nobility', 'Law']),
+                   rng.choice(['Primary', 'Secondary', 'Tertiary']))
+
+    def _people_professions(self, rng):
+        for idx in range(1, self.counts['people'] + 1):
+            for prof in rng.sample(range(1, self.counts['professions'] + 1), rng.randint(0, 2)):
+                yield (f'id{idx:04d}', f'pf{prof:03d}')
+
+    def _manuscript_authors(self, rng):
+        names = [self._name(rng) for _ in range(self.counts['authors'])]
+        for idx in range(1, self.counts['authors'] + 1):
+            # Some authors are recorded twice under different codes
+            name = rng.choice(names) if rng.random() < 0.05 else names[idx - 1]
+            yield (name, f'au{idx:04d}')
+
+    def _manuscript_books_authors(self, rng):
+        for _ in range(self.counts['attributions']):
+            yield (self._edition_any(rng), self._pick(rng, 'authors', 'au{:04d}'),
+                   rng.choice(['Primary', 'Primary', 'Secondary', 'Editor', 'Translator']),
+                   int(rng.random() < 0.9))
+
+    def _manuscript_dealers(self, rng):
+        for _ in range(self.counts['dealers']):
+            yield (self._client(rng), self._name(rng), None, self._profession(rng),
+                   self._place(rng), self._text(rng, 0, 10))
+
+    def _manuscript_agents_inspectors(self, rng):
+        for _ in range(self.counts['inspectors']):
+            yield (self._client(rng), self._name(rng), self._place(rng), self._text(rng, 0, 10))
+
+    def _clients_addresses(self, rng):
+        for idx in range(1, self.counts['clients'] + 1):
+            for place in rng.sample(range(1, self.counts['places'] + 1), rng.randint(0, 2)):
+                yield (f'cl{idx:04d}', f'pl{place:03d}', self._text(rng, 1, 4))
+
+def is_synthetic(conn):
+    """Checks whether the `manuscripts` database on a connection was generated by this module."""
+
+    with cursor(conn) as cur:
+        cur.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = 'manuscripts' AND TABLE_NAME = %s
+        """, (MARKER,))
+        return cur.fetchone()[0] > 0
+
+def database_exists(conn, name):
+    """Checks whether a database exists on the server."""
+
+    with cursor(conn) as cur:
+        cur.execute('SHOW DATABASES LIKE %s', (name,))
+        return cur.fetchone() is not None
+
+def create_manuscripts(conn, scale=1, seed=0, batch_size=1000, local_infile=True):
+    """Replaces the `manuscripts` database with a synthetic one.
+
+    Refuses to replace a `manuscripts` database that is not synthetic.
+
+    Returns:
+    ==========
+        A dict of the number of rows written to each table
+    """
+
+    if database_exists(conn, 'manuscripts') and not is_synthetic(conn):
+        raise ValueError(
+            'The `manuscripts` database on this server is not synthetic. Refusing to replace it.')
+
+    generator = SyntheticManuscripts(scale, seed)
+    written = {}
+    with cursor(conn) as cur:
+        cur.execute('DROP DATABASE IF EXISTS manuscripts')
+        cur.execute('CREATE DATABASE manuscripts CHARACTER SET utf8mb4')
+        cur.execute(f"""
+            CREATE TABLE manuscripts.{MARKER} (
+                scale INT, seed INT, created DATETIME
+            )
+        """)
+        cur.execute(f'INSERT INTO manuscripts.{MARKER} VALUES (%s, %s, NOW())', (scale, seed))
+        conn.commit()
+
+        for table, columns, rows in generator.tables():
+            cols = ', '.join([f'`{name}` {col_type}' for name, col_type in columns])
+            cur.execute(f'CREATE TABLE manuscripts.{table} ({cols}) DEFAULT CHARSET=utf8mb4')
+            written[table] = BulkWriter(
+                conn, f'manuscripts.{table}', [name for name, _ in columns],
+                batch_size=batch_size, local_infile=local_infile
+            ).write(rows)
+            conn.commit()
+            print(f'{written[table]} rows written to `manuscripts.{table}`.')
+
+    return written
+
+def fresh_keys(keys, repeat):
+    """Returns the keys for the `repeat`-th copy of a column's rows, distinct from every other copy's.
+
+    Integers are moved up by `repeat` times the highest integer key. Codes of
+    letters then digits keep their digits and width, and swap their letters
+    for ones counting down from 'z', a different set for each copy and each
+    original prefix, e.g. 'cl0393' becomes 'zz0393' and 'cp0393' 'zy0393'.
+    The original codes sort before the fresh ones, so they still come first
+    in a table. Any other key is kept as it is.
+
+    Arguments:
+    ==========
+        keys (list): the keys in the column
+        repeat (int): the copy, counting the original as 0
+
+    Returns:
+    ==========
+        A dict of each key to its fresh key
+    """
+
+    offset = max([key for key in keys if isinstance(key, int)], default=0)
+    codes = {key: CODE.fullmatch(key) for key in keys if isinstance(key, str)}
+    prefixes = sorted({match.group(1) for match in codes.values() if match is not None})
+
+    fresh = {}
+    for key in keys:
+        if isinstance(key, int):
+            fresh[key] = key + repeat * offset
+        elif codes.get(key) is None or not repeat:
+            fresh[key] = key
+        else:
+            letters, digits = codes[key].groups()
+            number = 26 ** len(letters) - 1 - ((repeat - 1) * len(prefixes) + prefixes.index(letters))
+            new = ''
+            for _ in letters:
+                number, letter = divmod(number, 26)
+                new = chr(ord('a') + letter) + new
+            if number < 0 or new in prefixes:
+                raise ValueError(f'Cannot make {repeat} fresh copies of the code {key!r}.')
+            fresh[key] = new + digits
+    return fresh
+
+def scale_spreadsheets(directory, scale=1, package='mpcereform.spreadsheets'):
+    """Writes copies of the bundled spreadsheets to a directory, at a multiple of their size.
+
+    Every sheet in `SCALED_SHEETS` has its rows of data repeated `scale` times,
+    with fresh keys (see `fresh_keys`) in each copy, and the rest of the sheet
+    dropped. Every other sheet is copied as it is.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    for workbook in sorted(contents(package)):
+        if not workbook.endswith('.xlsx'):
+            continue
+        with path(package, workbook) as pth:
+            source = load_workbook(pth, read_only=True)
+        scaled = Workbook(write_only=True)
+        for sheet in source.worksheets:
+            out = scaled.create_sheet(sheet.title)
+            rows = sheet.iter_rows(values_only=True)
+            if (workbook, sheet.title) not in SCALED_SHEETS:
+                for row in rows:
+                    out.append(row)
+                continue
+
+            record, key, fresh = SCALED_SHEETS[(workbook, sheet.title)]
+            mapping = SheetMapping(workbook, sheet.title, record, key=key)
+            for _ in range(mapping.first_row - 1):
+                out.append(next(rows))
+            padding = (None,) * mapping.max_col
+            records = list(mapping.extent(tuple(row) + padding[len(row):] for row in rows))
+            if fresh is None:
+                for _ in range(scale):
+                    for row in records:
+                        out.append(row)
+                continue
+            idx = convert_colname(fresh)
+            keys = [row[idx] for row in records]
+            for repeat in range(scale):
+                renamed = fresh_keys(keys, repeat)
+                for row in records:
+                    out.append(row[:idx] + (renamed[row[idx]],) + row[idx + 1:])
+        scaled.save(os.path.join(directory, workbook))
+        source.close()
+        print(f'{workbook} written to {directory} at scale {scale}.')
@@ -22,38 +22,96 @@ MONTHS = {
         'Dec':'12'
     }
 
+# Components of a date string, e.g. '12th Mar 1775'
+YEAR_RGX = re.compile(r'\b\d{4}\b')
+MONTH_RGX = re.compile(r'\b[A-Z][a-z]{2,8}\b')
+DAY_RGX = re.compile(r'\b\d{1,2}(?=[a-z]{0,2}\b)')
+
 def parse_date(date_string):
-    """Parses date strings, allows for missing months and days"""
+    """Parses date strings, allows for missing months and days
+
+    NB: A string whose first capitalised word is not a month, such as
+    'Paris 12 1775', parses to None."""
+
+    if not isinstance(date_string, str) or date_string == '':
+        return None
+    return _parse_date_string(date_string)
+
+def parse_dates(date_strings, as_numpy=False):
+    """Parses a whole column of date strings.
+
+    Each distinct string is only parsed once, as the same dates recur many times.
+    Strings are parsed as by `parse_date`, so a string whose first
+    capitalised word is not a month parses to None.
+
+    Arguments:
+    ==========
+        date_strings (iterable): the date strings. Anything that is not a
+            non-empty string parses to None
+        as_numpy (bool): return a NumPy datetime64 array and a null mask,
+            instead of a list (requires numpy)
+
+    Returns:
+    ==========
+        A list of 'YYYY-MM-DD' strings, or None for dates that cannot be
+        parsed. Or if as_numpy is set, a datetime64[D] array, with NaT for
+        dates that cannot be parsed, and a boolean array that is True where
+        the date is missing.
+    """
+
+    parsed = {}
+    results = []
+    for date_string in date_strings:
+        if not isinstance(date_string, str) or date_string == '':
+            results.append(None)
+            continue
+        if date_string not in parsed:
+            parsed[date_string] = _parse_date_string(date_string)
+        results.append(parsed[date_string])
+
+    if not as_numpy:
+        return results
+
+    try:
+        import numpy as np #pylint:disable=import-outside-toplevel;
+    except ImportError as err:
+        raise ImportError('parse_dates(..., as_numpy=True) requires numpy.') from err
+    dates = np.array(['NaT' if result is None else result for result in results],
+                     dtype='datetime64[D]')
+    return dates, np.isnat(dates)
+
+def _parse_date_string(date_string):
+    """Parses one non-empty date string.
+
+    A capitalised word that is not a month makes the date invalid, so the
+    string parses to None, as it does in `mpce.parse_date`."""
 
     # Frames for components
     year = '0000'
     month = '00'
     day = '00'
 
-    if isinstance(date_string, str) and date_string != '': #pylint:disable=no-else-return;
-
-        # Regexes to find components
-        year_mtch = re.search(r'\b\d{4}\b', date_string)
-        month_mtch = re.search(r'\b[A-Z][a-z]{2,8}\b', date_string)
-        day_mtch = re.search(r'\b\d{1,2}(?=[a-z]{0,2}\b)', date_string)
-
-        # Parse components
-        if year_mtch:
-            year = year_mtch.group(0)
-        if month_mtch:
-            month = MONTHS[month_mtch.group(0)[:3]]
-        if day_mtch:
-            day_digits = day_mtch.group(0)
-            day = day[:-len(day_digits)] + day_digits
-
-        # Validate
-        try:
-            date(int(year), int(month), int(day))
-            return year + '-' + month + '-' + day
-        except ValueError:
-            return None
-
-    return None
+    # Regexes to find components
+    year_mtch = YEAR_RGX.search(date_string)
+    month_mtch = MONTH_RGX.search(date_string)
+    day_mtch = DAY_RGX.search(date_string)
+
+    # Parse components
+    if year_mtch:
+        year = year_mtch.group(0)
+    if month_mtch:
+        # Words that are not months make the date invalid
+        month = MONTHS.get(month_mtch.group(0)[:3], '00')
+    if day_mtch:
+        day_digits = day_mtch.group(0)
+        day = day[:-len(day_digits)] + day_digits
+
+    # Validate
+    try:
+        date(int(year), int(month), int(day))
+        return year + '-' + month + '-' + day
+    except ValueError:
+        return None
 
 def convert_colname(colname):
     """Converts Excel column letter into python idx."""
@@ -0,0 +1,251 @@
+"""Parse-once cache for the bundled data spreadsheets."""
+
+import glob
+import os
+import threading
+from contextlib import contextmanager
+from importlib.resources import path
+
+from openpyxl import load_workbook
+
+from mpcereform.snapshots import (
+    DEFAULT_DIRECTORY, SnapshotRows, file_hash, snapshot_path, write_snapshot
+)
+
+class WorkbookCache():
+    """Parses each bundled workbook once, and hands out iterators over its sheets.
+
+    Sheets are streamed wherever possible, so that they are never held in
+    memory as a whole:
+
+    - If a fresh columnar snapshot of a sheet exists (see `build_snapshots`),
+      its rows are decoded from the memory-mapped snapshot as they are read.
+    - Otherwise a sheet that is read only once is streamed straight from the
+      workbook, opened in read-only mode.
+    - A sheet that is read several times, and has no snapshot, is parsed once
+      into a compact buffer of row tuples, together with any other such
+      sheets of its workbook. It is evicted once its expected number of
+      consumers have taken an iterator.
+
+    The cache may be shared between threads. Each workbook is loaded at most
+    once, however many threads ask for it.
+
+    Arguments:
+    ==========
+        consumers (dict): maps (workbook, sheet) to the number of times the
+            sheet will be read during the build
+        package (str): the package the spreadsheets are bundled in
+        snapshot_dir (str): directory of sheet snapshots, or None to always
+            parse the workbooks
+        directory (str): a directory to read the spreadsheets from instead
+            of the package
+    """
+
+    def __init__(self, consumers=None, package='mpcereform.spreadsheets',
+                 snapshot_dir=DEFAULT_DIRECTORY, directory=None):
+        self.package = package
+        self.directory = directory
+        self.consumers = dict(consumers) if consumers is not None else {}
+        self.snapshot_dir = snapshot_dir
+        self._sheets = {}
+        self._locks = {}
+        self._hashes = {}
+
+    def rows(self, workbook, sheet, min_row=1, max_row=None, max_col=None):
+        """Returns an iterator over the values in a sheet.
+
+        Takes the same row and column limits as openpyxl's `iter_rows`, and
+        yields the same tuples it would with `values_only=True`."""
+
+        key = (workbook, sheet)
+        with self._lock(workbook):
+            if key not in self._sheets:
+                snapshot = self._open_snapshot(workbook, sheet)
+                if snapshot is None and self.consumers.get(key, 0) > 1:
+                    self._load(workbook, sheet)
+                if key not in self._sheets:
+                    self.consumers[key] = max(self.consumers.get(key, 0) - 1, 0)
+                    if snapshot is not None:
+                        return self._stream_snapshot(snapshot, min_row, max_row, max_col)
+                    return self._stream(workbook, sheet, min_row, max_row, max_col)
+            buffer, width = self._sheets[key]
+
+            # Evict the sheet once its last consumer has been served
+            remaining = self.consumers.get(key, 0) - 1
+            self.consumers[key] = max(remaining, 0)
+            if remaining <= 0:
+                del self._sheets[key]
+
+        return self._iter_buffer(buffer, width, min_row, max_row, max_col)
+
+    def prefetch(self, executor):
+        """Loads the sheets to be buffered from every awaited workbook, in the background.
+
+        Arguments:
+        ==========
+            executor (Executor): runs one loading task per workbook
+
+        Returns:
+        ==========
+            A list of futures, one per workbook
+        """
+
+        workbooks = sorted({wbk for (wbk, _), num in self.consumers.items() if num > 0})
+        return [executor.submit(self._prefetch, workbook) for workbook in workbooks]
+
+    def _prefetch(self, workbook):
+        """Loads the sheets to be buffered from a workbook, unless they are already loaded."""
+
+        with self._lock(workbook):
+            self._load(workbook)
+
+    def _lock(self, workbook):
+        """Returns the lock guarding a workbook's sheets."""
+        return self._locks.setdefault(workbook, threading.Lock())
+
+    @contextmanager
+    def workbook_path(self, workbook):
+        """Yields the path of a workbook file."""
+
+        if self.directory is not None:
+            yield os.path.join(self.directory, workbook)
+        else:
+            with path(self.package, workbook) as pth:
+                yield pth
+
+    def clear(self):
+        """Drops every cached sheet."""
+        self._sheets.clear()
+
+    def build_snapshots(self, directory=None):
+        """Writes a columnar snapshot of every sheet the cache expects to serve.
+
+        Snapshots of older versions of the same workbooks are removed.
+
+        Returns:
+        ==========
+            A list of the snapshot files written
+        """
+
+        directory = directory or self.snapshot_dir or DEFAULT_DIRECTORY
+        os.makedirs(directory, exist_ok=True)
+
+        sheets = {}
+        for workbook, sheet in self.consumers:
+            sheets.setdefault(workbook, []).append(sheet)
+
+        written = []
+        for workbook, names in sheets.items():
+            with self.workbook_path(workbook) as pth:
+                print(f'Snapshotting {pth} ...')
+                source_hash = file_hash(pth)
+                wbk = load_workbook(pth, read_only=True, keep_vba=False)
+            for name in names:
+                snap = snapshot_path(directory, workbook, name, source_hash)
+                write_snapshot(snap, *self._buffer_sheet(wbk[name]), source_hash)
+                written.append(snap)
+            wbk.close()
+
+            # Remove snapshots of previous versions of the workbook
+            prefix = os.path.splitext(workbook)[0] + '-'
+            for old in glob.glob(os.path.join(directory, glob.escape(prefix) + '*.snap')):
+                if os.path.basename(old)[len(prefix):len(prefix) + 16] != source_hash[:16]:
+                    os.remove(old)
+
+        return written
+
+    def _source_hash(self, workbook):
+        """Returns the hash of a workbook, which is computed once per cache."""
+
+        if workbook not in self._hashes:
+            with self.workbook_path(workbook) as pth:
+                self._hashes[workbook] = file_hash(pth)
+        return self._hashes[workbook]
+
+    def _open_snapshot(self, workbook, sheet):
+        """Opens the fresh snapshot of a sheet, or returns None if it has none."""
+
+        if self.snapshot_dir is None or not os.path.isdir(self.snapshot_dir):
+            return None
+        snap = snapshot_path(self.snapshot_dir, workbook, sheet, self._source_hash(workbook))
+        try:
+            snapshot = SnapshotRows(snap, self._source_hash(workbook))
+        except (OSError, ValueError):
+            return None
+        print(f'Streaming [{sheet}] from snapshot {snap}')
+        return snapshot
+
+    def _stream(self, workbook, sheet, min_row, max_row, max_col):
+        """Yields rows straight from a workbook, without buffering the sheet."""
+
+        with self.workbook_path(workbook) as pth:
+            print(f'Streaming [{sheet}] from {pth} ...')
+            wbk = load_workbook(pth, read_only=True, keep_vba=False)
+        try:
+            yield from wbk[sheet].iter_rows(min_row=min_row, max_row=max_row,
+                                            max_col=max_col, values_only=True)
+        finally:
+            wbk.close()
+
+    def _stream_snapshot(self, snapshot, min_row, max_row, max_col):
+        """Yields rows from a snapshot, decoding each as it is read."""
+
+        with snapshot:
+            yield from self._iter_buffer(snapshot, snapshot.width, min_row, max_row, max_col)
+
+    def _load(self, workbook, sheet=None):
+        """Buffers the requested sheet, and any other sheets of the workbook that
+        will be read several times and have no fresh snapshot."""
+
+        wanted = {sht for (wbk, sht), num in self.consumers.items()
+                  if wbk == workbook and num > 1 and (wbk, sht) not in self._sheets}
+        if sheet is not None:
+            wanted.add(sheet)
+        if self.snapshot_dir is not None and os.path.isdir(self.snapshot_dir):
+            source_hash = self._source_hash(workbook)
+            wanted = {sht for sht in wanted if sht == sheet or not os.path.exists(
+                snapshot_path(self.snapshot_dir, workbook, sht, source_hash))}
+        if not wanted:
+            return
+
+        with self.workbook_path(workbook) as pth:
+            print(f'Parsing {pth} ...')
+            wbk = load_workbook(pth, read_only=True, keep_vba=False)
+
+        for name in wanted:
+            self._sheets[(workbook, name)] = self._buffer_sheet(wbk[name])
+
+        wbk.close()
+
+    @staticmethod
+    def _buffer_sheet(worksheet):
+        """Reads a worksheet into a tuple of rows, without trailing empty cells."""
+
+        width = worksheet.max_column
+        buffer = []
+        for row in worksheet.iter_rows(values_only=True):
+            if width is not None:
+                end = len(row)
+                while end and row[end - 1] is None:
+                    end -= 1
+                row = row[:end]
+            buffer.append(tuple(row))
+
+        return tuple(buffer), width
+
+    @staticmethod
+    def _iter_buffer(buffer, width, min_row, max_row, max_col):
+        """Yields rows from a buffer (or a SnapshotRows), padded as openpyxl would pad them."""
+
+        max_col = max_col or width
+        if max_row is None:
+            max_row = len(buffer)
+
+        for idx in range(min_row - 1, max_row):
+            row = buffer[idx] if idx < len(buffer) else ()
+            if max_col is None:
+                yield row
+            elif len(row) >= max_col:
+                yield row[:max_col]
+            else:
+                yield row + (None,) * (max_col - len(row))
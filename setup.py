@@ -18,10 +18,22 @@ setup(
     keywords="MariaDB enlightenment french-book-trade",
     url="http://fbtee.uws.edu.au/mpce/",
     entry_points={
-        'console_scripts': ['reform-db=mpcereform.reform:main']
+        'console_scripts': [
+            'reform-db=mpcereform.reform:main',
+            'snapshot-spreadsheets=mpcereform.reform:snapshot',
+            'benchmark-reform=mpcereform.reform:benchmark'
+        ]
     },
     install_requires=[
         'openpyxl',
         'mysql-connector'
-    ]
+    ],
+    extras_require={
+        # For parse_dates(..., as_numpy=True)
+        'numpy': ['numpy'],
+        # For LocalDB.export(..., fmt='parquet')
+        'parquet': ['pyarrow'],
+        # For LocalDB.build_embedded(..., backend='duckdb')
+        'duckdb': ['duckdb']
+    }
 )
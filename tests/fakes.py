@@ -0,0 +1,64 @@
+"""Fake database connections, which answer statements from canned responses."""
+
+import re
+
+class FakeCursor():
+    """A cursor that records each statement and answers it from its connection's responses."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, operation, params=()):
+        self.conn.executed.append((' '.join(operation.split()), tuple(params or ())))
+        for pattern, response in self.conn.responses:
+            if re.search(pattern, operation, re.DOTALL):
+                rows = response(params) if callable(response) else response
+                break
+        else:
+            rows = []
+        self._rows = list(rows)
+        self.rowcount = len(self._rows) if operation.lstrip().upper().startswith('SELECT') else 1
+
+    def executemany(self, operation, seq_params):
+        for params in seq_params:
+            self.execute(operation, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+class FakeConnection():
+    """A connection whose statements are answered by the first matching (regex, rows) response.
+
+    A response may also be a function of the statement's parameters."""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs): #pylint:disable=unused-argument;
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+    def statements(self, pattern):
+        """Returns the executed statements matching a pattern."""
+
+        return [(stmt, params) for stmt, params in self.executed if re.search(pattern, stmt)]
@@ -0,0 +1,67 @@
+"""Tests of the in-memory index that proposes matches for new agents."""
+
+from mpcereform.agent_index import AgentIndex, normalise_name, trigrams
+
+from tests.fakes import FakeConnection
+
+def test_normalise_name():
+    assert normalise_name('Voltaire, François-Marie Arouet de') == \
+        normalise_name('francois marie arouet de voltaire')
+    assert normalise_name('Voltaire, François-Marie Arouet de') == 'arouet de francois marie voltaire'
+    assert normalise_name(None) == ''
+    assert normalise_name(' ;, ') == ''
+
+def voltaires():
+    index = AgentIndex()
+    index.add('id0001', 'Voltaire')
+    index.add('id0001', 'Arouet, François-Marie')
+    index.add('id0002', 'Voltairre')
+    index.add('id0003', 'Voltair')
+    index.add('id0004', 'Rousseau')
+    return index
+
+def test_match_respects_threshold():
+    index = voltaires()
+
+    # 'voltairre' scores 16/17 and 'voltair' 14/15 against 'voltaire'
+    assert [code for code, _, _ in index.match('VOLTAIRE', threshold=0.85)] == \
+        ['id0001', 'id0002', 'id0003']
+    assert [code for code, _, _ in index.match('VOLTAIRE', threshold=0.94)] == ['id0001', 'id0002']
+    assert index.match('VOLTAIRE', threshold=1) == [('id0001', 'Voltaire', 1.0)]
+    assert index.match('Diderot') == []
+
+def test_match_respects_limit():
+    index = voltaires()
+
+    assert [code for code, _, _ in index.match('Voltaire', limit=2)] == ['id0001', 'id0002']
+    # 'Rousseau' shares no trigram with 'voltaire', so it is never a candidate
+    assert len(index.match('Voltaire', threshold=0, limit=10)) == 3
+    # One entry per agent, with its best scoring name
+    assert index.match('Arouet, Francois Marie', limit=1) == [
+        ('id0001', 'Arouet, François-Marie', 1.0)
+    ]
+
+def test_common_trigrams_fall_back_to_the_rarest():
+    names = {'cl0001': 'ab', 'cl0002': 'abx', 'cl0003': 'ay', 'cl0004': 'zab', 'cl0005': 'abw'}
+    # The postings of 'ab' are '  a' (4 names), ' ab' (3 names) and 'ab ' (2 names)
+    assert trigrams('ab') == {'  a', ' ab', 'ab '}
+
+    narrow = AgentIndex(max_postings=1)
+    wide = AgentIndex(max_postings=500)
+    for agent_code, name in names.items():
+        narrow.add(agent_code, name)
+        wide.add(agent_code, name)
+
+    # Every trigram is too common, so only the rarest, 'ab ', is read
+    assert {code for code, _, _ in narrow.match('ab', threshold=0)} == {'cl0001', 'cl0004'}
+    assert {code for code, _, _ in wide.match('ab', threshold=0)} == set(names)
+
+def test_from_database_indexes_other_names():
+    conn = FakeConnection([(r'SELECT agent_code, name, other_names FROM mpce.agent', [
+        ('id0001', 'Voltaire', 'Arouet, François-Marie; M. de V*** | Voltaire'),
+        ('id0002', 'Rousseau, Jean-Jacques', None)
+    ])])
+    index = AgentIndex.from_database(conn.cursor())
+
+    assert len(index) == 5
+    assert index.match('M. de V***', limit=1) == [('id0001', 'M. de V***', 1.0)]
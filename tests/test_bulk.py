@@ -0,0 +1,54 @@
+"""Tests of the warnings reported after LOAD DATA LOCAL INFILE."""
+
+from mpcereform.bulk import BulkWriter
+
+from tests.fakes import FakeConnection
+
+def test_load_warnings_are_printed(capsys):
+    conn = FakeConnection([
+        (r"SHOW VARIABLES LIKE 'local_infile'", [('local_infile', 'ON')]),
+        (r'DESCRIBE', [('name', 'varchar(255)'), ('year', 'int')]),
+        (r'SHOW COUNT\(\*\) WARNINGS', [(12,)]),
+        (r'SHOW WARNINGS', [
+            ('Warning', 1366, "Incorrect integer value: 'n.d.' for column 'year' at row 2"),
+            ('Warning', 1062, "Duplicate entry 'Paris' for key 'PRIMARY'"),
+        ]),
+    ])
+    BulkWriter(conn, 'mpce.place', ['name', 'year']).write([('Paris', 1775), ('Lyon', 'n.d.')])
+
+    out = capsys.readouterr().out
+    assert '12 warnings raised while loading `mpce.place`' in out
+    assert "Incorrect integer value: 'n.d.'" in out
+    assert "Duplicate entry 'Paris'" in out
+    assert '... and 2 more.' in out
+    assert conn.statements(r'SHOW WARNINGS LIMIT 10')
+
+def test_clean_load_prints_nothing(capsys):
+    conn = FakeConnection([
+        (r"SHOW VARIABLES LIKE 'local_infile'", [('local_infile', 'ON')]),
+        (r'SHOW COUNT\(\*\) WARNINGS', [(0,)]),
+    ])
+    BulkWriter(conn, 'mpce.place', ['name']).write([('Paris',)])
+
+    assert capsys.readouterr().out == ''
+    assert not conn.statements(r'SHOW WARNINGS')
+
+def test_each_chunk_is_loaded_before_the_next_is_read():
+    conn = FakeConnection([
+        (r"SHOW VARIABLES LIKE 'local_infile'", [('local_infile', 'ON')]),
+        (r'SHOW COUNT\(\*\) WARNINGS', [(0,)]),
+    ])
+    events = []
+
+    def rows():
+        for idx in range(5):
+            events.append(('read', len(conn.statements(r'LOAD DATA'))))
+            yield (f'pl{idx:03d}',)
+
+    affected = BulkWriter(conn, 'mpce.place', ['name'], batch_size=2).write(rows())
+
+    assert affected == 3
+    assert len(conn.statements(r'LOAD DATA')) == 3
+    # The third row is read after the first chunk was loaded
+    assert events[2] == ('read', 1)
+    assert events[4] == ('read', 2)
@@ -0,0 +1,63 @@
+"""Tests for mpcereform.codes"""
+
+import pytest
+
+from mpcereform.codes import CodeAllocator
+
+from tests.fakes import FakeConnection
+
+def allocator_connection():
+    """The allocator's own connection, which sees no agents and no sequence yet."""
+
+    sequences = {}
+
+    def insert(params):
+        prefix, table, column, next_value, padding = params
+        sequences.setdefault(prefix, [table, column, next_value, padding])
+        return []
+
+    def frame(params):
+        if len(params) == 2:
+            matches = [(prefix, seq[3]) for prefix, seq in sequences.items()
+                       if tuple(seq[:2]) == tuple(params)]
+        else:
+            matches = [(params[0], sequences[params[0]][3])] if params[0] in sequences else []
+        return matches
+
+    def update(params):
+        num, prefix = params
+        sequences[prefix][2] += num
+        return []
+
+    return sequences, FakeConnection([
+        (r'INSERT IGNORE INTO mpce.code_sequence', insert),
+        (r'SELECT prefix, padding FROM mpce.code_sequence', frame),
+        (r'UPDATE mpce.code_sequence', update),
+        (r'SELECT LAST_INSERT_ID', lambda params: [(sequences['id'][2],)]),
+        (r'FROM mpce.agent', [])
+    ])
+
+def test_seeds_from_the_phase_connection():
+    """Uncommitted rows seen by the phase's connection are counted when seeding."""
+
+    sequences, own = allocator_connection()
+    phase = FakeConnection([
+        (r'LIMIT 1', [('id000100',)]),
+        (r'MAX\(', [(100, 8)])
+    ])
+    codes = CodeAllocator(lambda: own)
+
+    assert codes.reserve('mpce.agent', 'agent_code', 2, phase) == ['id000101', 'id000102']
+    assert sequences['id'][2] == 103
+    # The table was only read on the phase's connection
+    assert not own.statements(r'FROM mpce.agent')
+    assert phase.statements(r'FROM mpce.agent')
+
+def test_seeding_an_empty_table_fails():
+    """Without the phase's connection, the allocator cannot see uncommitted agents."""
+
+    _, own = allocator_connection()
+    codes = CodeAllocator(lambda: own)
+
+    with pytest.raises(ValueError, match='empty'):
+        codes.reserve('mpce.agent', 'agent_code', 1)
@@ -0,0 +1,54 @@
+"""Tests of what the commit policies commit or roll back when a phase fails."""
+
+import pytest
+
+from mpcereform.core import LocalDB
+from mpcereform.instrument import Instrument
+
+from tests.fakes import FakeConnection
+
+def local_db(conn, commit_policy, keep_phases=False):
+    """A LocalDB on a fake connection whose import_editions phase fails."""
+
+    db = LocalDB.__new__(LocalDB)
+    db.conn = conn
+    db.commit_policy = commit_policy
+    db.keep_phases = keep_phases
+    db.tune_session = False
+    db.instrument = Instrument()
+
+    def import_editions():
+        conn.cursor().execute('INSERT INTO mpce.edition VALUES (1)')
+        raise RuntimeError('import_editions failed')
+
+    db.import_editions = import_editions
+    return db
+
+def run_failing_phase(db):
+    with pytest.raises(RuntimeError, match='import_editions failed'):
+        db.run_phase('import_editions')
+
+def test_build_policy_rolls_back_the_whole_build():
+    conn = FakeConnection()
+    run_failing_phase(local_db(conn, 'build'))
+
+    assert conn.rollbacks == 1
+    assert conn.commits == 0
+    assert not conn.statements(r'SAVEPOINT')
+
+def test_build_policy_can_keep_the_earlier_phases():
+    conn = FakeConnection()
+    run_failing_phase(local_db(conn, 'build', keep_phases=True))
+
+    assert [stmt for stmt, _ in conn.statements(r'SAVEPOINT')] == [
+        'SAVEPOINT import_editions', 'ROLLBACK TO SAVEPOINT import_editions'
+    ]
+    assert conn.rollbacks == 0
+    assert conn.commits == 1
+
+def test_phase_policy_rolls_back_the_phase():
+    conn = FakeConnection()
+    run_failing_phase(local_db(conn, 'phase'))
+
+    assert conn.rollbacks == 1
+    assert conn.commits == 0
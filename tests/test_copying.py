@@ -0,0 +1,101 @@
+"""Tests of the chunked table copies."""
+
+from contextlib import nullcontext
+
+import pytest
+
+from mpcereform.copying import CopyJob, copy_chunks
+
+from tests.fakes import FakeConnection
+
+KEYS = sorted(['o1', 'o2', 'o2', 'o2', 'o3', 'o4', 'o5', 'o6', 'o7'])
+
+def bound(params):
+    """Answers the planner's queries for the next bound, over KEYS."""
+
+    if len(params) == 1:
+        keys, offset = KEYS, params[0]
+    else:
+        keys, offset = [key for key in KEYS if key > params[0]], params[1]
+    return [(keys[offset],)] if offset < len(keys) else []
+
+def planned_job(chunk_size):
+    conn = FakeConnection([
+        (r'information_schema.STATISTICS', [('order_code',)]),
+        (r'information_schema.COLUMNS', [(1,)]),
+        (r'SELECT `order_code` FROM manuscripts.orders', bound)
+    ])
+    job = CopyJob('mpce.stn_order', ['order_code', 'client_code'], 'manuscripts.orders')
+    job.plan(conn.cursor(), chunk_size)
+    return job
+
+def covers(ranges, key):
+    return sum([(lower is None or key >= lower) and (upper is None or key < upper)
+                for lower, upper in ranges])
+
+def test_every_key_is_in_exactly_one_range():
+    job = planned_job(chunk_size=2)
+    assert job.ranges[0][0] is None and job.ranges[-1][1] is None
+    assert all([covers(job.ranges, key) == 1 for key in KEYS])
+    assert len(job.ranges) == 4
+
+def test_unindexed_sources_are_copied_in_one_chunk():
+    conn = FakeConnection()
+    job = CopyJob('mpce.stn_order', ['order_code'], 'manuscripts.orders')
+    assert job.plan(conn.cursor(), chunk_size=2) == 1
+    assert job.statement(None, None)[1] == []
+
+def test_first_range_takes_rows_without_a_key():
+    job = planned_job(chunk_size=2)
+    stmt, params = job.statement(*job.ranges[0])
+    assert 'src.`order_code` IS NULL' in stmt
+    assert params == [job.ranges[0][1]]
+
+def test_chunks_are_copied_and_committed():
+    job = planned_job(chunk_size=2)
+    prepared = []
+    job.prepare = prepared.append
+    conn = FakeConnection()
+
+    copied = copy_chunks([job], lambda: nullcontext(conn))
+
+    assert len(conn.statements(r'INSERT INTO mpce.stn_order')) == len(job.ranges)
+    assert conn.commits == len(job.ranges)
+    assert len(prepared) == 1
+    assert copied == {'mpce.stn_order': len(job.ranges)}
+
+def test_no_chunks_are_started_after_a_failure():
+    job = planned_job(chunk_size=2)
+
+    def fail(params):
+        raise RuntimeError('lock wait timeout')
+
+    conn = FakeConnection([(r'INSERT INTO mpce.stn_order', fail)])
+    with pytest.raises(RuntimeError, match='lock wait timeout'):
+        copy_chunks([job], lambda: nullcontext(conn), undo=True)
+    assert len(conn.statements(r'INSERT INTO mpce.stn_order')) == 1
+    assert conn.commits == 0
+    assert not conn.statements(r'DELETE')
+
+def test_only_the_committed_ranges_are_deleted_after_a_failure():
+    job = planned_job(chunk_size=2)
+    assert job.target_key == 'order_code'
+    inserts = []
+
+    def fail_third(params):
+        inserts.append(params)
+        if len(inserts) == 3:
+            raise RuntimeError('lock wait timeout')
+        return []
+
+    conn = FakeConnection([(r'INSERT INTO mpce.stn_order', fail_third)])
+    with pytest.raises(RuntimeError, match='lock wait timeout'):
+        copy_chunks([job], lambda: nullcontext(conn), undo=True)
+
+    deletes = conn.statements(r'DELETE FROM mpce.stn_order')
+    assert deletes == [
+        ('DELETE FROM mpce.stn_order WHERE (`order_code` < %s OR `order_code` IS NULL)',
+         (job.ranges[0][1],)),
+        ('DELETE FROM mpce.stn_order WHERE `order_code` >= %s AND `order_code` < %s',
+         job.ranges[1])
+    ]
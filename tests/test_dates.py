@@ -0,0 +1,136 @@
+"""Tests that `sql/parse_date.sql` parses dates as `utils.parse_date` does.
+
+The routine is run on a server if MPCE_TEST_HOST is set (with MPCE_TEST_USER
+and MPCE_TEST_PASSWORD), in a scratch `mpce_test` database. Otherwise the
+routine's logic is replayed in Python, with the patterns read from the file.
+"""
+
+import calendar
+import os
+import re
+from importlib.resources import files
+
+import mysql.connector as mysql
+import pytest
+
+from mpcereform.core import LocalDB
+from mpcereform.utils import parse_date
+
+from tests.fakes import FakeConnection
+
+PARITY = [
+    # Edge days
+    ('1 Jan 1780', '1780-01-01'),
+    ('31 Dec 1780', '1780-12-31'),
+    ('31 Apr 1780', None),
+    ('30 Apr 1780', '1780-04-30'),
+    ('29 Feb 1780', '1780-02-29'),
+    ('29 Feb 1781', None),
+    ('29 Feb 1700', None),
+    ('29 Feb 1600', '1600-02-29'),
+    ('0 Mar 1775', None),
+    ('32 Mar 1775', None),
+    # Years before 100
+    ('12 Mar 0075', '0075-03-12'),
+    ('1 Jan 0001', '0001-01-01'),
+    ('1 Jan 0000', None),
+    ('01 Dec 0999', '0999-12-01'),
+    # Capitalised words that are not months
+    ('Paris 12 1775', None),
+    ('Monday 3 Mar 1775', None),
+    ('Paris, 3 Mar 1780', None),
+    ('Sept 1 1779', '1779-09-01'),
+    ('12 mar 1775', None),
+    ('12 MAR 1775', None),
+    # Ordinal suffixes
+    ('1st Jan 1780', '1780-01-01'),
+    ('2nd Feb 1780', '1780-02-02'),
+    ('3rd Mar 1780', '1780-03-03'),
+    ('12th March 1775 or 1776', '1775-03-12'),
+    ('22nd Oct 1785', '1785-10-22'),
+    # Missing parts
+    ('Mar 1775', None),
+    ('12 1775', None),
+    ('1775', None),
+    ('1775-03-12', None),
+    ('xx', None),
+    (' ', None),
+    ('', None),
+]
+
+ROUTINE = files('mpcereform.sql').joinpath('parse_date.sql').read_text(encoding='utf-8')
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+def routine_pattern(index):
+    """Returns the nth REGEXP_SUBSTR pattern of the routine, as a Python regex."""
+
+    literal = re.findall(r"REGEXP_SUBSTR\(date_string, '([^']*)'\)", ROUTINE)[index]
+    pattern = literal.replace('\\\\', '\\')
+    # The routine turns off case-insensitive matching, which Python has off already
+    assert pattern.startswith('(?-i)')
+    return re.compile(pattern[len('(?-i)'):])
+
+def replay_routine(date_string):
+    """Follows the steps of `mpce.parse_date`, returning a 'YYYY-MM-DD' string or None."""
+
+    if date_string is None or date_string == '':
+        return None
+    year, month, day = [routine_pattern(idx).search(date_string) for idx in range(3)]
+    year_str = year.group(0) if year else ''
+    month_num = MONTHS.index(month.group(0)[:3]) + 1 if month and month.group(0)[:3] in MONTHS else 0
+    day_num = int(day.group(0)) if day else 0
+
+    if year_str in ('', '0000') or month_num < 1 or day_num < 1:
+        return None
+    if day_num > calendar.monthrange(int(year_str), month_num)[1]:
+        return None
+    return f'{year_str}-{month_num:02d}-{day_num:02d}'
+
+@pytest.mark.parametrize('date_string, expected', PARITY)
+def test_python_parse_date(date_string, expected):
+    assert parse_date(date_string) == expected
+
+@pytest.mark.parametrize('date_string, expected', PARITY)
+def test_routine_logic(date_string, expected):
+    assert replay_routine(date_string) == expected
+
+@pytest.fixture(scope='module')
+def server():
+    if 'MPCE_TEST_HOST' not in os.environ:
+        pytest.skip('MPCE_TEST_HOST is not set')
+    conn = mysql.connect(host=os.environ['MPCE_TEST_HOST'],
+                         user=os.environ.get('MPCE_TEST_USER', 'root'),
+                         password=os.environ.get('MPCE_TEST_PASSWORD'))
+    cur = conn.cursor()
+    cur.execute('CREATE DATABASE IF NOT EXISTS mpce_test')
+    cur.execute('DROP FUNCTION IF EXISTS mpce_test.parse_date')
+    cur.execute(re.sub(r'/\*.+?\*/', '', ROUTINE, flags=re.DOTALL)
+                .replace('mpce.parse_date', 'mpce_test.parse_date'))
+    yield cur
+    cur.execute('DROP DATABASE mpce_test')
+    cur.close()
+    conn.close()
+
+@pytest.mark.parametrize('date_string, expected', PARITY)
+def test_routine_on_server(server, date_string, expected): #pylint:disable=redefined-outer-name;
+    server.execute('SELECT CAST(mpce_test.parse_date(%s) AS CHAR)', (date_string,))
+    assert server.fetchone()[0] == expected
+
+def failing_create(params): #pylint:disable=unused-argument;
+    raise mysql.ProgrammingError(msg='FUNCTION mpce.REGEXP_SUBSTR does not exist')
+
+def test_dates_are_parsed_in_python_if_the_routine_fails():
+    db = LocalDB.__new__(LocalDB)
+    db.conn = FakeConnection([(r"SELECT mpce.parse_date\('12 Mar 1775'\)", failing_create)])
+    db.batch_size = 2
+    db.sql_dates = True
+
+    assert db.create_routines() is False
+    assert db.sql_dates is False
+
+    rows = [('cl1', '3rd Mar 1780', 'Paris 12 1775'), ('cl2', None, '29 Feb 1780'),
+            ('cl3', '1 Jan 0001', '')]
+    parsed = list(db._parse_date_columns(rows, (1, 2))) #pylint:disable=protected-access;
+    assert parsed == [('cl1', '1780-03-03', None), ('cl2', None, '1780-02-29'),
+                      ('cl3', '0001-01-01', None)]
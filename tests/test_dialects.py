@@ -0,0 +1,87 @@
+"""Tests of the SQLite dialect, against an in-memory SQLite database."""
+
+import datetime
+import decimal
+import sqlite3
+
+import pytest
+
+from mpcereform.dialects import SQLITE
+
+COLUMNS = [
+    # (name, MySQL data type, MySQL column type), as read from information_schema
+    ('edition_code', 'char', 'char(12)'),
+    ('volumes', 'int', 'int(11)'),
+    ('price', 'decimal', 'decimal(6,2)'),
+    ('printed', 'date', 'date'),
+    ('notes', 'text', 'text')
+]
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    yield connection
+    connection.close()
+
+def test_create_table(conn): #pylint:disable=redefined-outer-name;
+    conn.execute(SQLITE.create_table('edition', COLUMNS, ['edition_code']))
+    # IF NOT EXISTS: creating it again is harmless
+    conn.execute(SQLITE.create_table('edition', COLUMNS, ['edition_code']))
+
+    info = conn.execute('PRAGMA table_info("edition")').fetchall()
+    assert [(name, col_type, primary) for _, name, col_type, _, _, primary in info] == [
+        ('edition_code', 'TEXT', 1), ('volumes', 'INTEGER', 0), ('price', 'NUMERIC', 0),
+        ('printed', 'TEXT', 0), ('notes', 'TEXT', 0)
+    ]
+
+def test_upsert_replaces_non_key_values(conn): #pylint:disable=redefined-outer-name;
+    conn.execute(SQLITE.create_table('edition', COLUMNS, ['edition_code']))
+    names = [SQLITE.quote(name) for name, _, _ in COLUMNS]
+    upsert = SQLITE.upsert(SQLITE.quote('edition'), names, [SQLITE.quote('edition_code')])
+    assert 'ON CONFLICT ("edition_code") DO UPDATE SET' in upsert
+
+    rows = [('bk0000001', 2, decimal.Decimal('1.50'), datetime.date(1775, 3, 1), 'first'),
+            ('bk0000002', 1, None, None, None),
+            ('bk0000001', 3, decimal.Decimal('2.00'), None, 'second')]
+    conn.executemany(upsert, [[SQLITE.adapt(val) for val in row] for row in rows])
+
+    assert conn.execute('SELECT * FROM edition ORDER BY edition_code').fetchall() == [
+        ('bk0000001', 3, 2, None, 'second'),
+        ('bk0000002', 1, None, None, None)
+    ]
+
+def test_upsert_without_keys_inserts(conn): #pylint:disable=redefined-outer-name;
+    conn.execute(SQLITE.create_table('note', [('notes', 'text', 'text')]))
+    insert = SQLITE.upsert(SQLITE.quote('note'), [SQLITE.quote('notes')])
+    assert 'ON CONFLICT' not in insert
+
+    conn.executemany(insert, [('a',), ('a',)])
+    assert conn.execute('SELECT COUNT(*) FROM note').fetchone() == (2,)
+
+def test_update_join_sets_null_without_a_match(conn): #pylint:disable=redefined-outer-name;
+    conn.execute('CREATE TABLE place (name TEXT, place_code TEXT)')
+    conn.execute('CREATE TABLE place_key (name TEXT, code TEXT)')
+    conn.executemany('INSERT INTO place VALUES (?, ?)',
+                     [('Lyon', 'stale'), ('Rouen', 'stale'), ('Nowhere', 'stale')])
+    conn.executemany('INSERT INTO place_key VALUES (?, ?)', [('Lyon', 'pl001'), ('Rouen', 'pl002')])
+
+    conn.execute(SQLITE.update_join('place', 'pl', 'place_key', 'pk', 'pk.name = pl.name',
+                                    {'place_code': 'pk.code'}))
+
+    assert conn.execute('SELECT name, place_code FROM place ORDER BY name').fetchall() == [
+        ('Lyon', 'pl001'), ('Nowhere', None), ('Rouen', 'pl002')
+    ]
+
+def test_code_trigger_codes_rows_without_a_code(conn): #pylint:disable=redefined-outer-name;
+    conn.execute('CREATE TABLE code_sequence (prefix TEXT PRIMARY KEY, next_value INTEGER)')
+    conn.execute("INSERT INTO code_sequence VALUES ('pl', 42)")
+    conn.execute('CREATE TABLE place (place_code TEXT, name TEXT)')
+    conn.execute(SQLITE.code_trigger('place', 'place_code', 'pl', 3))
+
+    conn.executemany('INSERT INTO place VALUES (?, ?)',
+                     [(None, 'Lyon'), ('', 'Rouen'), ('new', 'Caen'), ('pl007', 'Metz')])
+
+    assert conn.execute('SELECT place_code, name FROM place ORDER BY rowid').fetchall() == [
+        ('pl042', 'Lyon'), ('pl043', 'Rouen'), ('pl044', 'Caen'), ('pl007', 'Metz')
+    ]
+    assert conn.execute('SELECT next_value FROM code_sequence').fetchone() == (45,)
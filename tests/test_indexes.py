@@ -0,0 +1,36 @@
+"""Tests for the deferred unique indexes of LocalDB"""
+
+import pytest
+
+from mpcereform.core import LocalDB
+
+from tests.fakes import FakeConnection
+
+def local_db(conn):
+    """A LocalDB on a fake connection, without connecting to a server."""
+
+    db = LocalDB.__new__(LocalDB)
+    db.conn = conn
+    db.commit_policy = 'statement'
+    return db
+
+def test_every_deferred_index_is_checked():
+    conn = FakeConnection()
+    assert local_db(conn).find_duplicates(conn.cursor()) == []
+    checks = conn.statements(r'HAVING COUNT\(\*\) > 1')
+    unique = [index for index in local_db(conn)._indexes() if index[3]] #pylint:disable=protected-access;
+    assert len(checks) == len(unique) == 17
+    assert 'order_code IS NOT NULL AND transaction_code IS NOT NULL' in ' '.join(
+        [stmt for stmt, _ in checks])
+
+def test_duplicates_are_reported_before_any_index_is_built():
+    conn = FakeConnection([
+        (r'FROM mpce.stn_transaction\s+WHERE', [('o1', 't1', 2)])
+    ])
+    with pytest.raises(ValueError) as err:
+        local_db(conn).build_indexes()
+
+    message = str(err.value)
+    assert '`mpce.stn_transaction` (order_code, transaction_code), loaded by import_stn' in message
+    assert "2 rows with ('o1', 't1')" in message
+    assert not conn.statements(r'ADD UNIQUE INDEX|CREATE INDEX')
@@ -0,0 +1,40 @@
+"""Tests of the phase and statement instrumentation."""
+
+import threading
+
+from mpcereform.instrument import Instrument
+
+from tests.fakes import FakeConnection
+
+def test_statements_on_other_threads_count_towards_the_phase():
+    instrument = Instrument()
+    with instrument.phase('import_stn'):
+        instrument.wrap(FakeConnection()).cursor().execute('SELECT 1')
+        phase = instrument.current_phase()
+
+        def copy():
+            conn = instrument.wrap(FakeConnection(), phase)
+            conn.cursor().execute('INSERT INTO mpce.stn_order SELECT * FROM manuscripts.orders')
+
+        thread = threading.Thread(target=copy)
+        thread.start()
+        thread.join()
+        # A connection without a phase of its own takes the thread's phase, or None
+        thread = threading.Thread(target=lambda: instrument.wrap(FakeConnection()).cursor()
+                                  .execute('SELECT 2'))
+        thread.start()
+        thread.join()
+
+    report = instrument.report()
+    assert [stmt['phase'] for stmt in report['statements']] == ['import_stn', 'import_stn', None]
+    assert report['phases'][0]['statements'] == 2
+
+def test_time_off_the_cpu_is_reported_as_wait():
+    instrument = Instrument()
+    with instrument.phase('import_works'):
+        instrument.wrap(FakeConnection()).cursor().execute('SELECT 1')
+
+    phase = instrument.report()['phases'][0]
+    assert 'server' not in phase
+    assert phase['wait'] >= 0.0
+    assert 'WAIT(s)' in instrument.format_table()
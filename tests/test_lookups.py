@@ -0,0 +1,37 @@
+"""Tests of the lookup tables that code values by name."""
+
+from mpcereform.core import LocalDB
+from mpcereform.lookups import LookupTable
+
+from tests.fakes import FakeConnection
+
+UNITS = [(1, 'balle'), (2, 'ballot'), (3, 'copie'), (4, 'panier'), (5, 'paquet'),
+         (6, 'planches'), (7, 'portefeuille'), (8, 'privilege'), (9, 'vols separés'),
+         (10, 'mixed')]
+
+def test_stock_sale_units_match_the_original_coding():
+    conn = FakeConnection([(r'SELECT `ID`, `name` FROM mpce.`unit`', UNITS)])
+    cur = conn.cursor()
+    units = LookupTable('unit', 'ID', 'name', LocalDB.UNIT_ALIASES)
+    units.load(cur)
+    units.create_key_table(cur, LocalDB.STOCK_SALE_UNITS)
+
+    coded = dict(params for _, params in conn.statements(r'INSERT IGNORE INTO mpce.unit_key'))
+    # The CASE expression that stock sale units were first coded with
+    assert coded == {'packet': 5, 'copies': 3, 'privilege': 8, 'plates': 6,
+                     'basket': 4, 'vols': 9, 'crate': 2}
+
+def test_key_table_holds_names_as_written():
+    conn = FakeConnection([(r'SELECT `ID`, `name` FROM mpce.`judgment`',
+                            [(1, 'Straßburg  Parlement'), (2, 'Saisie')])])
+    cur = conn.cursor()
+    judgments = LookupTable('judgment', 'ID', 'name', {'Strasbourg': 'strassburg parlement'})
+    judgments.load(cur)
+    judgments.create_key_table(cur)
+
+    # Python matches the normalised names ...
+    assert judgments['STRASSBURG parlement'] == 1
+    # ... but the server joins on source columns as stored, so the key table
+    # must hold 'ß' and the repeated space as written
+    keyed = [params for _, params in conn.statements(r'INSERT IGNORE INTO mpce.judgment_key')]
+    assert keyed == [('Straßburg  Parlement', 1), ('Saisie', 2), ('Strasbourg', 1)]
@@ -0,0 +1,46 @@
+"""Tests of the declarative sheet mappings."""
+
+import pytest
+
+from mpcereform.mapping import SheetMapping
+from mpcereform.records import Condemnation
+
+ROWS = [
+    ('f1', 'Title 1', None, 'Parlement', '1/2/1775;3/4/1776', None),
+    ('f2', 'Title 2', 'null', 'Parlement', '5/6/1777', 'burnt'),
+    (None, None, None, None, None, None),
+    ('f3', 'After the end', None, None, '7/8/1778', None)
+]
+
+def test_data_ends_at_the_first_empty_row():
+    mapping = SheetMapping('condemnations.xlsx', 'Sheet1', Condemnation)
+    assert [rec.folio for rec in mapping.records(ROWS)] == ['f1', 'f2']
+
+def test_data_ends_at_the_first_row_without_a_key():
+    rows = [ROWS[0], (None, 'No folio') + (None,) * 4, ROWS[1]]
+    mapping = SheetMapping('condemnations.xlsx', 'Sheet1', Condemnation, key='A')
+    assert [rec.folio for rec in mapping.records(rows)] == ['f1']
+
+def test_steps_run_in_order():
+    batches = []
+
+    def batch(records):
+        batches.append(len(records))
+        return [rec._replace(notes=len(batches)) for rec in records]
+
+    mapping = SheetMapping(
+        'condemnations.xlsx', 'Sheet1', Condemnation,
+        clean=lambda value: None if value == 'null' else value,
+        fields={'title': str.upper},
+        transform=lambda rec: rec if rec.other_judgment != 'burnt' else None,
+        split=lambda rec: [rec._replace(date=date) for date in rec.date.split(';')],
+        batch=batch)
+    records = list(mapping.records(ROWS, size=1))
+
+    assert [(rec.title, rec.date, rec.notes) for rec in records] == [
+        ('TITLE 1', '1/2/1775', 1), ('TITLE 1', '3/4/1776', 2)]
+    assert batches == [1, 1]
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError, match='no fields: nonsense'):
+        SheetMapping('condemnations.xlsx', 'Sheet1', Condemnation, fields={'nonsense': str})
@@ -0,0 +1,34 @@
+"""Tests of the spreadsheet record types."""
+
+import pytest
+
+from mpcereform.records import RECORD_TYPES, Condemnation, Consignment, record_type
+
+def test_records_read_their_declared_columns():
+    row = [f'v{idx}' for idx in range(Consignment.MAX_COL)]
+    consignment = Consignment.read(row)
+
+    assert consignment.id == 'v0'
+    assert consignment.uuid is None
+    assert consignment.ms_21935_entry_no == 'v44'
+    assert len(consignment) == len(Consignment.COLUMNS)
+    assert Consignment.MAX_COL == 45
+
+def test_records_are_compact_tuples():
+    condemnation = Condemnation.read(('f1', 'Title', None, 'Parlement', '1/2/1775', None),
+                                     clean=lambda value: value or '')
+    assert isinstance(condemnation, tuple)
+    assert not hasattr(condemnation, '__dict__')
+    assert condemnation == ('f1', 'Title', '', 'Parlement', '1/2/1775', '')
+    assert condemnation._replace(date=None).date is None
+
+@pytest.mark.parametrize('record', RECORD_TYPES, ids=lambda record: record.__name__)
+def test_declarations_are_consistent(record):
+    assert len(record.COLUMNS) == len(record._fields) == len(record.INDEXES)
+    assert record.TABLE.startswith('mpce.')
+
+def test_invalid_declarations_are_rejected():
+    with pytest.raises(ValueError, match='duplicate columns'):
+        record_type('Bad', 'mpce.bad', [('a', 'A', 'x'), ('b', 'B', 'x')])
+    with pytest.raises(ValueError, match='invalid column letter'):
+        record_type('Bad', 'mpce.bad', [('a', 'a1', 'x')])
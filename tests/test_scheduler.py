@@ -0,0 +1,105 @@
+"""Tests of the dependency-aware scheduling of the import phases."""
+
+import threading
+import time
+
+import pytest
+
+from mpcereform.core import LocalDB
+from mpcereform.scheduler import Scheduler
+
+PHASES = {
+    # A small build: 'works' and 'places' are independent, 'editions' reads
+    # what 'works' writes, and 'spreadsheets' writes a table 'editions' owns
+    'works': {'reads': {'src.books'}, 'writes': {'work'}},
+    'places': {'reads': {'src.places'}, 'writes': {'place'}},
+    'editions': {'reads': {'src.editions', 'work'}, 'writes': {'edition'}},
+    'spreadsheets': {'reads': {'place'}, 'writes': {'edition', 'consignment'}},
+    'triggers': {'ddl': True, 'writes': {'work', 'edition'}}
+}
+
+class Recorder():
+    """A phase target that records when each phase starts and finishes."""
+
+    def __init__(self, fail=(), delay=0.02):
+        self.fail = set(fail)
+        self.delay = delay
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, name):
+        start = time.perf_counter()
+        time.sleep(self.delay)
+        if name in self.fail:
+            raise RuntimeError(f'{name} failed')
+        with self.lock:
+            self.spans[name] = (start, time.perf_counter())
+
+    def order(self):
+        return sorted(self.spans, key=lambda name: self.spans[name][0])
+
+def test_dependencies():
+    scheduler = Scheduler(PHASES)
+
+    assert scheduler.depends == {
+        'works': set(),
+        'places': set(),
+        'editions': {'works'},
+        'spreadsheets': {'places', 'editions'},
+        'triggers': {'works', 'editions', 'spreadsheets'}
+    }
+    assert scheduler.owners == {'work': 'works', 'place': 'places', 'edition': 'editions',
+                                'consignment': 'spreadsheets'}
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_run_respects_dependency_order(jobs):
+    recorder = Recorder()
+    scheduler = Scheduler(PHASES)
+    scheduler.run(recorder, jobs=jobs)
+
+    assert set(recorder.spans) == set(PHASES)
+    for name, earlier in scheduler.depends.items():
+        for dependency in earlier:
+            assert recorder.spans[dependency][1] <= recorder.spans[name][0], (dependency, name)
+    if jobs == 1:
+        assert recorder.order() == list(PHASES)
+
+def test_phases_writing_the_same_table_never_overlap():
+    recorder = Recorder(delay=0.05)
+    scheduler = Scheduler(PHASES)
+    scheduler.run(recorder, jobs=len(PHASES))
+
+    names = list(PHASES)
+    for idx, first in enumerate(names):
+        for second in names[idx + 1:]:
+            if scheduler.writes[first] & scheduler.writes[second]:
+                (start1, end1), (start2, end2) = recorder.spans[first], recorder.spans[second]
+                assert end1 <= start2 or end2 <= start1, (first, second)
+
+def test_run_only_the_given_phases():
+    recorder = Recorder()
+    Scheduler(PHASES).run(recorder, jobs=2, phases={'editions', 'spreadsheets'})
+    assert recorder.order() == ['editions', 'spreadsheets']
+
+def test_rerun_set_closure():
+    scheduler = Scheduler(PHASES)
+    # Downstream phases, and the owner of `edition`, which 'spreadsheets' modifies
+    assert scheduler.rerun_set({'places'}) == {'places', 'spreadsheets', 'editions', 'triggers'}
+    assert scheduler.rerun_set({'triggers'}) == {'triggers'}
+
+    build = Scheduler(LocalDB.PHASES)
+    rerun = build.rerun_set({'import_works'})
+    # import_data_spreadsheets writes `mpce.edition`, which import_editions owns
+    assert {'import_works', 'import_data_spreadsheets', 'import_editions'} <= rerun
+    assert 'import_stn' not in rerun
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_failure_stops_new_phases_and_is_reraised(jobs):
+    recorder = Recorder(fail={'works'})
+    with pytest.raises(RuntimeError, match='works failed'):
+        Scheduler(PHASES).run(recorder, jobs=jobs)
+
+    # Only 'places' may have been running alongside 'works'
+    assert set(recorder.spans) <= {'places'}
+    if jobs == 1:
+        assert not recorder.spans
@@ -0,0 +1,79 @@
+"""Tests that `split_list_cte` splits lists into the same items as `split_list`.
+
+The expression is run on a server if MPCE_TEST_HOST is set (with
+MPCE_TEST_USER and MPCE_TEST_PASSWORD). It is always run in SQLite, with the
+MySQL functions it uses defined in Python.
+"""
+
+import os
+import re
+import sqlite3
+
+import mysql.connector as mysql
+import pytest
+
+from mpcereform.splitting import split_list, split_list_cte
+
+LISTS = [
+    # (separators, list)
+    (',', 'k001, ,k002,'),
+    (',', 'k001'),
+    (',', '  k003 ,k004'),
+    (',', ',k005'),
+    (',;', 'k006; k007,k008 ;'),
+    (',;', 'k009\t,\tk010')
+]
+
+def mysql_functions(conn):
+    """Defines the MySQL functions that `split_list_cte` uses on a SQLite connection."""
+
+    def substring_index(value, delimiter, count):
+        assert count == 1
+        return None if value is None else value.split(delimiter)[0]
+
+    def regexp_replace(value, pattern, replacement):
+        return None if value is None else re.sub(pattern.replace('[[:space:]]', r'\s'),
+                                                 replacement, value)
+
+    conn.create_function('SUBSTRING_INDEX', 3, substring_index)
+    conn.create_function('REGEXP_REPLACE', 3, regexp_replace)
+    conn.create_function('LOCATE', 2, lambda sub, value: value.find(sub) + 1)
+    conn.create_function('IF', 3, lambda cond, then, otherwise: then if cond else otherwise)
+
+def split_in_sqlite(separators, items):
+    conn = sqlite3.connect(':memory:')
+    mysql_functions(conn)
+    conn.execute('CREATE TABLE lists (id INTEGER, items TEXT)')
+    conn.execute('INSERT INTO lists VALUES (1, ?)', (items,))
+    cte = split_list_cte('split', 'lists', 'id', 'items', separators)
+    rows = conn.execute(f'WITH RECURSIVE {cte} SELECT item_key, item FROM split').fetchall()
+    conn.close()
+    return rows
+
+@pytest.mark.parametrize('separators, items', LISTS)
+def test_cte_matches_split_list(separators, items):
+    expected = list(split_list([(1, items)], separators))
+    assert sorted(split_in_sqlite(separators, items)) == sorted(expected)
+
+def test_empty_items_are_kept():
+    assert list(split_list([(1, 'k001, ,k002,')])) == [(1, 'k001'), (1, ''), (1, 'k002'), (1, '')]
+
+@pytest.fixture(scope='module')
+def server():
+    if 'MPCE_TEST_HOST' not in os.environ:
+        pytest.skip('MPCE_TEST_HOST is not set')
+    conn = mysql.connect(host=os.environ['MPCE_TEST_HOST'],
+                         user=os.environ.get('MPCE_TEST_USER', 'root'),
+                         password=os.environ.get('MPCE_TEST_PASSWORD'))
+    cur = conn.cursor()
+    yield cur
+    cur.close()
+    conn.close()
+
+@pytest.mark.parametrize('separators, items', LISTS)
+def test_cte_on_server(server, separators, items): #pylint:disable=redefined-outer-name;
+    cte = split_list_cte('split', '(SELECT 1 AS id, %s AS items) AS lists', 'id', 'items',
+                         separators)
+    server.execute(f'WITH RECURSIVE {cte} SELECT item_key, item FROM split', (items,))
+    expected = list(split_list([(1, items)], separators))
+    assert sorted([tuple(row) for row in server.fetchall()]) == sorted(expected)
@@ -0,0 +1,108 @@
+"""Smoke tests of the synthetic data generated for the benchmark, at small scales."""
+
+import pytest
+
+from mpcereform import records
+from mpcereform.mapping import SheetMapping
+from mpcereform.synthetic import BASE_ROWS, SCALED_SHEETS, TABLES, SyntheticManuscripts, \
+    fresh_keys, scale_spreadsheets
+from mpcereform.utils import convert_colname
+from mpcereform.workbooks import WorkbookCache
+
+SHEETS = {
+    # The sheet each record type is read from
+    records.NewPlace: ('consignments.xlsx', 'List of new places'),
+    records.Consignment: ('consignments.xlsx', 'Confiscations master'),
+    records.ConsignmentClient: ('consignments.xlsx', 'People Final'),
+    records.PermissionGrant: ('permission_simple.xlsx', 'Licences'),
+    records.PermissionEdition: ('permission_simple.xlsx', 'Editions'),
+    records.PermissionClient: ('permission_simple.xlsx', 'Clients'),
+    records.Condemnation: ('condemnations.xlsx', 'Sheet1'),
+    records.DarntonOrder: ('CommandesLibrairesfrancais.xlsx', 'FicheSauvegarde'),
+    records.ProvincialInspection: ('provincial_inspections.xlsx', 'Amalgamated sheet')
+}
+
+ENTITY_TABLES = {
+    # Tables with one row per entity
+    'tags': 'tags',
+    'parisian_keywords': 'parisian_keywords',
+    'keywords': 'keywords',
+    'manuscript_books': 'works',
+    'manuscript_books_editions': 'editions',
+    'places': 'places',
+    'clients': 'clients',
+    'orders': 'orders',
+    'transactions': 'transactions',
+    'people': 'people',
+    'professions': 'professions',
+    'manuscript_authors': 'authors',
+    'manuscript_books_authors': 'attributions',
+    'manuscript_events': 'stampings',
+    'manuscript_titles_illegal': 'illegal_titles',
+    'manuscript_sales_events': 'auctions',
+    'manuscript_events_sales': 'stock_sales',
+    'manuscript_dealers': 'dealers',
+    'manuscript_agents_inspectors': 'inspectors'
+}
+
+def test_every_record_type_has_a_sheet():
+    assert set(SHEETS) == set(records.RECORD_TYPES)
+
+def test_scale_one_tables():
+    counts = {}
+    for table, columns, rows in SyntheticManuscripts(scale=1).tables():
+        counts[table] = 0
+        for row in rows:
+            assert len(row) == len(columns), table
+            counts[table] += 1
+
+    assert set(counts) == set(TABLES)
+    for table, entity in ENTITY_TABLES.items():
+        assert counts[table] == BASE_ROWS[entity], table
+
+def test_fresh_keys():
+    keys = ['cl0393', 'cp0393', 'cl0009', 'Voltaire', None]
+    assert fresh_keys(keys, 0) == {key: key for key in keys}
+    assert fresh_keys(keys, 1) == {
+        'cl0393': 'zz0393', 'cp0393': 'zy0393', 'cl0009': 'zz0009', 'Voltaire': 'Voltaire',
+        None: None
+    }
+    assert fresh_keys(keys, 2)['cl0393'] == 'zx0393'
+    assert fresh_keys([17, 6397], 2) == {17: 17 + 2 * 6397, 6397: 3 * 6397}
+    with pytest.raises(ValueError):
+        fresh_keys(['k0001'], 16)
+
+def sheet_mapping(record):
+    """Returns a mapping of a record type's sheet that ends where the build's does."""
+
+    key = SCALED_SHEETS[SHEETS[record]][1] if SHEETS[record] in SCALED_SHEETS else None
+    return SheetMapping(*SHEETS[record], record, key=key)
+
+def sheet_rows(cache, record):
+    """Returns the rows of data for a record type."""
+
+    mapping = sheet_mapping(record)
+    return list(mapping.extent(cache.rows(mapping.workbook, mapping.sheet,
+                                          min_row=mapping.first_row, max_col=mapping.max_col)))
+
+@pytest.fixture(scope='module')
+def scaled(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('spreadsheets')
+    scale_spreadsheets(str(directory), scale=2)
+    return WorkbookCache(snapshot_dir=None, directory=str(directory))
+
+@pytest.mark.parametrize('record', records.RECORD_TYPES, ids=lambda record: record.__name__)
+def test_scaled_spreadsheets(scaled, record): #pylint:disable=redefined-outer-name;
+    rows = sheet_rows(scaled, record)
+    bundled = sheet_rows(WorkbookCache(snapshot_dir=None), record)
+
+    assert bundled
+    assert {len(row) for row in rows} == {sheet_mapping(record).max_col}
+    if SHEETS[record] not in SCALED_SHEETS:
+        assert rows == bundled
+        return
+    assert len(rows) == 2 * len(bundled)
+    _, _, fresh = SCALED_SHEETS[SHEETS[record]]
+    if fresh is not None:
+        idx = convert_colname(fresh)
+        assert len({row[idx] for row in rows}) == 2 * len({row[idx] for row in bundled})
@@ -0,0 +1,13 @@
+"""Tests of the date parsing helpers in mpcereform.utils"""
+
+from mpcereform.utils import parse_date, parse_dates
+
+def test_words_that_are_not_months_parse_to_none():
+    # These raised a KeyError before parse_dates was added
+    assert parse_date('Paris 12 1775') is None
+    assert parse_dates(['Paris 12 1775', '12 Mar 1775']) == [None, '1775-03-12']
+
+def test_parse_date_matches_parse_dates():
+    strings = ['3rd Jan 1780', '12 Mar 0075', '31 Feb 1780', 'Mar 1775', '', None, 1775]
+    assert [parse_date(string) for string in strings] == parse_dates(strings)
+    assert parse_dates(strings) == ['1780-01-03', '0075-03-12', None, None, None, None, None]
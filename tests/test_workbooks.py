@@ -0,0 +1,47 @@
+"""Tests that the workbook cache streams sheets rather than buffering them."""
+
+from openpyxl import Workbook
+
+from mpcereform.workbooks import WorkbookCache
+
+ROWS = [('code', 'name', None), ('a1', 'Paris', 1775), ('a2', None, None), ('a3', 'Lyon', 1780)]
+
+def make_workbook(directory):
+    wbk = Workbook()
+    once = wbk.active
+    once.title = 'Once'
+    twice = wbk.create_sheet('Twice')
+    for row in ROWS:
+        once.append(row)
+        twice.append(row)
+    wbk.save(directory / 'places.xlsx')
+
+def expected(min_row=1, max_col=3):
+    return [tuple(row[:max_col]) for row in ROWS[min_row - 1:]]
+
+def test_sheets_read_once_are_never_buffered(tmp_path):
+    make_workbook(tmp_path)
+    cache = WorkbookCache({('places.xlsx', 'Once'): 1, ('places.xlsx', 'Twice'): 2},
+                          snapshot_dir=None, directory=str(tmp_path))
+
+    assert list(cache.rows('places.xlsx', 'Once', min_row=2, max_col=3)) == expected(2)
+    assert ('places.xlsx', 'Once') not in cache._sheets #pylint:disable=protected-access;
+
+    first = cache.rows('places.xlsx', 'Twice', min_row=2, max_col=3)
+    assert ('places.xlsx', 'Twice') in cache._sheets #pylint:disable=protected-access;
+    assert list(first) == expected(2)
+    assert list(cache.rows('places.xlsx', 'Twice', min_row=2, max_col=3)) == expected(2)
+    assert not cache._sheets #pylint:disable=protected-access;
+
+def test_snapshots_are_streamed(tmp_path):
+    make_workbook(tmp_path)
+    consumers = {('places.xlsx', 'Once'): 1, ('places.xlsx', 'Twice'): 2}
+    snapshots = tmp_path / 'snapshots'
+    WorkbookCache(consumers, snapshot_dir=str(snapshots),
+                  directory=str(tmp_path)).build_snapshots()
+
+    cache = WorkbookCache(consumers, snapshot_dir=str(snapshots), directory=str(tmp_path))
+    for sheet in ('Once', 'Twice', 'Twice'):
+        assert list(cache.rows('places.xlsx', sheet, min_row=2, max_col=3)) == expected(2)
+        assert not cache._sheets #pylint:disable=protected-access;
+    assert list(cache.rows('places.xlsx', 'Once', max_row=2)) == expected()[:2]